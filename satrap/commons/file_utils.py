@@ -3,6 +3,9 @@
 import os
 import time
 import json
+import hashlib
+import pickle
+import tempfile
 import requests
 
 from satrap import settings
@@ -129,6 +132,190 @@ def read_json(file: str) -> dict:
         res = json.load(f)
     return res
 
+def hash_file(file: str) -> str:
+    """Returns the SHA-256 digest of the content of a file.
+
+    :param file: the file path
+    :type file: str
+
+    :return: the hexadecimal digest
+    :rtype: str
+    """
+    digest = hashlib.sha256()
+    with open(file, 'rb') as f:
+        while chunk := f.read(settings.STIX_STREAM_CHUNK_SIZE):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+class _JSONStreamReader:
+    """Incremental reader of JSON values from a text stream.
+
+    Only the characters needed to decode the next value are kept in memory.
+    """
+
+    def __init__(self, stream, chunk_size: int):
+        self.stream = stream
+        self.chunk_size = chunk_size
+        self.decoder = json.JSONDecoder()
+        self.buffer = ""
+        self.pos = 0
+        self.eof = False
+
+    def _fill(self, size: int) -> bool:
+        """Read more characters from the stream, dropping the consumed ones.
+
+        :return: False if the end of the stream was reached
+        :rtype: bool
+        """
+        if self.eof:
+            return False
+        chunk = self.stream.read(size)
+        if not chunk:
+            self.eof = True
+            return False
+        self.buffer = self.buffer[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self) -> str:
+        """Returns the next non-whitespace character without consuming it,
+        an empty string at the end of the stream.
+        """
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos].isspace():
+                self.pos += 1
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self._fill(self.chunk_size):
+                return ""
+
+    def expect(self, char: str) -> None:
+        """Consume the next non-whitespace character.
+
+        :raises ValueError: If the character is not the expected one
+        """
+        found = self.peek()
+        if found != char:
+            raise ValueError(f"Invalid JSON: expected '{char}' but found '{found}'")
+        self.pos += 1
+
+    def decode(self):
+        """Decode and consume the next JSON value.
+
+        :raises ValueError: If the stream does not contain a valid JSON value
+        """
+        self.peek()
+        read_size = self.chunk_size
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.pos)
+                # a value ending at the buffer limit might be truncated (e.g. a number)
+                if end < len(self.buffer) or self.eof:
+                    self.pos = end
+                    return value
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+            # grow the reads to keep large values linear in their size
+            self._fill(read_size)
+            read_size = max(read_size, len(self.buffer))
+
+
+def stream_json_array(
+        file: str,
+        key: str,
+        chunk_size: int=settings.STIX_STREAM_CHUNK_SIZE
+    ):
+    """Incrementally read the items of an array stored under a top-level key
+    of a .json file, e.g. the 'objects' of a STIX bundle.
+
+    Items are yielded one at a time as soon as they are read, so memory
+    usage does not depend on the size of the file.
+
+    :param file: the file path of the json data
+    :type file: str
+    :param key: the top-level key of the array
+    :type key: str
+    :param chunk_size: the number of characters read from the file at a time
+    :type chunk_size: int, optional
+
+    :raises KeyError: If the top-level key does not exist
+    :raises ValueError: If the file content is not valid JSON or the value
+        of the key is not an array
+    """
+    with open(file, 'r', encoding="utf-8") as f:
+        reader = _JSONStreamReader(f, chunk_size)
+        reader.expect("{")
+        if reader.peek() == "}":
+            raise KeyError(key)
+        while True:
+            name = reader.decode()
+            reader.expect(":")
+            if name != key:
+                # values of other top-level keys are skipped
+                reader.decode()
+            else:
+                reader.expect("[")
+                if reader.peek() == "]":
+                    return
+                while True:
+                    yield reader.decode()
+                    if reader.peek() == "]":
+                        return
+                    reader.expect(",")
+            if reader.peek() == "}":
+                raise KeyError(key)
+            reader.expect(",")
+
+class DiskSpillQueue:
+    """First-in first-out queue of Python objects spilled to a temporary
+    file, to keep large intermediate results out of memory.
+
+    Items are appended with put and read back, in order, by iterating
+    over the queue. The file is deleted when the queue is closed.
+    """
+
+    def __init__(self, directory: str = None):
+        """Create an empty queue.
+
+        :param directory: The folder of the temporary file, the default
+            temporary folder if not given
+        :type directory: str, optional
+        """
+        self.file = tempfile.TemporaryFile(dir=directory)
+        self.size = 0
+
+    def put(self, item) -> None:
+        """Append an item at the end of the queue.
+
+        :param item: A picklable object
+        """
+        pickle.dump(item, self.file, protocol=pickle.HIGHEST_PROTOCOL)
+        self.size += 1
+
+    def __len__(self):
+        return self.size
+
+    def __iter__(self):
+        self.file.flush()
+        self.file.seek(0)
+        try:
+            for _ in range(self.size):
+                yield pickle.load(self.file)
+        finally:
+            self.file.seek(0, os.SEEK_END)
+
+    def close(self) -> None:
+        """Delete the temporary file."""
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exception_type, exception_value, traceback):
+        self.close()
+
+
 def write_json(file_name: str, data: dict):
     validate_file_access(file_name, write=True, override=True)
     with open(file_name, "w", encoding="utf-8") as file:
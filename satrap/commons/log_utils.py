@@ -6,6 +6,7 @@ from satrap.settings import (
     DEBUG_LOG_FILE_NAME,
     INFO_LOG_FILE_NAME,
     ERROR_LOG_FILE_NAME,
+    FAILED_QUERIES_FILE_NAME,
     LOG_FILES_EXT,
     LOGS_PATH,
     TIMESTAMP_FILES,
@@ -50,6 +51,8 @@ INFO_LOG_FILE = os.path.join(
     f"{LOG_FILES_EXT}"
 )
 
+FAILED_QUERIES_FILE = os.path.join(DATED_LOGS_FOLDER, FAILED_QUERIES_FILE_NAME)
+
 formatter = logging.Formatter(DEFAULT_LOGGING_FORMAT)
 short_date_formatter = logging.Formatter(DEFAULT_LOGGING_FORMAT, datefmt=SHORT_DATE_FORMAT)
 warning_formatter = logging.Formatter(WARNING_LOGGING_FORMAT, datefmt=SHORT_DATE_FORMAT)
@@ -1,16 +1,25 @@
-from typing import Self
+import sys
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from itertools import count
+from typing import Iterator, Self
 
 from satrap.datamanagement.typedb import typedb_constants
 
 
 class VariableDealer:
     """Responsible for giving unique variable names.
-    
-    This version does not support concurrency.
-    """ 
-    # TODO: For concurrency, protect this variable with a lock
-    #       to avoid data races.
+
+    Variables are unique within a scope, e.g. the queries built for one
+    STIX object, and every scope starts again at 'v0'. Scopes are local
+    to the current thread (or context), so that queries can be built
+    concurrently. Outside of a scope, variables are taken from a counter
+    shared by the whole process.
+    """
     counter = 0
+    _lock = threading.Lock()
+    _scope: ContextVar = ContextVar("variable_scope", default=None)
 
     @staticmethod
     def get_variable() -> str:
@@ -19,26 +28,54 @@ class VariableDealer:
         :return: The name of the variable
         :rtype: str
         """
-        var = "v" + str(VariableDealer.counter)
-        VariableDealer.counter += 1
+        scope = VariableDealer._scope.get()
+        if scope is not None:
+            return "v" + str(next(scope))
+
+        with VariableDealer._lock:
+            var = "v" + str(VariableDealer.counter)
+            VariableDealer.counter += 1
         return var
 
+    @staticmethod
+    @contextmanager
+    def scope() -> Iterator[None]:
+        """Opens a new variable scope for the current thread. Variables
+        given inside the scope start at 'v0' and are unique within it.
+        """
+        token = VariableDealer._scope.set(count())
+        try:
+            yield
+        finally:
+            VariableDealer._scope.reset(token)
+
     @staticmethod
     def reset() -> None:
-        """Resets the used variables.
+        """Resets the used variables of the current scope.
 
         After this method call, variables can be returned that 
         have been used before.
         """
-        VariableDealer.counter = 0
+        if VariableDealer._scope.get() is not None:
+            VariableDealer._scope.set(count())
+            return
+        with VariableDealer._lock:
+            VariableDealer.counter = 0
 
 
 class Thing:
     """Represents a Thing object in TypeDB, i.e. entity or relation.
+
+    Things are kept compact, as a whole bundle of them can be held in
+    memory: their slots replace the instance dictionary, the names of
+    types, attributes and variables are interned and the values are
+    stored in tuples, which take less memory than lists.
     
     Note: The Thing object will be deprecated in TypeDB 3.0.
     """
 
+    __slots__ = ("variable", "type", "attributes")
+
     def __init__(
             self,
             variable: str = "",
@@ -58,10 +95,10 @@ class Thing:
         #       Therefore, "variable" is checked here.
         if variable == "":
             variable = VariableDealer.get_variable()
-        self.variable: str = variable
-        self.type: str = typedb_type
-        # Note: For every attribute, a list of values is assigned.
-        self.attributes: dict[str, list[str]] = {}
+        self.variable: str = sys.intern(variable)
+        self.type: str = sys.intern(typedb_type)
+        # Note: For every attribute, a tuple of values is assigned.
+        self.attributes: dict[str, tuple[str, ...]] = {}
     
     def add_attribute(self, name: str, value: str) -> None:
         """Add an attribute to the thing.
@@ -72,16 +109,18 @@ class Thing:
         :type value: str
         """
         if name and value:
-            if not self.attributes.get(name):
-                self.attributes[name] = []
-            self.attributes[name].append(value)
+            values = self.attributes.get(name)
+            if not values:
+                self.attributes[sys.intern(name)] = (value,)
+            else:
+                self.attributes[name] = (*values, value)
 
-    def get_attributes(self) -> dict[str, list[str]]:
+    def get_attributes(self) -> dict[str, tuple[str, ...]]:
         """Returns the names of the attributes and the values that are
         assigned to them.
         
         :return: The names and values assigned to them
-        :rtype: dict[str, list[str]]
+        :rtype: dict[str, tuple[str, ...]]
         """
         return self.attributes
 
@@ -91,7 +130,7 @@ class Thing:
         :param object_type: The type of this thing
         :type object_type: str
         """
-        self.type = object_type
+        self.type = sys.intern(object_type)
 
     def get_type(self) -> str:
         """Returns the type of the Thing.
@@ -116,6 +155,8 @@ class Thing:
 class Entity(Thing):
     """Represents an Entity object in TypeDB."""
 
+    __slots__ = ()
+
     def __init__(
             self,
             variable: str = "",
@@ -143,6 +184,8 @@ class Entity(Thing):
 class Relation(Thing):
     """Represents a Relation object in TypeDB."""
 
+    __slots__ = ("plays_roles",)
+
     def __init__(
             self,
             variable: str = "", 
@@ -159,9 +202,9 @@ class Relation(Thing):
         """
         super().__init__(variable, typedb_type)
         # Note: For every role, a variable is assigned.
-        #       So the dict is in {role: [variable]} format
+        #       So the dict is in {role: (variable,)} format
         #       as in TypeQL queries.
-        self.plays_roles: dict[str, list[str]] = {}
+        self.plays_roles: dict[str, tuple[str, ...]] = {}
 
     def __eq__(self, other: Self) -> bool:
         # Note: Variables are not relevant for equivalence
@@ -179,16 +222,18 @@ class Relation(Thing):
         :param variable: The variable of the entity that plays the role
         :type variable: str
         """
-        if self.plays_roles.get(role):
-            self.plays_roles[role].append(variable)
+        variable = sys.intern(variable)
+        variables = self.plays_roles.get(role)
+        if not variables:
+            self.plays_roles[sys.intern(role)] = (variable,)
         else:
-            self.plays_roles.update({role: [variable]})
+            self.plays_roles[role] = (*variables, variable)
 
-    def get_roles(self) -> dict[str, list[str]]:
+    def get_roles(self) -> dict[str, tuple[str, ...]]:
         """Returns the names and variables of the roles.
         
         :return: The names and variables of the roles
-        :rtype: dict[str, list[str]]
+        :rtype: dict[str, tuple[str, ...]]
         """
         return self.plays_roles
 
@@ -198,12 +243,19 @@ class Relation(Thing):
 
 class InsertQuery:
     """Structure containing a set of TypeDb types/Things (entity, relation, attribute) that can be 
-    mapped to an Insert query in TypeQL."""
+    mapped to an Insert query in TypeQL.
+
+    A query can carry TypeQL delete queries, run before the insertion in
+    the same transaction, e.g. to replace the stored version of an object.
+    """
+
+    __slots__ = ("match_clause", "insert_clause", "delete_queries")
 
     def __init__(self):
         """Empty Insert query structure"""
         self.match_clause: list[Thing] = []
         self.insert_clause: list[Thing] = []
+        self.delete_queries: tuple[str, ...] = ()
 
     def add_to_match_clause(self, instance: Thing) -> None:
         """Add an instance of a type (or object) to the match clause.
@@ -237,6 +289,23 @@ class InsertQuery:
         """
         return self.insert_clause
 
+    def add_delete_queries(self, queries: list[str]) -> None:
+        """Add TypeQL delete queries to be run before the insertion, in
+        the same transaction.
+
+        :param queries: The TypeQL delete queries
+        :type queries: list[str]
+        """
+        self.delete_queries = (*self.delete_queries, *queries)
+
+    def get_delete_queries(self) -> tuple[str, ...]:
+        """Returns the TypeQL delete queries run before the insertion.
+
+        :return: The TypeQL delete queries
+        :rtype: tuple[str, ...]
+        """
+        return self.delete_queries
+
     def is_empty(self) -> bool:
         """States whether this InsertQuery is empty, i.e. whether there
         is no insertion.
@@ -254,6 +323,7 @@ class InsertQuery:
         """
         self.match_clause.extend(insert_query.get_match_clause())
         self.insert_clause.extend(insert_query.get_insert_clause())
+        self.add_delete_queries(insert_query.get_delete_queries())
 
     def __str__(self):
         res = "match: ["
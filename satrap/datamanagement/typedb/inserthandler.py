@@ -1,17 +1,125 @@
+import re
+import time
+import threading
+
 from typedb.driver import TypeDB, SessionType, TransactionType, TypeDBDriverException
 
 from satrap.commons.log_utils import logger
 from satrap.etl.exceptions import LoadingError
-from satrap.datamanagement.typedb.typedb_constants import NON_EMPTY_SERVER, NON_EMPTY_DB
+from satrap.datamanagement.typedb.typedb_constants import (
+    NON_EMPTY_SERVER, NON_EMPTY_DB, MATCH_KEYWORD, DRIVER_ERROR_PREFIXES, WRITE_CONFLICT_CODES
+)
+
+
+NO_MATCH = "No data matching the 'match' clause found"
+# code at the start of the message of the errors of the native driver, e.g. [CXN01]
+ERROR_CODE = re.compile(r"\[([A-Z]{3}\d+)\]")
+
+
+def get_error_code(err: TypeDBDriverException) -> str:
+    """Returns the code of a TypeDB error, e.g. CXN01.
+
+    :param err: The error raised by the TypeDB driver
+    :type err: TypeDBDriverException
+
+    :return: The error code, "" if the error has none
+    :rtype: str
+    """
+    if getattr(err, "error_message", None) is not None:
+        return err.error_message.code()
+    code = ERROR_CODE.match(str(err).lstrip())
+    return code.group(1) if code else ""
+
+
+def is_driver_error(err: TypeDBDriverException) -> bool:
+    """States whether a TypeDB error is raised by the driver itself, e.g.
+    a lost connection, rather than by the queries of a transaction.
+
+    :param err: The error raised by the TypeDB driver
+    :type err: TypeDBDriverException
+
+    :return: True if the error is not caused by the queries
+    :rtype: bool
+    """
+    return get_error_code(err).startswith(DRIVER_ERROR_PREFIXES)
+
+
+def is_write_conflict(err: TypeDBDriverException) -> bool:
+    """States whether a TypeDB error is caused by a conflict between
+    concurrent write transactions, by its error code.
+
+    :param err: The error raised by the TypeDB driver
+    :type err: TypeDBDriverException
+
+    :return: True if the transaction can be retried
+    :rtype: bool
+    """
+    return get_error_code(err) in WRITE_CONFLICT_CODES
 
 
 class TypeDBBatchInsertHandler:
-    """Executes TypeDB insert queries on a TypeDB database instance."""
+    """Executes TypeDB insert queries on a TypeDB database instance.
 
-    def __init__(self, server_address, database_name):
+    A single data session on the database is opened when entering the
+    handler and reused by all the insertions. Transactions can be run
+    concurrently from several threads.
+    """
+
+    def __init__(
+            self,
+            server_address,
+            database_name,
+            conflict_retries: int = 0,
+            retry_backoff: float = 0.1
+        ):
+        """Instantiate the handler.
+
+        :param server_address: The address (host:port) of the TypeDB server
+        :type server_address: str
+        :param database_name: The name of the database
+        :type database_name: str
+        :param conflict_retries: The number of times a transaction is retried
+            after a write conflict with a concurrent transaction
+        :type conflict_retries: int, optional
+        :param retry_backoff: The waiting time in seconds before the first
+            retry, doubled for every following retry
+        :type retry_backoff: float, optional
+        """
         self.server_address = server_address
         self.database_name = database_name
+        self.conflict_retries = conflict_retries
+        self.retry_backoff = retry_backoff
         self.driver = None
+        self.session = None
+        self._session_lock = threading.Lock()
+
+
+    def check_database(self, database_name: str) -> None:
+        """Checks that a database exists on the server.
+
+        :param database_name: The name of the database
+        :type database_name: str
+
+        :raises ValueError: If the database does not exist
+        """
+        if not self.driver.databases.contains(database_name):
+            raise ValueError(
+                f"The database '{database_name}' does not exist at '{self.server_address}'")
+
+
+    def get_session(self):
+        """Returns the data session on the database of the handler, 
+        reopened if it has been closed, e.g. after a timeout.
+
+        :return: An open data session
+        :rtype: TypeDBSession
+        """
+        with self._session_lock:
+            if self.session is None or not self.session.is_open():
+                if self.session is not None:
+                    logger.debug("Session on '%s' closed, reopening", self.database_name)
+                self.session = self.driver.session(self.database_name, SessionType.DATA)
+            return self.session
 
 
     def insert(self, queries: list[str], database_name="") -> bool:
@@ -20,21 +128,78 @@ class TypeDBBatchInsertHandler:
         :param queries: The queries that should be inserted
         :type queries: list[str]
         :param database_name: The name of the database where the queries 
-            should be inserted to
+            should be inserted to, the database of the handler if not given
         :type database_name: str, optional
 
         :return: True if the set was successfully inserted, False otherwise
         :rtype: bool
         """
-        if not database_name:
-            database_name = self.database_name
+        error = self.try_insert(queries, database_name)
+        if error is not None:
+            logger.error(error)
+        return error is None
 
-        if not self.driver.databases.contains(database_name):
-            raise ValueError(
-                f"The database '{database_name}' does not exist at '{self.server_address}'")
 
+    def try_insert(
+            self,
+            queries: list[str],
+            database_name="",
+            require_match=False,
+            deletes: dict[str, tuple[str, ...]] = None
+        ) -> LoadingError:
+        """Inserts a set of queries in one transaction, without logging
+        a failure.
+
+        :param queries: The queries that should be inserted
+        :type queries: list[str]
+        :param database_name: The name of the database where the queries 
+            should be inserted to, the database of the handler if not given
+        :type database_name: str, optional
+        :param require_match: True to fail if a query with a match clause
+            inserts nothing, instead of logging a warning
+        :type require_match: bool, optional
+        :param deletes: The delete queries run before an insert query, in
+            the same transaction, by insert query
+        :type deletes: dict[str, tuple[str, ...]], optional
+
+        :raises TypeDBDriverException: If the connection to the server is
+            lost or the driver fails
+
+        :return: None if the set was successfully inserted, the error otherwise
+        :rtype: LoadingError
+        """
+        if not database_name or database_name == self.database_name:
+            return self.run_transaction(self.get_session(), queries, require_match, deletes)
+
+        # other databases are accessed through a dedicated session
+        self.check_database(database_name)
         with self.driver.session(database_name, SessionType.DATA) as session:
-            return self.manage_transactions(session, queries)
+            return self.run_transaction(session, queries, require_match, deletes)
+
+
+    def delete(self, queries: list[str]) -> bool:
+        """Runs a set of delete queries in one write transaction.
+
+        :param queries: The TypeQL delete queries
+        :type queries: list[str]
+
+        :raises TypeDBDriverException: If the connection to the server is
+            lost or the driver fails, see is_driver_error
+
+        :return: True if the set was successfully committed, False otherwise
+        :rtype: bool
+        """
+        with self.get_session().transaction(TransactionType.WRITE) as transaction:
+            try:
+                for query in queries:
+                    transaction.query.delete(query).resolve()
+                transaction.commit()
+            except TypeDBDriverException as err:
+                if is_driver_error(err):
+                    raise
+                logger.error(LoadingError(err.message, query, len(queries)))
+                return False
+        return True
 
 
     def manage_transactions(self, session, queries: list[str]) -> bool:
@@ -48,20 +213,70 @@ class TypeDBBatchInsertHandler:
         :return: True if all queries were successfully inserted, False otherwise
         :rtype: bool
         """
-        with session.transaction(TransactionType.WRITE) as transaction:
-            try:
-                for query in queries:
-                    # logger.debug("Inserting:\n %s", query)
-                    r = transaction.query.insert(query)
-                    if len(list(r)) == 0:
-                        logger.warning(
-                            "The following query did no insertions. Data matching "
-                            "the 'match' clause might not have been found:\n%s", query)
-                transaction.commit()
-                return True
-            except TypeDBDriverException as err:
-                logger.error(LoadingError(err.message, query, len(queries)))
-                return False
+        error = self.run_transaction(session, queries)
+        if error is not None:
+            logger.error(error)
+        return error is None
+
+
+    def run_transaction(
+            self,
+            session,
+            queries: list[str],
+            require_match=False,
+            deletes: dict[str, tuple[str, ...]] = None
+        ) -> LoadingError:
+        """Inserts queries in one write transaction, retried after write
+        conflicts.
+
+        The answers of the insert queries are not streamed back: queries
+        without match clause always insert, and for the others only the
+        first answer is read to detect that nothing was inserted.
+
+        :param session: A Data session on the database on which the 
+            queries should be executed.
+        :type session: TypeDBSession
+        :param queries: The queries that should be inserted
+        :type queries: list[str]
+        :param require_match: True to fail if a query with a match clause
+            inserts nothing, instead of logging a warning
+        :type require_match: bool, optional
+        :param deletes: The delete queries run before an insert query, in
+            the same transaction, by insert query
+        :type deletes: dict[str, tuple[str, ...]], optional
+        :raises TypeDBDriverException: If the connection to the server is
+            lost or the driver fails, see is_driver_error
+
+        :return: None if all queries were successfully inserted, the error otherwise
+        :rtype: LoadingError
+        """
+        deletes = deletes or {}
+        attempt = 0
+        while True:
+            with session.transaction(TransactionType.WRITE) as transaction:
+                try:
+                    for query in queries:
+                        for delete in deletes.get(query, ()):
+                            transaction.query.delete(delete).resolve()
+                        # logger.debug("Inserting:\n %s", query)
+                        r = transaction.query.insert(query)
+                        if query.startswith(MATCH_KEYWORD) and next(iter(r), None) is None:
+                            if require_match:
+                                return LoadingError(NO_MATCH, query, len(queries))
+                            logger.warning(
+                                "The following query did no insertions. Data matching "
+                                "the 'match' clause might not have been found:\n%s", query)
+                    transaction.commit()
+                    return None
+                except TypeDBDriverException as err:
+                    if is_driver_error(err):
+                        raise
+                    if attempt >= self.conflict_retries or not is_write_conflict(err):
+                        return LoadingError(err.message, query, len(queries))
+            attempt += 1
+            logger.warning("Write conflict, retrying transaction (%d/%d)",
+                           attempt, self.conflict_retries)
+            time.sleep(self.retry_backoff * 2 ** (attempt - 1))
 
 
     def __enter__(self):
@@ -71,9 +286,18 @@ class TypeDBBatchInsertHandler:
             raise ValueError(NON_EMPTY_DB)
 
         self.driver = TypeDB.core_driver(self.server_address)
+        try:
+            self.check_database(self.database_name)
+            self.get_session()
+        except Exception:
+            self.driver.close()
+            raise
         return self
 
 
     def __exit__(self, exception_type, exception_value, traceback):
+        if self.session is not None and self.session.is_open():
+            self.session.close()
+        self.session = None
         self.driver.close()
         return traceback is None
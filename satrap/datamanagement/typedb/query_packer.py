@@ -0,0 +1,107 @@
+from satrap.datamanagement.typedb.dataobjects import InsertQuery, Relation, Thing
+from satrap.etl.transform.stix_typeql_constants import TYPEDB_ID_ATTRIBUTE
+
+
+class QueryPacker:
+    """Class for packing several insert queries into one.
+
+    The queries of a pack are merged into a single insert query, whose
+    match clause looks up every instance identified by the same key
+    attribute (e.g. a hub object referenced by many relationships) only
+    once. The variables of every query are renamed to avoid collisions,
+    and the delete queries of the queries are run before the merged query.
+    """
+
+    @staticmethod
+    def pack(queries: list[InsertQuery], pack_size: int) -> list[list[InsertQuery]]:
+        """Split insert queries in packs of consecutive queries.
+
+        :param queries: The insert queries
+        :type queries: list[InsertQuery]
+        :param pack_size: The maximum number of queries in a pack
+        :type pack_size: int
+
+        :return: The packs of queries
+        :rtype: list[list[InsertQuery]]
+        """
+        pack_size = max(1, pack_size)
+        return [queries[i:i + pack_size] for i in range(0, len(queries), pack_size)]
+
+    @staticmethod
+    def merge(queries: list[InsertQuery]) -> InsertQuery:
+        """Merge insert queries into one, deduplicating the instances of
+        the match clauses identified by the same type and key attribute.
+
+        The given queries are not modified.
+
+        :param queries: The insert queries
+        :type queries: list[InsertQuery]
+
+        :return: The merged insert query
+        :rtype: InsertQuery
+        """
+        merged = InsertQuery()
+        matched: dict[tuple, str] = {}
+
+        for number, query in enumerate(queries):
+            prefix = f"p{number}"
+            renaming = {}
+            for thing in query.get_match_clause():
+                key = QueryPacker.get_key(thing)
+                if key is not None and key in matched:
+                    renaming[thing.get_variable()] = matched[key]
+                    continue
+                renaming[thing.get_variable()] = prefix + thing.get_variable()
+                if key is not None:
+                    matched[key] = renaming[thing.get_variable()]
+                merged.add_to_match_clause(QueryPacker.rename(thing, renaming))
+            for thing in query.get_insert_clause():
+                # the things bound in the match clause keep their renaming
+                renaming.setdefault(thing.get_variable(), prefix + thing.get_variable())
+            for thing in query.get_insert_clause():
+                merged.add_to_insert_clause(QueryPacker.rename(thing, renaming))
+            merged.add_delete_queries(query.get_delete_queries())
+
+        return merged
+
+    @staticmethod
+    def get_key(thing: Thing) -> tuple:
+        """Returns what identifies the instance matched by a thing.
+
+        :param thing: A thing of a match clause
+        :type thing: Thing
+
+        :return: The type and attributes of the thing, None if it has no
+            key attribute or has roleplayers
+        :rtype: tuple
+        """
+        attributes = thing.get_attributes()
+        if TYPEDB_ID_ATTRIBUTE not in attributes:
+            return None
+        if isinstance(thing, Relation) and thing.get_roles():
+            return None
+        return thing.get_type(), tuple(
+            (name, tuple(values)) for name, values in sorted(attributes.items())
+        )
+
+    @staticmethod
+    def rename(thing: Thing, renaming: dict[str, str]) -> Thing:
+        """Create a copy of a thing with renamed variables.
+
+        :param thing: The thing to copy
+        :type thing: Thing
+        :param renaming: The new name of every variable
+        :type renaming: dict[str, str]
+
+        :return: The copy of the thing
+        :rtype: Thing
+        """
+        copy = type(thing)(renaming[thing.get_variable()], thing.get_type())
+        for name, values in thing.get_attributes().items():
+            for value in values:
+                copy.add_attribute(name, value)
+        if isinstance(thing, Relation):
+            for role, variables in thing.get_roles().items():
+                for variable in variables:
+                    copy.add_roleplayer(role, renaming.get(variable, variable))
+        return copy
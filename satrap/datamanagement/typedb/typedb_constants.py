@@ -46,6 +46,15 @@ ALT_STRING_DELIMITER = "'"
 ENTITY_MARKING = "entity"
 RELATION_MARKING = "relation"
 
+# Prefixes of the codes of the errors raised by the TypeDB driver itself,
+# as opposed to the errors of the queries reported by the server:
+# connection (CXN), internal (INT) and Python driver (PDR) errors
+DRIVER_ERROR_PREFIXES = ("CXN", "INT", "PDR")
+# Codes of the transaction isolation violations of the TypeDB 2.x server,
+# raised when committing writes conflicting with a concurrent transaction
+# (modify/delete, delete/modify and exclusive create)
+WRITE_CONFLICT_CODES = frozenset({"TXN15", "TXN16", "TXN17"})
+
 # Log messages
 NON_EMPTY_SERVER = "The server address must not be 'None' or empty."
 NON_EMPTY_DB = "The database name must not be 'None' or empty."
@@ -88,6 +88,29 @@ def fetch_query(server_addr: str, db_name: str, query: str) -> list:
     return res
 
 
+def get_stix_versions(server_addr: str, db_name: str) -> dict[str, tuple[str, str]]:
+    """Read the STIX objects stored in a database with their version and
+    type, in a single fetch query.
+
+    :param server_addr: The address of the TypeDB server
+    :type server_addr: str
+    :param db_name: The name of the database
+    :type db_name: str
+    :return: The 'modified' timestamp (None for the objects without one,
+        e.g. SCOs) and the TypeDB type of every stored stix-id
+    :rtype: dict[str, tuple[str, str]]
+    """
+    query = "match $object has stix-id $id; fetch $id; $object: modified;"
+    versions = {}
+    for answer in fetch_query(server_addr, db_name, query):
+        modified = answer["object"]["modified"]
+        versions[answer["id"]["value"]] = (
+            modified[0]["value"] if modified else None,
+            answer["object"]["type"]["label"]
+        )
+    return versions
+
+
 def get_query(server_addr: str, db_name: str, query: str, inference: bool=False) -> list:
     """Run a get query on a TypeDB database.
 
@@ -1,10 +1,21 @@
 from satrap.datamanagement.typedb import typedb_constants
 from satrap.datamanagement.typedb.dataobjects import Entity, InsertQuery, Relation, Thing
 
+_TYPE_PREFIX = (typedb_constants.BEFORE_TYPEKEYWORD_SEPARATOR
+                + typedb_constants.TYPE_KEYWORD
+                + typedb_constants.TYPEKEYWORD_TYPE_SEPARATOR)
+_ROLE_VARIABLE_PREFIX = typedb_constants.ROLE_VARIABLE_SEPARATOR + typedb_constants.VARIABLE_PREFIX
+
 
 class TypeQLBuilder:
     """Class for building the TypeQL representations of 
     TypeDB components.
+
+    The build_* methods return the TypeQL strings of the components. They
+    rely on write_* methods appending the fragments of the TypeQL
+    representations to a shared buffer (a list of strings), which is
+    joined once, so that building a query is linear in its size. The
+    given components are not modified.
     """
 
     @staticmethod
@@ -17,11 +28,24 @@ class TypeQLBuilder:
         :return: The TypeQL string for this Entity
         :rtype: str
         """
-        res = TypeQLBuilder.build_variable(entity.get_variable())
-        res += TypeQLBuilder.build_typeql_type(entity.get_type())
-        res += TypeQLBuilder.build_many_attributes(entity.get_attributes())
-        res += TypeQLBuilder.build_end()
-        return res
+        out = []
+        TypeQLBuilder.write_entity(entity, out)
+        return "".join(out)
+
+    @staticmethod
+    def write_entity(entity: Entity, out: list[str]) -> None:
+        """Append the TypeQL representation of an Entity to a buffer.
+
+        :param entity: The entity to transform
+        :type entity: Entity
+        :param out: The buffer of TypeQL fragments
+        :type out: list[str]
+        """
+        out.append(typedb_constants.VARIABLE_PREFIX)
+        out.append(entity.get_variable())
+        TypeQLBuilder.write_typeql_type(entity.get_type(), out)
+        TypeQLBuilder.write_many_attributes(entity.get_attributes(), out)
+        out.append(typedb_constants.OBJECT_ENDING)
 
     @staticmethod
     def build_relation(relation: Relation) -> str:
@@ -33,13 +57,26 @@ class TypeQLBuilder:
         :return: The TypeQL string for this Relation
         :rtype: str
         """
-        res = TypeQLBuilder.build_variable(relation.get_variable())
-        res += typedb_constants.VARIABLE_RELATION_SEPARATOR
-        res += TypeQLBuilder.build_all_roles(relation.get_roles())
-        res += TypeQLBuilder.build_typeql_type(relation.get_type())
-        res += TypeQLBuilder.build_many_attributes(relation.get_attributes())
-        res += TypeQLBuilder.build_end()
-        return res
+        out = []
+        TypeQLBuilder.write_relation(relation, out)
+        return "".join(out)
+
+    @staticmethod
+    def write_relation(relation: Relation, out: list[str]) -> None:
+        """Append the TypeQL representation of a Relation to a buffer.
+
+        :param relation: The relation to transform
+        :type relation: Relation
+        :param out: The buffer of TypeQL fragments
+        :type out: list[str]
+        """
+        out.append(typedb_constants.VARIABLE_PREFIX)
+        out.append(relation.get_variable())
+        out.append(typedb_constants.VARIABLE_RELATION_SEPARATOR)
+        TypeQLBuilder.write_all_roles(relation.get_roles(), out)
+        TypeQLBuilder.write_typeql_type(relation.get_type(), out)
+        TypeQLBuilder.write_many_attributes(relation.get_attributes(), out)
+        out.append(typedb_constants.OBJECT_ENDING)
 
     @staticmethod
     def build_thing(thing: Thing) -> str:
@@ -48,16 +85,53 @@ class TypeQLBuilder:
         :param thing: The thing to transform
         :type thing: Thing
 
+        :raises ValueError: If the Thing object is neither an entity,
+            nor a relation.
+        """
+        out = []
+        TypeQLBuilder.write_thing(thing, out)
+        return "".join(out)
+
+    @staticmethod
+    def write_thing(thing: Thing, out: list[str]) -> None:
+        """Append the TypeQL representation of a thing to a buffer.
+
+        :param thing: The thing to transform
+        :type thing: Thing
+        :param out: The buffer of TypeQL fragments
+        :type out: list[str]
+
         :raises ValueError: If the Thing object is neither an entity,
             nor a relation.
         """
         if isinstance(thing, Entity):
-            return TypeQLBuilder.build_entity(thing)
+            TypeQLBuilder.write_entity(thing, out)
         elif isinstance(thing, Relation):
-            return TypeQLBuilder.build_relation(thing)
+            TypeQLBuilder.write_relation(thing, out)
         else:
             raise ValueError("Thing is neither Entity nor Relation")
 
+    @staticmethod
+    def write_ownerships(thing: Thing, out: list[str]) -> None:
+        """Append the TypeQL representation of the attributes of a thing
+        bound in the match clause to a buffer. The thing is not inserted,
+        it only gets the attributes (e.g. '$v0 has name "x";').
+
+        :param thing: The thing whose attributes are inserted
+        :type thing: Thing
+        :param out: The buffer of TypeQL fragments
+        :type out: list[str]
+        """
+        out.append(typedb_constants.VARIABLE_PREFIX)
+        out.append(thing.get_variable())
+        out.append(typedb_constants.BEFORE_TYPEKEYWORD_SEPARATOR)
+        start = len(out)
+        TypeQLBuilder.write_many_attributes(thing.get_attributes(), out)
+        if len(out) > start:
+            # no separator before the first attribute
+            out[start] = out[start].removeprefix(typedb_constants.ATTRIBUTE_SEPARATOR)
+        out.append(typedb_constants.OBJECT_ENDING)
+
     @staticmethod
     def build_insert_query(insert_query: InsertQuery) -> str:
         """Create the TypeQL representation of an Insert Query.
@@ -68,22 +142,42 @@ class TypeQLBuilder:
         :return: The TypeQL representation for this InsertQuery
         :rtype: str
         """
+        out = []
+        TypeQLBuilder.write_insert_query(insert_query, out)
+        return "".join(out)
+
+    @staticmethod
+    def write_insert_query(insert_query: InsertQuery, out: list[str]) -> None:
+        """Append the TypeQL representation of an Insert Query to a buffer.
+
+        A thing of the insert clause whose variable is bound in the match
+        clause is not inserted again: only its attributes are inserted.
+        The delete queries of the Insert Query are not part of it.
+
+        :param insert_query: The Insert Query to transform
+        :type insert_query: InsertQuery
+        :param out: The buffer of TypeQL fragments
+        :type out: list[str]
+        """
         if insert_query.is_empty():
-            return ""
+            return
         matches = insert_query.get_match_clause()
-        res = ""
+        bound = ()
         if matches:
-            res += (typedb_constants.MATCH_KEYWORD
-                    + typedb_constants.KEYWORD_SEPARATOR)
+            out.append(typedb_constants.MATCH_KEYWORD)
+            out.append(typedb_constants.KEYWORD_SEPARATOR)
             for match in matches:
-                res += (TypeQLBuilder.build_thing(match)
-                        + typedb_constants.OBJECT_SEPARATOR)
-        res += (typedb_constants.INSERT_KEYWORD
-                + typedb_constants.KEYWORD_SEPARATOR)
+                TypeQLBuilder.write_thing(match, out)
+                out.append(typedb_constants.OBJECT_SEPARATOR)
+            bound = {match.get_variable() for match in matches}
+        out.append(typedb_constants.INSERT_KEYWORD)
+        out.append(typedb_constants.KEYWORD_SEPARATOR)
         for thing in insert_query.get_insert_clause():
-            res += (TypeQLBuilder.build_thing(thing)
-                    + typedb_constants.OBJECT_SEPARATOR)
-        return res
+            if thing.get_variable() in bound:
+                TypeQLBuilder.write_ownerships(thing, out)
+            else:
+                TypeQLBuilder.write_thing(thing, out)
+            out.append(typedb_constants.OBJECT_SEPARATOR)
 
     @staticmethod
     def build_variable(variable: str) -> str:
@@ -116,21 +210,38 @@ class TypeQLBuilder:
                 + value)
 
     @staticmethod
-    def build_many_attributes(attributes: dict[str, list[str]]) -> str:
+    def build_many_attributes(attributes: dict[str, tuple[str, ...]]) -> str:
         """Create the TypeQL representation of many attributes.
 
         :param attributes: The names and values of the attributes
-        :type attributes: dict[str, list[str]]
+        :type attributes: dict[str, tuple[str, ...]]
 
         :return: The TypeQL representation of the attributes
         :rtype: str
         """
-        res = ""
+        out = []
+        TypeQLBuilder.write_many_attributes(attributes, out)
+        return "".join(out)
+
+    @staticmethod
+    def write_many_attributes(attributes: dict[str, tuple[str, ...]], out: list[str]) -> None:
+        """Append the TypeQL representation of many attributes to a buffer,
+        each one preceded by the attribute separator.
+
+        :param attributes: The names and values of the attributes
+        :type attributes: dict[str, tuple[str, ...]]
+        :param out: The buffer of TypeQL fragments
+        :type out: list[str]
+        """
         for name, values in attributes.items():
+            prefix = (typedb_constants.ATTRIBUTE_SEPARATOR
+                      + typedb_constants.ATTRIBUTE_KEYWORD
+                      + typedb_constants.ATTRIBUTE_KEYWORD_KEY_SEPARATOR
+                      + name
+                      + typedb_constants.ATTRIBUTE_KEY_VALUE_SEPARATOR)
             for value in values:
-                attribute = TypeQLBuilder.build_attribute(name, value)
-                res += (typedb_constants.ATTRIBUTE_SEPARATOR + attribute)
-        return res
+                out.append(prefix)
+                out.append(value)
 
     @staticmethod
     def build_typeql_type(type:str) -> str:
@@ -147,6 +258,18 @@ class TypeQLBuilder:
                 + typedb_constants.TYPEKEYWORD_TYPE_SEPARATOR
                 + type)
 
+    @staticmethod
+    def write_typeql_type(type: str, out: list[str]) -> None:
+        """Append the TypeQL representation of the type of a thing to a buffer.
+
+        :param type: The name of the type.
+        :type type: str
+        :param out: The buffer of TypeQL fragments
+        :type out: list[str]
+        """
+        out.append(_TYPE_PREFIX)
+        out.append(type)
+
     @staticmethod
     def build_role(role_name: str, variable_name: str) -> str:
         """Create the TypeQL representation of a role in a relation.
@@ -164,31 +287,47 @@ class TypeQLBuilder:
                 + TypeQLBuilder.build_variable(variable_name))
 
     @staticmethod
-    def build_all_roles(roles: dict[str, str]) -> str:
+    def build_all_roles(roles: dict[str, tuple[str, ...]]) -> str:
         """Create the TypeQL representation of all roles in a relation.
 
         :param roles: The names and variables of the roles
-        :type roles: dict[str, str]
+        :type roles: dict[str, tuple[str, ...]]
 
         :raises ValueError: If the roles are empty.
 
         :return: The TypeQL representation of the roles
         :rtype: str
         """
+        out = []
+        TypeQLBuilder.write_all_roles(roles, out)
+        return "".join(out)
+
+    @staticmethod
+    def write_all_roles(roles: dict[str, tuple[str, ...]], out: list[str]) -> None:
+        """Append the TypeQL representation of all roles in a relation to
+        a buffer. The last role is written first, followed by the others
+        in order.
+
+        :param roles: The names and variables of the roles
+        :type roles: dict[str, tuple[str, ...]]
+        :param out: The buffer of TypeQL fragments
+        :type out: list[str]
+
+        :raises ValueError: If the roles are empty.
+        """
         if not roles:
             raise ValueError("Relation must have at least one role")
-        rel = typedb_constants.ROLES_BEGINNING
-        role, variables = roles.popitem()
-        for variable in variables[:len(variables)-1]:
-            rel += TypeQLBuilder.build_role(role, variable)
-            rel += typedb_constants.ROLE_SEPARATOR
-        rel += TypeQLBuilder.build_role(role, variables[-1])
-        for role, variables in roles.items():
-            for variable in variables:
-                rel += (typedb_constants.ROLE_SEPARATOR
-                        + TypeQLBuilder.build_role(role, variable))
-        rel += typedb_constants.ROLES_ENDING
-        return rel
+        last = next(reversed(roles))
+        out.append(typedb_constants.ROLES_BEGINNING)
+        separator = ""
+        for role in (last, *(role for role in roles if role != last)):
+            for variable in roles[role]:
+                out.append(separator)
+                out.append(role)
+                out.append(_ROLE_VARIABLE_PREFIX)
+                out.append(variable)
+                separator = typedb_constants.ROLE_SEPARATOR
+        out.append(typedb_constants.ROLES_ENDING)
 
     @staticmethod
     def build_end() -> str:
@@ -1,13 +1,99 @@
 import os
+import queue
+import threading
+from contextlib import nullcontext
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from timeit import default_timer as timer
 
 import satrap.etl.extract.extract_constants as extract_cts
+import satrap.etl.load.load_constants as load_cts
 from satrap.etl.extract.extractor import Extractor
 from satrap.etl.transform.transformer import STIXtoTypeQLTransformer
+from satrap.etl.transform.transform_cache import TransformCache
 from satrap.etl.load.loader import TypeDBLoader
+from satrap.etl.load.journal import LoadJournal
+from satrap.etl.load.upsert import Upserter
+from satrap.etl.load.typeql_export import TypeQLExporter, PHASE_FILES, read_typeql
 from satrap.etl.exceptions import ExtractionError
+from satrap.commons import file_utils
 from satrap import settings as conf
 from satrap.commons.log_utils import logger
 
+# transformer of a worker process of the parallel transformation
+_worker_transformer = None
+
+
+def _init_transform_worker(transformer_cls):
+    """Create the transformer used by a worker process."""
+    global _worker_transformer
+    _worker_transformer = transformer_cls()
+
+
+def _transform_chunk(stix_objects: list) -> list:
+    """Transform a chunk of STIX objects in a worker process."""
+    return [_worker_transformer.transform(stix_object) for stix_object in stix_objects]
+
+
+class _BackgroundIterator:
+    """Iterates over an iterable in a background thread, ahead of the
+    consumer, through a bounded queue of batches.
+
+    The producer blocks when the queue is full (back-pressure) and
+    exceptions raised by the iterable are re-raised to the consumer.
+    """
+
+    _DONE = object()
+
+    def __init__(self, iterable, batch_size: int, depth: int):
+        self.iterable = iterable
+        self.batch_size = batch_size
+        self.buffer = queue.Queue(maxsize=depth)
+        self.stop = threading.Event()
+        # time spent by the producer iterating, without waiting for the consumer
+        self.produce_time = 0.0
+
+    def _put(self, item) -> bool:
+        while not self.stop.is_set():
+            try:
+                self.buffer.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _produce(self):
+        try:
+            items = iter(self.iterable)
+            while True:
+                start = timer()
+                batch = list(islice(items, self.batch_size))
+                self.produce_time += timer() - start
+                if not batch:
+                    break
+                if not self._put(batch):
+                    return
+            result = self._DONE
+        except BaseException as e:
+            result = e
+        self._put(result)
+
+    def __iter__(self):
+        thread = threading.Thread(target=self._produce, daemon=True)
+        thread.start()
+        try:
+            while True:
+                batch = self.buffer.get()
+                if batch is self._DONE:
+                    return
+                if isinstance(batch, BaseException):
+                    raise batch
+                yield from batch
+        finally:
+            self.stop.set()
+            thread.join()
+
 
 class ETLOrchestrator:
     """ETL Orchestrator for managing the Extract, Transform, and Load process."""
@@ -50,23 +136,75 @@ class ETLOrchestrator:
         self.extractor.fetch(source, **args)
         logger.info("Extraction completed into %s", store_at)
 
-    def transform(self, datasrc_path):
-        """Transform the STIX objects in the file at the given path."""
-        logger.info("Starting transformation")
+    def transform_iter(
+        self, datasrc_path, stream=False, trusted=False, workers=1, upserter=None,
+        cache=None
+    ):
+        """Lazily transform the STIX objects in the file at the given path.
+
+        :param datasrc_path: The filepath of the STIX bundle to be transformed.
+        :param stream: True to read the bundle incrementally, one object at a time.
+        :param trusted: True to transform the STIX objects as plain dictionaries,
+            skipping their (full) validation with stix2.
+        :param workers: The number of processes transforming the STIX objects.
+        :param upserter: The upserter selecting the objects not yet stored in
+            the database, see Upserter.
+        :param cache: The cache of the objects transformed by previous runs,
+            see TransformCache.
+
+        :return: A generator of the (entity, SRO, embedded relation) insert
+            queries of each STIX object, in the order of the objects in the
+            bundle. Objects that cannot be transformed are skipped.
+        """
         if self.extractor.get_extractor_type() == extract_cts.STIX_READER:
             stix_extractor = self.extractor
         else:
             stix_extractor = Extractor.get_extractor(extract_cts.STIX_READER)
-        stix_objects = stix_extractor.fetch(datasrc_path)
+        stix_objects = stix_extractor.fetch(
+            datasrc_path, **{extract_cts.STREAM: stream, extract_cts.TRUSTED: trusted}
+        )
+        if upserter is not None:
+            stix_objects = upserter.select(stix_objects)
 
-        transformer = self.transformer_cls()
-        entity_queries, sro_queries, embedded_relation_queries = [], [], []
+        if workers and workers > 1:
+            transformed_objects = self._transform_parallel(stix_objects, workers, cache)
+        elif cache is not None:
+            transformer = self.transformer_cls()
+            transformed_objects = (
+                cache.transform(stix_object, transformer.transform)
+                for stix_object in stix_objects
+            )
+        else:
+            transformer = self.transformer_cls()
+            transformed_objects = map(transformer.transform, stix_objects)
 
-        for stix_object in stix_objects:
-            transformed = transformer.transform(stix_object)
-            if transformed is None:
-                continue
+        for transformed in transformed_objects:
+            if transformed is not None:
+                yield transformed if upserter is None else upserter.route(transformed)
+
+    def transform(
+        self, datasrc_path, stream=False, trusted=False, workers=1, upserter=None,
+        cache=None
+    ):
+        """Transform the STIX objects in the file at the given path.
+
+        :param datasrc_path: The filepath of the STIX bundle to be transformed.
+        :param stream: True to read the bundle incrementally, one object at a time.
+        :param trusted: True to transform the STIX objects as plain dictionaries,
+            skipping their (full) validation with stix2.
+        :param workers: The number of processes transforming the STIX objects.
+            The queries are returned in the order of the objects in the bundle.
+        :param upserter: The upserter selecting the objects not yet stored in
+            the database, see Upserter.
+        :param cache: The cache of the objects transformed by previous runs,
+            see TransformCache.
+        """
+        logger.info("Starting transformation")
+        entity_queries, sro_queries, embedded_relation_queries = [], [], []
 
+        for transformed in self.transform_iter(
+            datasrc_path, stream, trusted, workers, upserter, cache
+        ):
             entity_query, sro_query, embedded_relation_query = transformed
             if entity_query:
                 entity_queries.append(entity_query)
@@ -83,27 +221,288 @@ class ETLOrchestrator:
         )
         return (entity_queries, sro_queries, embedded_relation_queries)
 
+    def _transform_parallel(self, stix_objects, workers, cache=None):
+        """Transform STIX objects in a pool of worker processes.
+
+        The objects are sent to the workers in chunks, with at most two
+        chunks per worker in flight, and the results are yielded in the
+        order of the objects.
+
+        :param stix_objects: An iterable of STIX objects.
+        :param workers: The number of worker processes.
+        :param cache: The cache of the transformed objects, looked up before
+            sending the objects to the workers.
+        """
+        logger.info("Transforming with %d worker processes", workers)
+        stix_objects = iter(stix_objects)
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=_init_transform_worker,
+            initargs=(self.transformer_cls,)
+        ) as executor:
+            pending = deque()
+            while chunk := list(islice(stix_objects, conf.TRANSFORM_CHUNK_SIZE)):
+                if cache is None:
+                    cached = [None] * len(chunk)
+                else:
+                    cached = [cache.get(stix_object) for stix_object in chunk]
+                missing = [o for o, queries in zip(chunk, cached) if queries is None]
+                pending.append((chunk, cached, executor.submit(_transform_chunk, missing)))
+                if len(pending) >= 2 * workers:
+                    yield from self._merge_chunk(*pending.popleft(), cache)
+            while pending:
+                yield from self._merge_chunk(*pending.popleft(), cache)
+
+    @staticmethod
+    def _merge_chunk(chunk, cached, future, cache):
+        """Merge the cached and transformed queries of a chunk of STIX objects,
+        in the order of the objects, caching the transformed ones."""
+        transformed = iter(future.result())
+        for stix_object, queries in zip(chunk, cached):
+            if queries is None:
+                queries = next(transformed)
+                if cache is not None:
+                    cache.put(stix_object, queries)
+            yield queries
+
+    def _create_loader(self, server_address, db_name, journal=None):
+        if self.loader_cls != TypeDBLoader:
+            raise ValueError("Unsupported loader")
+        return self.loader_cls(
+            server_address, db_name, batch_size=conf.LOAD_BATCH_SIZE, journal=journal,
+            pack_size=conf.LOAD_PACK_SIZE
+        )
+
+    def _open_cache(self, trusted=False):
+        """Open the transformation cache.
+
+        :param trusted: True if the STIX objects are transformed as plain
+            dictionaries, whose queries are cached separately.
+        """
+        return TransformCache(
+            conf.TRANSFORM_CACHE_FILE, conf.TRANSFORM_CACHE_MAX_SIZE * 1024 * 1024,
+            variant="trusted" if trusted else "stix2"
+        )
+
+    def _open_journal(self, data_file, db_name, resume=False):
+        """Open the journal of the load of a data file into a database.
+
+        :param data_file: The filepath of the loaded data file.
+        :param db_name: The name of the TypeDB database.
+        :param resume: True to resume an interrupted load of the same data file.
+        """
+        path = os.path.join(conf.LOAD_JOURNALS_PATH, f"{db_name}.jsonl")
+        return LoadJournal(path, data_file, resume=resume)
+
     def load(
         self,
         server_address,
         db_name,
-        transformed_data
+        transformed_data,
+        journal=None
     ):
-        """Load the transformed data into the database."""
+        """Load the transformed data into the database.
+
+        :param journal: The journal recording the committed queries, see LoadJournal.
+        """
         logger.info("Starting loading into database '%s' at '%s'", db_name, server_address)
-        if self.loader_cls != TypeDBLoader:
-            raise ValueError("Unsupported loader")
-        loader = self.loader_cls(
-            server_address, db_name, batch_size=conf.LOAD_BATCH_SIZE
-        )
+        loader = self._create_loader(server_address, db_name, journal)
 
         entity_queries, sro_queries, embedded_relation_queries = transformed_data
-        loader.load(entity_queries)
-        loader.load(sro_queries)
-        loader.load(embedded_relation_queries)
+        loader.load(entity_queries, **{load_cts.PHASE: load_cts.PHASE_ENTITIES})
+        loader.load(sro_queries, **{load_cts.PHASE: load_cts.PHASE_SROS})
+        loader.load(embedded_relation_queries, **{load_cts.PHASE: load_cts.PHASE_EMBEDDED})
 
         logger.info("Loading into database '%s' completed", db_name)
 
+    def stream_transform_load(
+        self, datasrc_path, server_address, db_name, trusted=False, workers=1,
+        queue_depth=None, journal=None, upserter=None, cache=None
+    ):
+        """Transform and load a STIX bundle as a stream, with a memory usage
+        bounded by the batch size instead of the size of the bundle.
+
+        The bundle is read incrementally and the entity queries are loaded
+        as soon as a batch is ready. The SRO and embedded relation queries,
+        which require the entities to be loaded first, are spilled to
+        temporary files and loaded once all the entities are inserted.
+
+        The transformation runs in a background thread, ahead of the loading
+        by at most queue_depth batches, so that transforming and committing
+        to the database overlap.
+
+        :param datasrc_path: The filepath of the STIX bundle to be transformed.
+        :param server_address: The address of the TypeDB Server.
+        :param db_name: The name of the TypeDB database.
+        :param trusted: True to transform the STIX objects as plain dictionaries,
+            skipping their (full) validation with stix2.
+        :param workers: The number of processes transforming the STIX objects.
+        :param queue_depth: The number of transformed batches waiting to be
+            loaded, PIPELINE_QUEUE_DEPTH if not given. 0 disables the overlapping.
+        :param journal: The journal recording the committed queries, see LoadJournal.
+        :param upserter: The upserter selecting the objects not yet stored in
+            the database, see Upserter.
+        :param cache: The cache of the objects transformed by previous runs,
+            see TransformCache.
+        """
+        if queue_depth is None:
+            queue_depth = conf.PIPELINE_QUEUE_DEPTH
+        logger.info(
+            "Starting streaming transformation and loading into database '%s' at '%s'",
+            db_name, server_address
+        )
+        loader = self._create_loader(server_address, db_name, journal)
+
+        with file_utils.DiskSpillQueue() as sro_queries, \
+                file_utils.DiskSpillQueue() as embedded_relation_queries:
+            entities = 0
+
+            def entity_queries():
+                nonlocal entities
+                for transformed in self.transform_iter(
+                    datasrc_path, stream=True, trusted=trusted, workers=workers,
+                    upserter=upserter, cache=cache
+                ):
+                    entity_query, sro_query, embedded_relation_query = transformed
+                    if sro_query:
+                        sro_queries.put(sro_query)
+                    if embedded_relation_query:
+                        embedded_relation_queries.put(embedded_relation_query)
+                    if entity_query:
+                        entities += 1
+                        yield entity_query
+
+            start = timer()
+            if queue_depth > 0:
+                transformed = _BackgroundIterator(
+                    entity_queries(), conf.LOAD_BATCH_SIZE, queue_depth
+                )
+                loader.load(transformed, **{load_cts.PHASE: load_cts.PHASE_ENTITIES})
+                transform_time = transformed.produce_time
+            else:
+                loader.load(entity_queries(), **{load_cts.PHASE: load_cts.PHASE_ENTITIES})
+                transform_time = None
+            logger.info(
+                "Transformation completed: %d entities, %d SROs, %d embedded relations",
+                entities,
+                len(sro_queries),
+                len(embedded_relation_queries)
+            )
+            if transform_time is not None:
+                logger.info(
+                    "Entities transformed in %.3f s and loaded in %.3f s (wall-clock)",
+                    transform_time, timer() - start
+                )
+            loader.load(sro_queries, **{load_cts.PHASE: load_cts.PHASE_SROS})
+            loader.load(embedded_relation_queries, **{load_cts.PHASE: load_cts.PHASE_EMBEDDED})
+
+        logger.info("Loading into database '%s' completed", db_name)
+
+    def export_typeql(
+        self, datasrc_path, folder, stream=False, trusted=False, workers=1, cache=False
+    ):
+        """Transform a STIX bundle into TypeQL insert queries written to
+        files, one per load phase, without connecting to a database.
+
+        The queries are written as soon as they are transformed, so the
+        memory usage does not depend on the number of queries. The export
+        folder can be loaded into several databases with load_typeql.
+
+        :param datasrc_path: The filepath of the STIX bundle to be transformed.
+        :param folder: The path of the export folder.
+        :param stream: True to read the bundle incrementally, one object at a time.
+        :param trusted: True to transform the STIX objects as plain dictionaries,
+            skipping their (full) validation with stix2.
+        :param workers: The number of processes transforming the STIX objects.
+        :param cache: True to reuse the objects transformed by previous runs,
+            see TransformCache.
+        :raises ValueError: If the export files cannot be written.
+        """
+        logger.info("Starting transformation of %s into TypeQL files in %s",
+                    datasrc_path, folder)
+        with TypeQLExporter(folder) as exporter, \
+                (self._open_cache(trusted) if cache else nullcontext()) as transform_cache:
+            for transformed in self.transform_iter(
+                datasrc_path, stream=stream, trusted=trusted, workers=workers,
+                cache=transform_cache
+            ):
+                exporter.write(transformed)
+
+    def load_typeql(self, path, server_address, db_name):
+        """Load TypeQL insert queries exported by export_typeql.
+
+        :param path: The path of an export folder, whose load phases are
+            loaded in order, or of a single file of TypeQL queries, e.g.
+            the queries rejected by a previous load (failed_queries.jsonl).
+        :param server_address: The address of the TypeDB Server.
+        :param db_name: The name of the TypeDB database.
+        :raises ValueError: If the path does not contain TypeQL queries.
+        """
+        if os.path.isdir(path):
+            files = [(phase, os.path.join(path, name)) for phase, name in PHASE_FILES.items()]
+            missing = [file for _, file in files if not os.path.isfile(file)]
+            if missing:
+                raise ValueError(f"Missing TypeQL export files: {', '.join(missing)}")
+        elif os.path.isfile(path):
+            files = [("", path)]
+        else:
+            raise ValueError(f"The path '{path}' does not exist")
+
+        logger.info("Starting loading of %s into database '%s' at '%s'",
+                    path, db_name, server_address)
+        loader = self._create_loader(server_address, db_name)
+        for phase, file in files:
+            loader.load(read_typeql(file), **{load_cts.PHASE: phase})
+        logger.info("Loading into database '%s' completed", db_name)
+
+    def sync(
+        self, old_file, new_file, server_address, db_name, stream=False, trusted=False,
+        workers=1
+    ):
+        """Update a database loaded with a STIX bundle to a newer release of
+        the bundle, e.g. a new version of MITRE ATT&CK, without reloading it.
+
+        The bundles are diffed by the stix-id and 'modified' timestamp of their
+        objects: the added objects are inserted, the modified ones replaced
+        (see Upserter) and the removed ones deleted afterwards, SROs first.
+        Only the versions of the objects of the old bundle are kept in memory.
+
+        :param old_file: The filepath of the STIX bundle loaded in the database.
+        :param new_file: The filepath of the new release of the STIX bundle.
+        :param server_address: The address of the TypeDB Server.
+        :param db_name: The name of the TypeDB database.
+        :param stream: True to transform and load the new bundle as a stream,
+            see stream_transform_load.
+        :param trusted: True to skip the construction and (full) validation of stix2 objects.
+        :param workers: The number of processes transforming the STIX objects.
+        :raises ExtractionError: If the old bundle cannot be read.
+        """
+        logger.info("Starting the synchronization of database '%s' from %s to %s",
+                    db_name, old_file, new_file)
+        try:
+            stored = Upserter.read_versions(old_file)
+        except (OSError, KeyError, ValueError) as e:
+            raise ExtractionError(
+                ExtractionError.STIX_FILE_READ_FAILED, str(e), old_file, self.__class__.__name__
+            ) from e
+
+        try:
+            with Upserter(server_address, db_name, stored) as upserter:
+                if stream:
+                    self.stream_transform_load(
+                        new_file, server_address, db_name, trusted=trusted,
+                        workers=workers, upserter=upserter
+                    )
+                else:
+                    insert_bundle = self.transform(
+                        new_file, trusted=trusted, workers=workers, upserter=upserter
+                    )
+                    self.load(server_address, db_name, insert_bundle)
+                upserter.delete_removed()
+        except ExtractionError as e:
+            raise e
+        except ValueError as e:
+            logger.error("Invalid settings for loading data: %s", e)
 
     def etl(self, src, server_address, db_name, **kwargs):
         """
@@ -115,8 +514,21 @@ class ETLOrchestrator:
         :param db_name: The name of the TypeDB database.
         :param kwargs: Additional optional parameters.
             - transform_src (str): The local file path of the STIX data source to be transformed.
+            - stream (bool): Transform and load the STIX data source as a stream,
+              see stream_transform_load.
+            - trusted (bool): Skip the construction and (full) validation of stix2 objects.
+            - workers (int): The number of processes transforming the STIX objects.
+            - checkpoint (bool): Record the committed queries in a journal, so
+              that the load can be resumed if it is interrupted.
+            - resume (bool): Resume an interrupted load of the same STIX data source,
+              skipping the queries already committed.
+            - upsert (bool): Load only the STIX objects not yet stored in the
+              database with the same version, see Upserter.
+            - cache (bool): Reuse the STIX objects transformed by previous runs,
+              see TransformCache.
         :raises ExtractionError: If an error occurs during the extraction process.
-        :raises ValueError: If invalid settings are provided for loading data.
+        :raises ValueError: If invalid settings are provided for loading data, e.g.
+            resume or checkpoint with upsert.
         """
         stix_local_file = kwargs.get("transform_src")
         if not stix_local_file:
@@ -127,25 +539,67 @@ class ETLOrchestrator:
 
         try:
             self.extract(src, stix_local_file, **kwargs)
-            insert_bundle = self.transform(stix_local_file)
-            self.load(server_address, db_name, insert_bundle)
         except ExtractionError as e:
             raise e
         except ValueError as e:
             logger.error("Invalid settings for loading data: %s", e)
+            return
+        self.transform_load(
+            stix_local_file, server_address, db_name,
+            stream=kwargs.get(extract_cts.STREAM, False),
+            trusted=kwargs.get(extract_cts.TRUSTED, False),
+            workers=kwargs.get("workers", 1),
+            checkpoint=kwargs.get("checkpoint", False),
+            resume=kwargs.get("resume", False),
+            upsert=kwargs.get("upsert", False),
+            cache=kwargs.get("cache", False)
+        )
 
 
-    def transform_load(self, data_file, server_address, db_name):
+    def transform_load(
+        self, data_file, server_address, db_name, stream=False, trusted=False, workers=1,
+        checkpoint=False, resume=False, upsert=False, cache=False
+    ):
         """
         Run a transform and load process for a given data file.
 
         :param data_file: The filepath of the file to be transformed.
         :param server_address: The address of the TypeDB Server.
         :param db_name: The name of the TypeDB database where data is to be loaded.
+        :param stream: True to transform and load the data file as a stream,
+            see stream_transform_load.
+        :param trusted: True to skip the construction and (full) validation of stix2 objects.
+        :param workers: The number of processes transforming the STIX objects.
+        :param checkpoint: True to record the committed queries in a journal,
+            so that the load can be resumed if it is interrupted.
+        :param resume: True to resume an interrupted load of the same data file,
+            skipping the queries already committed. Implies checkpoint.
+        :param upsert: True to load only the STIX objects not yet stored in the
+            database with the same version, see Upserter.
+        :param cache: True to reuse the STIX objects transformed by previous runs,
+            see TransformCache.
+        :raises ValueError: If checkpoint or resume is combined with upsert.
         """
+        checkpoint = checkpoint or resume
+        if checkpoint and upsert:
+            raise ValueError("A load cannot be checkpointed or resumed in upsert mode")
         try:
-            insert_bundle = self.transform(data_file)
-            self.load(server_address, db_name, insert_bundle)
+            with (self._open_journal(data_file, db_name, resume) if checkpoint
+                  else nullcontext()) as journal, \
+                    (Upserter(server_address, db_name) if upsert else nullcontext()) as upserter, \
+                    (self._open_cache(trusted) if cache else nullcontext()) as transform_cache:
+                if stream:
+                    self.stream_transform_load(
+                        data_file, server_address, db_name, trusted=trusted,
+                        workers=workers, journal=journal, upserter=upserter,
+                        cache=transform_cache
+                    )
+                else:
+                    insert_bundle = self.transform(
+                        data_file, trusted=trusted, workers=workers, upserter=upserter,
+                        cache=transform_cache
+                    )
+                    self.load(server_address, db_name, insert_bundle, journal)
         except ExtractionError as e:
             raise e
         except ValueError as e:
@@ -16,6 +16,10 @@ MAX_CONNECTION_TIME = "max_connection_time"
 MAX_RESP_TIME = "max_resp_time"
 # MISP:
 MISP_APIKEY = "apikey"
+# STIX reader:
+STREAM = "stream"
+TRUSTED = "trusted"
+VALIDATE_EVERY = "validate_every"
 
 BASE_TIME = datetime(1970, 1, 1, 0, 0, 0, 0).astimezone(timezone.utc)
 
@@ -25,6 +29,8 @@ EXTRACT_SUCCESS = "Extraction successfully finished"
 READ_STIX_START = "Reading STIX source: %s"
 READ_STIX_FAILED = "Reading of STIX source failed: %s"
 READ_STIX_SUCCESS = "STIX objects fetched from %s"
+READ_STIX_STREAM_START = "Streaming STIX objects from %s"
+READ_STIX_STREAM_SUCCESS = "%d STIX objects streamed from %s"
 READ_STIX_NO_OBJECTS = "Read STIX Object is either no bundle or does not have 'objects'"
 
 REQUIRED_ARG = "The required argument '%s' is missing"
@@ -4,11 +4,14 @@ from typing import Any
 from stix2 import parse
 from stix2.utils import get_timestamp, parse_into_datetime, format_datetime
 from stix2.exceptions import STIXError
+from stix2.registry import class_for_type
 from requests import HTTPError, ConnectionError, Timeout
 from pymisp import PyMISP
 from pymisp.exceptions import PyMISPError
 
 from satrap.commons.log_utils import logger
+from satrap.settings import TRUSTED_VALIDATE_EVERY
+from satrap.commons import file_utils
 from satrap.commons.file_utils import download_file, write_json
 from satrap.etl import stix_constants
 from satrap.etl.exceptions import ExtractionError, STIXParsingError
@@ -114,6 +117,9 @@ class STIXExtractor(Extractor):
     Read and parse a STIX source file and return the objects.
     """
 
+    # default property values per STIX type, for trusted extraction
+    _default_values: dict[str, dict] = {}
+
     def get_extractor_type(self):
         return extract_cts.STIX_READER
 
@@ -212,20 +218,126 @@ class STIXExtractor(Extractor):
 
         return meta_object
 
-    def fetch(self, src: str, **kwargs):
-        """Reads the STIX 2.1 data from a JSON file.
+    def adapt_raw_stix_object(self, stix_object: dict) -> dict:
+        """Adapt a STIX object given as a plain dictionary, in place,
+        following the same rules as adapt_stix_object.
+
+        Missing 'created' and 'modified' timestamps are set to the default
+        timestamp and other missing optional properties to their stix2 default
+        value (e.g. 'revoked'). Unlike the parsing with stix2, values are not
+        coerced to the type of the property.
+
+        :param stix_object: The STIX object as read from the JSON source
+        :type stix_object: dict
+
+        :return: The adapted STIX object
+        :rtype: dict
+        """
+        # move x509_v3_extensions to the extensions
+        x509_extension = stix_object.pop(
+            stix_constants.STIX_PROPERTY_X509_V3_EXTENSIONS, None
+        )
+        if x509_extension:
+            stix_object[stix_constants.STIX_PROPERTY_EXTENSIONS] = {
+                stix_constants.STIX_PROPERTY_X509_V3_EXTENSIONS: x509_extension
+            }
+
+        # add the default values that stix2 sets when parsing an object
+        for prop, value in self.get_default_values(
+            stix_object.get(stix_constants.STIX_PROPERTY_TYPE)
+        ).items():
+            if prop not in stix_object:
+                stix_object[prop] = value
+
+        return stix_object
+
+    def get_default_values(self, stix_type: str) -> dict:
+        """Returns the default values of the optional properties of a STIX
+        type, as set by stix2 when parsing an object of that type.
+
+        The 'created' and 'modified' timestamps default to the base time;
+        other time-dependent defaults are not included.
+
+        :param stix_type: The type of the STIX object, e.g. attack-pattern
+        :type stix_type: str
+
+        :return: The default value of each property, by property name
+        :rtype: dict
+        """
+        defaults = STIXExtractor._default_values.get(stix_type)
+        if defaults is not None:
+            return defaults
+
+        defaults = {}
+        stix_cls = class_for_type(stix_type, "2.1")
+        properties = getattr(stix_cls, "_properties", {})
+        for prop, definition in properties.items():
+            if prop in (stix_constants.STIX_PROPERTY_ID, stix_constants.STIX_PROPERTY_TYPE):
+                continue
+            if prop in (stix_constants.STIX_PROPERTY_CREATED,
+                        stix_constants.STIX_PROPERTY_MODIFIED):
+                defaults[prop] = format_datetime(parse_into_datetime(extract_cts.BASE_TIME))
+            elif hasattr(definition, "default"):
+                value = definition.default()
+                if isinstance(value, (bool, str)):
+                    defaults[prop] = value
+        STIXExtractor._default_values[stix_type] = defaults
+        return defaults
+
+    def adapt_raw_meta_object(self, meta_object: dict) -> dict:
+        """Adapt, in place, a STIX meta object given as a plain dictionary
+        in agreement with the predefined JSON mapping file for SMOs.
+
+        :param meta_object: The SMO to be adapted if needed
+        :type meta_object: dict
+
+        :raises STIXParsingError: If the definition type of a marking is invalid
+
+        :return: The adapted STIX object
+        :rtype: dict
+        """
+        definition = meta_object.get(
+            stix_constants.STIX_PROPERTY_MARKING_DEF_DEFINITION
+        )
+        if definition:
+            marking_type = meta_object.get("definition_type")
+            if marking_type not in ["statement", "tlp"]:
+                raise STIXParsingError(
+                    f"The 'definition_type' in '{meta_object.get('id')}' "
+                    "SHOULD be one of: statement or tlp"
+                )
+            meta_object[stix_constants.STIX_PROPERTY_EXTENSIONS] = {
+                f"definition-{marking_type}": definition
+            }
+
+        return meta_object
+
+    def validate_stix_object(self, stix_object: dict, src: str) -> None:
+        """Validates a STIX object given as a plain dictionary with stix2.
+
+        :param stix_object: The STIX object as read from the JSON source
+        :type stix_object: dict
+        :param src: The filepath the object was read from
+        :type src: str
+
+        :raises STIXParsingError: If the object is not valid STIX 2.1
+        """
+        try:
+            parse(stix_object, allow_custom=True, version="2.1")
+        except STIXError as e:
+            raise STIXParsingError(e, src, class_origin=__name__) from e
+
+    def read_bundle_objects(self, src: str):
+        """Reads and parses a whole STIX 2.1 bundle at once.
 
         :param src: The filepath where to read the data from
         :type src: str
 
         :raises ExtractionError: If the STIX source is invalid
 
-        :return: The STIX Objects
-        :rtype: Result
+        :return: The STIX Objects of the bundle
+        :rtype: list
         """
-        logger.debug(extract_cts.READ_STIX_START, src)
-        start = get_timestamp()
-
         try:
             with open(src, encoding="utf-8") as file:
                 # 'parse' uses by default the latest version of STIX (here 2.1);
@@ -241,10 +353,160 @@ class STIXExtractor(Extractor):
         objects = stix_bundle.get(stix_constants.STIX_PROPERTY_BUNDLE_OBJECTS)
         if objects is None:
             raise ExtractionError(
-                ExtractionError.EMPTY_STIX_FILE_READ, e, src, __name__
+                ExtractionError.EMPTY_STIX_FILE_READ, datasrc=src, class_origin=__name__
+            )
+
+        logger.info(extract_cts.READ_STIX_SUCCESS, src)
+        return objects
+
+    def read_raw_bundle_objects(self, src: str) -> list[dict]:
+        """Reads a whole STIX 2.1 bundle at once without building stix2
+        objects.
+
+        :param src: The filepath where to read the data from
+        :type src: str
+
+        :raises ExtractionError: If the STIX source is invalid
+
+        :return: The STIX Objects of the bundle as plain dictionaries
+        :rtype: list[dict]
+        """
+        try:
+            stix_bundle = file_utils.read_json(src)
+        except Exception as e:
+            raise ExtractionError(
+                ExtractionError.STIX_FILE_READ_FAILED, e, src, __name__
+            ) from e
+
+        objects = None
+        if isinstance(stix_bundle, dict):
+            objects = stix_bundle.get(stix_constants.STIX_PROPERTY_BUNDLE_OBJECTS)
+        if objects is None:
+            raise ExtractionError(
+                ExtractionError.EMPTY_STIX_FILE_READ, datasrc=src, class_origin=__name__
             )
 
         logger.info(extract_cts.READ_STIX_SUCCESS, src)
+        return objects
+
+    def stream_raw_bundle_objects(self, src: str):
+        """Reads a STIX 2.1 bundle incrementally and yields its objects
+        as plain dictionaries, without loading the whole file into memory.
+
+        :param src: The filepath where to read the data from
+        :type src: str
+
+        :raises ExtractionError: If the STIX source is invalid
+
+        :return: The STIX Objects of the bundle as plain dictionaries
+        :rtype: Iterator[dict]
+        """
+        logger.debug(extract_cts.READ_STIX_STREAM_START, src)
+        raw_objects = file_utils.stream_json_array(
+            src, stix_constants.STIX_PROPERTY_BUNDLE_OBJECTS
+        )
+        count = 0
+        while True:
+            try:
+                raw_object = next(raw_objects)
+            except StopIteration:
+                break
+            except KeyError as e:
+                raise ExtractionError(
+                    ExtractionError.EMPTY_STIX_FILE_READ, datasrc=src, class_origin=__name__
+                ) from e
+            except Exception as e:
+                raise ExtractionError(
+                    ExtractionError.STIX_FILE_READ_FAILED, e, src, __name__
+                ) from e
+            count += 1
+            yield raw_object
+
+        logger.info(extract_cts.READ_STIX_STREAM_SUCCESS, count, src)
+
+    def stream_bundle_objects(self, src: str):
+        """Reads a STIX 2.1 bundle incrementally and parses its objects
+        one at a time, without loading the whole file into memory.
+
+        :param src: The filepath where to read the data from
+        :type src: str
+
+        :raises ExtractionError: If the STIX source is invalid
+
+        :return: The STIX Objects of the bundle
+        :rtype: Iterator
+        """
+        for raw_object in self.stream_raw_bundle_objects(src):
+            try:
+                stix_object = parse(raw_object, allow_custom=True, version="2.1")
+            except STIXError as e:
+                raise STIXParsingError(e, src, class_origin=__name__) from e
+            yield stix_object
+
+    def fetch_trusted(self, src: str, **kwargs):
+        """Reads the STIX 2.1 data from a JSON file of a trusted source.
+
+        The objects are kept as plain dictionaries end to end and adapted
+        in place; validation with stix2 is skipped or done on a sample.
+
+        :param src: The filepath where to read the data from
+        :type src: str
+        :param kwargs: optional parameters, see fetch
+
+        :raises ExtractionError: If the STIX source is invalid
+        :raises STIXParsingError: If a validated object is not valid STIX 2.1
+
+        :return: The STIX Objects as plain dictionaries
+        :rtype: Iterator[dict]
+        """
+        validate_every = kwargs.get(extract_cts.VALIDATE_EVERY)
+        if validate_every is None:
+            validate_every = TRUSTED_VALIDATE_EVERY
+
+        if kwargs.get(extract_cts.STREAM, False):
+            objects = self.stream_raw_bundle_objects(src)
+        else:
+            objects = self.read_raw_bundle_objects(src)
+
+        for i, stix_object in enumerate(objects):
+            if validate_every and i % validate_every == 0:
+                self.validate_stix_object(stix_object, src)
+            self.adapt_raw_stix_object(stix_object)
+            self.adapt_raw_meta_object(stix_object)
+            yield stix_object
+
+    def fetch(self, src: str, **kwargs):
+        """Reads the STIX 2.1 data from a JSON file.
+
+        :param src: The filepath where to read the data from
+        :type src: str
+        :param kwargs: optional parameters
+            - extract_cts.STREAM (bool): when True, the bundle is read
+                incrementally and objects are yielded as soon as they are
+                parsed; memory usage then does not depend on the file size
+            - extract_cts.TRUSTED (bool): when True, the objects are returned
+                as plain dictionaries without building stix2 objects
+            - extract_cts.VALIDATE_EVERY (int): in trusted mode, validate one
+                out of this number of objects with stix2; 0 disables the
+                validation (default: TRUSTED_VALIDATE_EVERY in settings)
+        :type kwargs: dict
+
+        :raises ExtractionError: If the STIX source is invalid
+
+        :return: The STIX Objects
+        :rtype: Result
+        """
+        logger.debug(extract_cts.READ_STIX_START, src)
+        if kwargs.get(extract_cts.TRUSTED, False):
+            yield from self.fetch_trusted(src, **kwargs)
+            return
+
+        start = get_timestamp()
+
+        if kwargs.get(extract_cts.STREAM, False):
+            objects = self.stream_bundle_objects(src)
+        else:
+            objects = self.read_bundle_objects(src)
 
         for stix_object in objects:
             # logger.debug(f"Adapting STIX object {stix_object}\n")
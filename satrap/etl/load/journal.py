@@ -0,0 +1,122 @@
+"""Journal recording the progress of a load, to resume it after a failure."""
+
+import os
+import json
+import threading
+
+from satrap.commons import file_utils
+from satrap.commons.log_utils import logger
+from satrap.etl.load import log_messages
+
+
+class LoadJournal:
+    """Append-only journal of the progress of a load.
+
+    The journal records the content hash of the loaded data source and,
+    for every load phase, the positions of the insert queries that have
+    been committed. A load resumed with the journal of an interrupted
+    load of the same data source skips the committed queries.
+
+    Each record is a JSON object in its own line; the first one describes
+    the data source.
+    """
+
+    def __init__(self, path: str, source: str, resume: bool = False):
+        """Open the journal of a load.
+
+        :param path: The path of the journal file
+        :type path: str
+        :param source: The path of the loaded data source
+        :type source: str
+        :param resume: True to resume the load recorded in an existing
+            journal of the same data source, False to start a new journal
+        :type resume: bool, optional
+        """
+        self.path = path
+        self.source_hash = file_utils.hash_file(source)
+        self.committed: dict[str, set[int]] = {}
+        self._lock = threading.Lock()
+
+        if resume and self.read():
+            logger.info(log_messages.JOURNAL_RESUMED, path)
+            self.file = open(path, "a", encoding="utf-8")
+            # terminate a record partially written before a crash
+            self.file.write("\n")
+            return
+
+        if resume:
+            logger.warning(log_messages.JOURNAL_NOT_RESUMABLE, path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.file = open(path, "w", encoding="utf-8")
+        self.write({"source": source, "hash": self.source_hash})
+
+    def read(self) -> bool:
+        """Reads the committed queries from the journal file.
+
+        :return: False if there is no journal of the same data source
+        :rtype: bool
+        """
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                header = json.loads(f.readline())
+                if header.get("hash") != self.source_hash:
+                    return False
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        # record partially written before a crash
+                        continue
+                    committed = self.committed.setdefault(record["phase"], set())
+                    for start, end in record["ranges"]:
+                        committed.update(range(start, end))
+        except (OSError, ValueError, AttributeError):
+            return False
+        return True
+
+    def write(self, record: dict) -> None:
+        self.file.write(json.dumps(record) + "\n")
+        self.file.flush()
+        os.fsync(self.file.fileno())
+
+    def is_committed(self, phase: str, position: int) -> bool:
+        """States whether a query has been committed.
+
+        :param phase: The load phase, e.g. load_constants.PHASE_ENTITIES
+        :type phase: str
+        :param position: The position of the query in the phase
+        :type position: int
+
+        :return: True if the query has been committed
+        :rtype: bool
+        """
+        return position in self.committed.get(phase, ())
+
+    def record(self, phase: str, positions: list[int]) -> None:
+        """Records queries as committed.
+
+        :param phase: The load phase, e.g. load_constants.PHASE_ENTITIES
+        :type phase: str
+        :param positions: The positions of the queries in the phase, in
+            increasing order
+        :type positions: list[int]
+        """
+        ranges = []
+        for position in positions:
+            if ranges and ranges[-1][1] == position:
+                ranges[-1][1] = position + 1
+            else:
+                ranges.append([position, position + 1])
+
+        with self._lock:
+            self.committed.setdefault(phase, set()).update(positions)
+            self.write({"phase": phase, "ranges": ranges})
+
+    def close(self) -> None:
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exception_type, exception_value, traceback):
+        self.close()
@@ -0,0 +1,9 @@
+"""Constants for the loader."""
+
+# keyargs for loading
+PHASE = "phase"
+
+# Load phases, with a batch size adapted separately
+PHASE_ENTITIES = "entities"
+PHASE_SROS = "sros"
+PHASE_EMBEDDED = "embedded"
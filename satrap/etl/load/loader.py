@@ -1,11 +1,38 @@
+import json
+import threading
 from abc import ABC, abstractmethod
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from itertools import islice
+from timeit import default_timer as timer
+from typing import Iterable
 
 from satrap.datamanagement.typedb.typeql_builder import TypeQLBuilder
 from satrap.datamanagement.typedb.inserthandler import TypeDBBatchInsertHandler
+from satrap.datamanagement.typedb.typedb_constants import MATCH_KEYWORD
 from satrap.datamanagement.typedb.dataobjects import InsertQuery
-from satrap.commons.log_utils import logger
+from satrap.datamanagement.typedb.query_packer import QueryPacker
+from satrap.commons.log_utils import logger, FAILED_QUERIES_FILE
+from satrap.etl.exceptions import LoadingError
 from satrap.etl.load import log_messages
-from satrap.settings import LOAD_BATCH_SIZE
+from satrap.etl.load.journal import LoadJournal
+import satrap.etl.load.load_constants as load_cts
+from satrap.settings import (
+    LOAD_BATCH_SIZE, LOAD_PARALLELISM, LOAD_CONFLICT_RETRIES,
+    LOAD_ADAPTIVE_BATCH_SIZE, LOAD_MAX_BATCH_SIZE, LOAD_TARGET_LATENCY, LOAD_PACK_SIZE
+)
+
+
+def has_match_clause(query: InsertQuery | str) -> bool:
+    """Returns whether an insert query depends on stored data.
+
+    :param query: The insert query, or its TypeQL string
+    :type query: InsertQuery | str
+    """
+    if isinstance(query, str):
+        return query.startswith(MATCH_KEYWORD)
+    return bool(query.get_match_clause())
 
 
 class Loader(ABC):
@@ -22,6 +49,57 @@ class Loader(ABC):
         """
         pass
 
+class AdaptiveBatchSize:
+    """Batch size controller following an AIMD policy (additive increase,
+    multiplicative decrease).
+
+    The batch size grows by a fixed step while the commits take less than
+    the target latency, and is halved when a commit fails or exceeds it.
+    """
+
+    def __init__(
+            self,
+            initial: int,
+            maximum: int = LOAD_MAX_BATCH_SIZE,
+            target_latency: float = LOAD_TARGET_LATENCY,
+            adaptive: bool = True
+        ):
+        """Instantiate the controller.
+
+        :param initial: The initial batch size
+        :type initial: int
+        :param maximum: The largest batch size
+        :type maximum: int, optional
+        :param target_latency: The commit time in seconds above which the
+            batch size is reduced
+        :type target_latency: float, optional
+        :param adaptive: False to keep the initial batch size
+        :type adaptive: bool, optional
+        """
+        self.size = max(1, initial)
+        self.maximum = max(self.size, maximum)
+        self.step = max(1, self.size // 10)
+        self.target_latency = target_latency
+        self.adaptive = adaptive
+        self._lock = threading.Lock()
+
+    def update(self, latency: float, success: bool) -> None:
+        """Adapt the batch size to the outcome of a commit.
+
+        :param latency: The time in seconds taken by the commit
+        :type latency: float
+        :param success: Whether the batch was committed
+        :type success: bool
+        """
+        if not self.adaptive:
+            return
+        with self._lock:
+            if not success or latency > self.target_latency:
+                self.size = max(1, self.size // 2)
+            else:
+                self.size = min(self.maximum, self.size + self.step)
+
+
 class TypeDBLoader(Loader):
     """TypeDB Loader.
     
@@ -31,31 +109,411 @@ class TypeDBLoader(Loader):
             self,
             database_server_address: str,
             database_name: str,
-            batch_size=LOAD_BATCH_SIZE
+            batch_size=LOAD_BATCH_SIZE,
+            parallelism=LOAD_PARALLELISM,
+            conflict_retries=LOAD_CONFLICT_RETRIES,
+            adaptive=LOAD_ADAPTIVE_BATCH_SIZE,
+            dead_letter_file=FAILED_QUERIES_FILE,
+            journal: LoadJournal = None,
+            pack_size=LOAD_PACK_SIZE
         ):
+        """Instantiate the loader.
+
+        :param database_server_address: The address (host:port) of the TypeDB server
+        :type database_server_address: str
+        :param database_name: The name of the database
+        :type database_name: str
+        :param batch_size: The number of queries inserted per transaction,
+            the initial one if the batch size is adaptive
+        :type batch_size: int, optional
+        :param parallelism: The number of transactions run concurrently for
+            batches of independent queries, i.e. without match clause
+        :type parallelism: int, optional
+        :param conflict_retries: The number of times a transaction is retried
+            after a write conflict
+        :type conflict_retries: int, optional
+        :param adaptive: True to adapt the batch size of each load phase
+            to the commit latency and failures
+        :type adaptive: bool, optional
+        :param dead_letter_file: The JSON lines file where the queries
+            rejected by the database are written
+        :type dead_letter_file: str, optional
+        :param journal: The journal where the committed queries are recorded,
+            and whose committed queries are skipped
+        :type journal: LoadJournal, optional
+        :param pack_size: The number of queries with match clause merged
+            into one query (1 to disable the packing)
+        :type pack_size: int, optional
+        """
         self.server_address = database_server_address
         self.db_name = database_name
         self.batch_size = batch_size
+        self.parallelism = max(1, parallelism)
+        self.conflict_retries = conflict_retries
+        self.adaptive = adaptive
+        self.batch_sizes: dict[str, AdaptiveBatchSize] = {}
+        self.dead_letter_file = dead_letter_file
+        self.rejected = 0
+        self._dead_letter_lock = threading.Lock()
+        self.journal = journal
+        self.pack_size = max(1, pack_size)
+
+    def get_batch_size(self, phase: str) -> AdaptiveBatchSize:
+        """Returns the batch size controller of a load phase.
+
+        :param phase: The load phase, e.g. load_constants.PHASE_ENTITIES
+        :type phase: str
+
+        :return: The batch size controller of the phase
+        :rtype: AdaptiveBatchSize
+        """
+        if phase not in self.batch_sizes:
+            self.batch_sizes[phase] = AdaptiveBatchSize(
+                self.batch_size, adaptive=self.adaptive
+            )
+        return self.batch_sizes[phase]
+
+    def load(self, data: Iterable[InsertQuery | str], **kwargs):
+        """Load InsertQuery objects, or TypeQL insert queries already built
+        (e.g. read from an export, see typeql_export), into the database.
+
+        The TypeQL queries are built and inserted one batch at a time, so
+        the data can be a generator whose batches are committed as soon as
+        they are ready.
+
+        With a parallelism greater than 1, batches of queries without match
+        clause (e.g. entities) are inserted concurrently. A batch with a
+        match clause might depend on data of other batches, so it is only
+        inserted once all the previous batches are committed.
 
-    def load(self, data: list[InsertQuery], **kwargs):
-        """Load a list of InsertQuery objects into the database.
+        The batch size is adapted separately for every load phase, given
+        as keyword argument (load_constants.PHASE). With a journal, the
+        queries of the phase are recorded by their position in the data
+        once committed, and the ones recorded by an interrupted load are
+        skipped. Queries rejected by the database are not recorded, so a
+        resumed load tries them again.
+
+        A lost connection or another error of the driver stops the load
+        (TypeDBDriverException), instead of rejecting the queries.
+
+        Consecutive queries with match clause are packed into merged
+        queries (see QueryPacker), so that the instances they share
+        (e.g. an intrusion set used by many relationships) are matched
+        once per packed query.
+
+        The delete queries of an InsertQuery (e.g. of the stored version
+        of an object it replaces) are run right before it, in the same
+        transaction.
         
-        :param data: A list of objects representing TypeQL insert queries
-        :type data: list[InsertQuery]
+        :param data: The objects representing TypeQL insert queries, or
+            the TypeQL insert queries
+        :type data: Iterable[InsertQuery | str]
         """
         logger.info(log_messages.LOAD_DATA_START)
 
-        executables = list(map(TypeQLBuilder.build_insert_query, data))
-        amount = len(executables)
+        phase = kwargs.get(load_cts.PHASE, "")
+        skipped = [0]
+        queries = enumerate(data)
+        if self.journal is not None:
+            queries = self.skip_committed(queries, phase, skipped)
+        amount = 0
+        batch_size = self.get_batch_size(phase)
+
+        with TypeDBBatchInsertHandler(
+            self.server_address, self.db_name, conflict_retries=self.conflict_retries
+        ) as inserter, ThreadPoolExecutor(max_workers=self.parallelism) as executor:
+            pending = deque()
+            while items := list(islice(queries, batch_size.size)):
+                positions = [(position,) for position, _ in items]
+                batch = [query for _, query in items]
+                amount += len(batch)
+                independent = not any(map(has_match_clause, batch))
+                packs = deletes = None
+                if isinstance(batch[0], str):
+                    # already built, packing requires the query objects
+                    pass
+                elif not independent and self.pack_size > 1:
+                    batch, positions, packs, deletes = self.pack(batch, positions)
+                else:
+                    batch, deletes = self.build(batch)
+                args = (inserter, batch, batch_size, phase, positions, packs, deletes)
 
-        with TypeDBBatchInsertHandler(self.server_address, self.db_name) as inserter:
-            for i in range(0, amount, self.batch_size):
-                batch_inserted = inserter.insert(executables[i:i+self.batch_size])
+                if self.parallelism > 1 and independent:
+                    pending.append(executor.submit(self.load_batch, *args))
+                    # bound the number of batches held in memory
+                    if len(pending) >= 2 * self.parallelism:
+                        pending.popleft().result()
+                else:
+                    while pending:
+                        pending.popleft().result()
+                    self.load_batch(*args)
 
-                if not batch_inserted and self.batch_size>1:
-                    logger.warning("Reloading failed batch with single inserts.")
-                    for query in executables[i:i+self.batch_size]:
-                        inserter.insert([query])
-                    logger.info("Batch reloaded.")
+            while pending:
+                pending.popleft().result()
 
+        if skipped[0]:
+            logger.info(log_messages.LOAD_SKIPPED, skipped[0])
         logger.info(log_messages.LOAD_DATA_END,amount)
+        if self.rejected:
+            logger.warning(log_messages.LOAD_REJECTED, self.rejected, self.dead_letter_file)
+        logger.debug(log_messages.LOAD_BATCH_SIZE, batch_size.size)
+
+    def skip_committed(self, queries, phase: str, skipped: list[int]):
+        """Filter out the queries committed according to the journal.
+
+        :param queries: The queries of the load phase, with their position
+        :type queries: Iterable[tuple[int, InsertQuery]]
+        :param phase: The load phase
+        :type phase: str
+        :param skipped: Single-item list counting the skipped queries
+        :type skipped: list[int]
+        """
+        for position, query in queries:
+            if self.journal.is_committed(phase, position):
+                skipped[0] += 1
+            else:
+                yield position, query
+
+    @staticmethod
+    def build(batch: list[InsertQuery]) -> tuple[list[str], dict[str, tuple[str, ...]]]:
+        """Build the TypeQL queries of a batch.
+
+        :param batch: The insert queries
+        :type batch: list[InsertQuery]
+
+        :return: The TypeQL queries, and the delete queries run before
+            every TypeQL query having some
+        :rtype: tuple[list[str], dict[str, tuple[str, ...]]]
+        """
+        built, deletes = [], {}
+        for query in batch:
+            typeql = TypeQLBuilder.build_insert_query(query)
+            if query.get_delete_queries():
+                deletes[typeql] = query.get_delete_queries()
+            built.append(typeql)
+        return built, deletes
+
+    def pack(
+            self,
+            batch: list[InsertQuery],
+            positions: list[tuple[int, ...]]
+        ) -> tuple[list[str], list[tuple[int, ...]], dict[str, list[str]],
+                   dict[str, tuple[str, ...]]]:
+        """Merge the insert queries of a batch into packs of queries.
+
+        :param batch: The insert queries
+        :type batch: list[InsertQuery]
+        :param positions: The positions of the queries in the load phase
+        :type positions: list[tuple[int, ...]]
+
+        :return: The TypeQL queries of the packs, the positions of the
+            queries merged into every pack, the TypeQL queries merged
+            into every packed query, and the delete queries run before
+            every TypeQL query (packed or not) having some
+        :rtype: tuple[list[str], list[tuple[int, ...]], dict[str, list[str]],
+            dict[str, tuple[str, ...]]]
+        """
+        packed, packed_positions, packs, deletes = [], [], {}, {}
+        start = 0
+        for pack in QueryPacker.pack(batch, self.pack_size):
+            packed_positions.append(sum(positions[start:start + len(pack)], ()))
+            start += len(pack)
+            queries, pack_deletes = self.build(pack)
+            deletes.update(pack_deletes)
+            if len(pack) == 1:
+                packed.append(queries[0])
+                continue
+            merged = QueryPacker.merge(pack)
+            query = TypeQLBuilder.build_insert_query(merged)
+            if merged.get_delete_queries():
+                deletes[query] = merged.get_delete_queries()
+            packs[query] = queries
+            packed.append(query)
+        return packed, packed_positions, packs, deletes
+
+    def load_batch(
+            self,
+            inserter: TypeDBBatchInsertHandler,
+            batch: list[str],
+            batch_size: AdaptiveBatchSize,
+            phase: str,
+            positions: list[tuple[int, ...]],
+            packs: dict[str, list[str]] = None,
+            deletes: dict[str, tuple[str, ...]] = None
+        ):
+        """Insert a batch of TypeQL queries and record the committed ones
+        in the journal.
+
+        :param inserter: The handler used for the insertion
+        :type inserter: TypeDBBatchInsertHandler
+        :param batch: The TypeQL insert queries
+        :type batch: list[str]
+        :param batch_size: The batch size controller of the load phase
+        :type batch_size: AdaptiveBatchSize
+        :param phase: The load phase
+        :type phase: str
+        :param positions: The positions in the load phase of the queries
+            of every TypeQL query, several for a packed query
+        :type positions: list[tuple[int, ...]]
+        :param packs: The queries merged into the packed queries of the batch
+        :type packs: dict[str, list[str]], optional
+        :param deletes: The delete queries run before the queries of the batch
+        :type deletes: dict[str, tuple[str, ...]], optional
+        """
+        committed = self.insert_batch(inserter, batch, positions, batch_size, packs, deletes)
+        if self.journal is not None and committed:
+            self.journal.record(phase, sorted(committed))
+
+    def insert_batch(
+            self,
+            inserter: TypeDBBatchInsertHandler,
+            batch: list[str],
+            positions: list[tuple[int, ...]],
+            batch_size: AdaptiveBatchSize = None,
+            packs: dict[str, list[str]] = None,
+            deletes: dict[str, tuple[str, ...]] = None
+        ) -> list[int]:
+        """Insert a batch of TypeQL queries in one transaction. If the
+        transaction fails, the batch is bisected to isolate the failing
+        queries, which are written to the dead-letter file.
+
+        A packed query inserts nothing if one of its matched instances is
+        missing, so a batch with packs fails in that case, and a failing
+        packed query is replaced by the queries merged into it.
+
+        :param inserter: The handler used for the insertion
+        :type inserter: TypeDBBatchInsertHandler
+        :param batch: The TypeQL insert queries
+        :type batch: list[str]
+        :param positions: The positions in the load phase of the queries
+            of every TypeQL query
+        :type positions: list[tuple[int, ...]]
+        :param batch_size: The batch size controller updated with the
+            outcome of the transaction
+        :type batch_size: AdaptiveBatchSize, optional
+        :param packs: The queries merged into the packed queries of the batch
+        :type packs: dict[str, list[str]], optional
+        :param deletes: The delete queries run before the queries of the batch
+        :type deletes: dict[str, tuple[str, ...]], optional
+
+        :raises TypeDBDriverException: If the connection to the server is
+            lost or the driver fails
+
+        :return: The positions of the committed queries
+        :rtype: list[int]
+        """
+        packs = packs or {}
+        start = timer()
+        error = inserter.try_insert(batch, require_match=bool(packs), deletes=deletes)
+        if batch_size is not None:
+            batch_size.update(timer() - start, error is None)
+
+        if error is None:
+            return [position for group in positions for position in group]
+        if len(batch) == 1:
+            return self.handle_failure(
+                inserter, batch[0], positions[0], error, packs, deletes
+            )
+        logger.warning(log_messages.LOAD_BATCH_BISECT, len(batch))
+        return self.bisect(inserter, batch, positions, packs, deletes)
+
+    def bisect(
+            self,
+            inserter: TypeDBBatchInsertHandler,
+            batch: list[str],
+            positions: list[tuple[int, ...]],
+            packs: dict[str, list[str]] = None,
+            deletes: dict[str, tuple[str, ...]] = None
+        ) -> list[int]:
+        """Insert the two halves of a failed batch, recursively splitting
+        the halves that fail until the failing queries are isolated.
+
+        :param inserter: The handler used for the insertion
+        :type inserter: TypeDBBatchInsertHandler
+        :param batch: The TypeQL insert queries of the failed batch
+        :type batch: list[str]
+        :param positions: The positions in the load phase of the queries
+            of every TypeQL query
+        :type positions: list[tuple[int, ...]]
+        :param packs: The queries merged into the packed queries of the batch
+        :type packs: dict[str, list[str]], optional
+        :param deletes: The delete queries run before the queries of the batch
+        :type deletes: dict[str, tuple[str, ...]], optional
+
+        :return: The positions of the committed queries
+        :rtype: list[int]
+        """
+        packs = packs or {}
+        committed = []
+        middle = len(batch) // 2
+        for half, half_positions in ((batch[:middle], positions[:middle]),
+                                     (batch[middle:], positions[middle:])):
+            error = inserter.try_insert(
+                half, require_match=any(query in packs for query in half), deletes=deletes
+            )
+            if error is None:
+                committed.extend(position for group in half_positions for position in group)
+            elif len(half) == 1:
+                committed.extend(self.handle_failure(
+                    inserter, half[0], half_positions[0], error, packs, deletes
+                ))
+            else:
+                committed.extend(self.bisect(inserter, half, half_positions, packs, deletes))
+        return committed
+
+    def handle_failure(
+            self,
+            inserter: TypeDBBatchInsertHandler,
+            query: str,
+            positions: tuple[int, ...],
+            error: LoadingError,
+            packs: dict[str, list[str]],
+            deletes: dict[str, tuple[str, ...]] = None
+        ) -> list[int]:
+        """Reject a failing query, or insert the queries merged into it if
+        it is a packed query.
+
+        :param inserter: The handler used for the insertion
+        :type inserter: TypeDBBatchInsertHandler
+        :param query: The TypeQL insert query
+        :type query: str
+        :param positions: The positions in the load phase of the queries
+            merged into the query, one if it is not a packed query
+        :type positions: tuple[int, ...]
+        :param error: The error raised by the insertion
+        :type error: LoadingError
+        :param packs: The queries merged into the packed queries
+        :type packs: dict[str, list[str]]
+        :param deletes: The delete queries run before the queries
+        :type deletes: dict[str, tuple[str, ...]], optional
+
+        :return: The positions of the committed queries
+        :rtype: list[int]
+        """
+        if query not in packs:
+            self.reject(query, error)
+            return []
+        logger.debug(log_messages.LOAD_PACK_SPLIT, len(packs[query]))
+        return self.insert_batch(
+            inserter, packs[query], [(position,) for position in positions], deletes=deletes
+        )
+
+    def reject(self, query: str, error: LoadingError):
+        """Log a query rejected by the database and append it, with the
+        error, to the dead-letter file so that it can be replayed.
+
+        :param query: The TypeQL insert query
+        :type query: str
+        :param error: The error raised by the insertion
+        :type error: LoadingError
+        """
+        logger.error(error)
+        record = {
+            "time": datetime.now().isoformat(),
+            "error": error.message,
+            "query": query
+        }
+        with self._dead_letter_lock:
+            self.rejected += 1
+            with open(self.dead_letter_file, "a", encoding="utf-8") as f:
+                f.write(json.dumps(record) + "\n")
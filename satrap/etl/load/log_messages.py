@@ -2,3 +2,18 @@
 
 LOAD_DATA_START = "Start loading data..."
 LOAD_DATA_END = "End loading: %i insert queries processed"
+LOAD_BATCH_SIZE = "Batch size at the end of the load: %i"
+LOAD_BATCH_BISECT = "Loading of a batch of %i queries failed, bisecting it to isolate the failing queries"
+LOAD_PACK_SPLIT = "Loading of a packed query failed, inserting its %i queries separately"
+LOAD_REJECTED = "%i insert queries rejected so far, written to %s"
+LOAD_SKIPPED = "%i insert queries skipped, already committed according to the journal"
+
+# journal
+JOURNAL_RESUMED = "Resuming the load recorded in %s"
+JOURNAL_NOT_RESUMABLE = "No load of the same data source to resume in %s, starting a new load"
+
+# upsert
+UPSERT_STORED = "%i STIX objects stored in database '%s'"
+UPSERT_SUMMARY = "Upsert completed: %i new, %i modified and %i unchanged STIX objects"
+UPSERT_REMOVED = "%i of %i removed STIX objects deleted"
+EXPORT_END = "TypeQL export completed: %i entities, %i SROs, %i embedded relations written to %s"
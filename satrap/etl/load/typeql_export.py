@@ -0,0 +1,100 @@
+"""Export of the transformed TypeQL insert queries to files, to load them
+later without transforming the data source again."""
+
+import gzip
+import json
+import os
+
+from satrap.commons import file_utils
+from satrap.datamanagement.typedb.dataobjects import InsertQuery
+from satrap.datamanagement.typedb.typeql_builder import TypeQLBuilder
+from satrap.etl.load import log_messages
+import satrap.etl.load.load_constants as load_cts
+from satrap.commons.log_utils import logger
+
+# File of every load phase in an export folder, in load order
+PHASE_FILES = {
+    load_cts.PHASE_ENTITIES: "entities.tql.jsonl.gz",
+    load_cts.PHASE_SROS: "sros.tql.jsonl.gz",
+    load_cts.PHASE_EMBEDDED: "embedded.tql.jsonl.gz",
+}
+
+
+class TypeQLExporter:
+    """Writes the insert queries of the load phases to compressed files.
+
+    Each file holds the TypeQL queries of a load phase, in order, one JSON
+    string per line (TypeQL strings can span several lines).
+    """
+
+    def __init__(self, folder: str):
+        """Create the files of an export folder, overriding the files of a
+        previous export.
+
+        :param folder: The path of the export folder
+        :type folder: str
+
+        :raises ValueError: If the files cannot be written
+        """
+        self.folder = folder
+        self.files = {}
+        self.counts = dict.fromkeys(PHASE_FILES, 0)
+        for phase, name in PHASE_FILES.items():
+            path = os.path.join(folder, name)
+            file_utils.validate_file_access(path, write=True, override=True)
+            self.files[phase] = gzip.open(path, "wt", encoding="utf-8")
+
+    def write(self, transformed: tuple) -> None:
+        """Write the insert queries of a STIX object.
+
+        :param transformed: The (entity, SRO, embedded relation) insert
+            queries of a STIX object
+        :type transformed: tuple[InsertQuery, InsertQuery, InsertQuery]
+        """
+        for phase, query in zip(PHASE_FILES, transformed):
+            if query:
+                self.write_query(phase, query)
+
+    def write_query(self, phase: str, query: InsertQuery) -> None:
+        """Write an insert query of a load phase.
+
+        :param phase: The load phase, e.g. load_constants.PHASE_ENTITIES
+        :type phase: str
+        :param query: The insert query
+        :type query: InsertQuery
+        """
+        self.files[phase].write(json.dumps(TypeQLBuilder.build_insert_query(query)) + "\n")
+        self.counts[phase] += 1
+
+    def close(self) -> None:
+        """Close the files of the export."""
+        for file in self.files.values():
+            file.close()
+        logger.info(log_messages.EXPORT_END, *self.counts.values(), self.folder)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exception_type, exception_value, traceback):
+        self.close()
+
+
+def read_typeql(file: str):
+    """Read the TypeQL queries of an exported load phase, or the queries
+    rejected by a previous load (see TypeDBLoader.reject).
+
+    :param file: The path of a file written by TypeQLExporter, or of a
+        dead-letter file
+    :type file: str
+
+    :raises ValueError: If a line is not valid JSON
+
+    :return: A generator of the TypeQL queries
+    """
+    opener = gzip.open if file.endswith(".gz") else open
+    with opener(file, "rt", encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            yield record["query"] if isinstance(record, dict) else record
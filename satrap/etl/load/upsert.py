@@ -0,0 +1,424 @@
+"""Idempotent loading of STIX objects into a database that already
+stores some of them."""
+
+import re
+from datetime import datetime
+
+from satrap.commons import file_utils
+from satrap.datamanagement.typedb import typedbmanager
+from satrap.datamanagement.typedb import typedb_constants
+from satrap.datamanagement.typedb.dataobjects import Entity, InsertQuery, Relation, Thing
+from satrap.datamanagement.typedb.inserthandler import TypeDBBatchInsertHandler
+from satrap.commons.log_utils import logger
+from satrap.etl.exceptions import MappingException
+from satrap.etl.load import log_messages
+from satrap.etl.transform.stix_to_typedb_mapper import STIXtoTypeDBMapper
+from satrap.etl.transform.stix_typeql_constants import TYPEDB_ID_ATTRIBUTE
+from satrap.settings import LOAD_BATCH_SIZE
+
+TIMESTAMP_REGEX = re.compile(r"(\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2})(?:\.(\d+))?")
+# STIX types of the objects stored as TypeDB relations
+SRO_TYPES = ("relationship", "sighting")
+
+
+def get_version(timestamp) -> str:
+    """Returns the 'modified' timestamp of a STIX object with the
+    millisecond precision of TypeDB, comparable across representations.
+
+    :param timestamp: A STIX timestamp, a TypeDB datetime or a datetime
+    :type timestamp: str | datetime
+
+    :return: The timestamp as 'YYYY-MM-DDTHH:MM:SS.mmm', None if not given
+    :rtype: str
+    """
+    if timestamp is None:
+        return None
+    if isinstance(timestamp, datetime):
+        timestamp = timestamp.strftime("%Y-%m-%dT%H:%M:%S.%f")
+    match = TIMESTAMP_REGEX.match(str(timestamp))
+    if not match:
+        return str(timestamp)
+    millis = (match[2] or "").ljust(typedb_constants.DATETIME_NUMBER_MILLIS, "0")
+    return f"{match[1]}.{millis[:typedb_constants.DATETIME_NUMBER_MILLIS]}"
+
+
+def get_typedb_type(stix_object: dict) -> str:
+    """Returns the TypeDB type of a STIX object according to the mapping,
+    which can depend on its properties (e.g. malware-family or
+    malware-instance for a malware).
+
+    :param stix_object: The STIX object
+    :type stix_object: dict
+
+    :return: The TypeDB type, None if it cannot be determined
+    :rtype: str
+    """
+    try:
+        return STIXtoTypeDBMapper.get_typeql_thing_name(
+            stix_object.get("type"), stix_object, stix_object.get("extensions")
+        )
+    except MappingException:
+        return None
+
+
+class Upserter:
+    """Selects the STIX objects to be loaded into a database according
+    to the version (stix-id, modified) of the objects already stored.
+
+    The stored versions are read once, in bulk, when entering the upserter,
+    unless they are given (e.g. the versions of a previously loaded bundle,
+    see read_versions). Unchanged objects are dropped before their
+    transformation, new ones are loaded as usual and modified ones are
+    replaced:
+
+    - the attributes of a modified entity are replaced in place, so that
+      the relations referencing it are preserved,
+    - a modified entity whose TypeDB type changed (e.g. a malware that
+      became a family), or without any attribute to update, is deleted
+      with all its relations and inserted again, as the type of a stored
+      entity cannot be changed. The relations referencing it from other
+      objects are only inserted again with the objects that are loaded,
+      i.e. new or modified,
+    - a modified SRO is deleted and inserted again,
+    - the embedded relations of the object (e.g. created-by, external
+      references, kill chain phases) are deleted, together with the
+      components inserted along with them, and inserted again. Their
+      types are those of the properties of its STIX type in the mapping,
+      so that the relations of the properties missing from the new
+      version are deleted too.
+
+    The previous version is matched by its stix-id only and deleted by
+    delete queries carried by the insert queries of the new version (see
+    InsertQuery.add_delete_queries), so that the loader runs them in the
+    same transaction as the insertion: a failed or interrupted load keeps
+    the previous version.
+    """
+
+    def __init__(self, server_address: str, db_name: str, stored: dict[str, str] = None):
+        """Instantiate the upserter.
+
+        :param server_address: The address of the TypeDB server
+        :type server_address: str
+        :param db_name: The name of the database
+        :type db_name: str
+        :param stored: The version and TypeDB type of every STIX object
+            stored in the database, read from the database if not given
+        :type stored: dict[str, tuple[str, str]], optional
+        """
+        self.server_address = server_address
+        self.db_name = db_name
+        self.stored = stored
+        # stored objects found among the objects to be loaded
+        self.present: set[str] = set()
+        # stix-ids of the modified objects, by their TypeQL representation
+        self.replaced: dict[str, str] = {}
+        self.new = 0
+        self.unchanged = 0
+        self.inserter = None
+
+    def select(self, stix_objects):
+        """Drop the STIX objects stored in the database with the same
+        version.
+
+        :param stix_objects: The STIX objects to be loaded
+        :type stix_objects: Iterable
+
+        :return: A generator of the new and modified objects
+        """
+        for stix_object in stix_objects:
+            stix_id = stix_object.get("id")
+            if stix_id not in self.stored:
+                self.new += 1
+                yield stix_object
+                continue
+            self.present.add(stix_id)
+            if self.stored[stix_id][0] == get_version(stix_object.get("modified")):
+                self.unchanged += 1
+            else:
+                self.replaced[typedb_constants.to_typedb_string(stix_id)] = stix_id
+                yield stix_object
+
+    def route(self, transformed: tuple) -> tuple:
+        """Route the insert queries of a modified STIX object to its
+        replacement: the returned queries delete its previous version and
+        update it. The database is not accessed.
+
+        The deletions of an entity are carried by its update query, except
+        those of its embedded relations, carried by the query inserting
+        the new ones if there is one. The deletions of an SRO (the SRO and
+        its embedded relations) are carried by the SRO query, as the
+        previous embedded relations are only found through the previous SRO.
+
+        :param transformed: The (entity, SRO, embedded relation) insert
+            queries of a STIX object
+        :type transformed: tuple[InsertQuery, InsertQuery, InsertQuery]
+
+        :return: The insert queries to be loaded for the object
+        :rtype: tuple[InsertQuery, InsertQuery, InsertQuery]
+        """
+        main_object = self.get_main_object(transformed)
+        if main_object is None:
+            return transformed
+        stix_id = self.replaced.get(main_object.get_attributes()[TYPEDB_ID_ATTRIBUTE][0])
+        if stix_id is None:
+            return transformed
+
+        queries = list(transformed)
+        components, embedded = self.build_delete_queries(stix_id, main_object)
+        if isinstance(main_object, Relation):
+            queries[1] = self.add_deletes(queries[1], [*embedded, *components])
+            return tuple(queries)
+
+        update = None
+        if self.stored[stix_id][1] == main_object.get_type():
+            update = self.build_update_query(main_object, queries[0])
+        if update is None:
+            queries[0] = self.add_deletes(queries[0], self.build_removal_queries(stix_id))
+            return tuple(queries)
+        update.add_delete_queries(components)
+        if queries[2]:
+            queries[2] = self.add_deletes(queries[2], embedded)
+        else:
+            update.add_delete_queries(embedded)
+        queries[0] = update
+        return tuple(queries)
+
+    def delete_removed(self, batch_size: int = LOAD_BATCH_SIZE) -> int:
+        """Delete the stored STIX objects that were not found among the
+        loaded ones, the SROs before the objects they might reference.
+
+        The objects are deleted batch_size at a time, in one transaction
+        per batch. The objects of a failed batch are deleted one by one,
+        to delete all but the failing ones.
+
+        :param batch_size: The number of objects deleted per transaction
+        :type batch_size: int, optional
+
+        :return: The number of deleted objects
+        :rtype: int
+        """
+        removed = sorted(
+            set(self.stored) - self.present,
+            key=lambda stix_id: (stix_id.split("--")[0] not in SRO_TYPES, stix_id)
+        )
+        batch_size = max(1, batch_size)
+        deleted = 0
+        for start in range(0, len(removed), batch_size):
+            batch = removed[start:start + batch_size]
+            if self.inserter.delete(
+                [query for stix_id in batch for query in self.build_removal_queries(stix_id)]
+            ):
+                deleted += len(batch)
+            elif len(batch) > 1:
+                for stix_id in batch:
+                    if self.inserter.delete(self.build_removal_queries(stix_id)):
+                        deleted += 1
+        logger.info(log_messages.UPSERT_REMOVED, deleted, len(removed))
+        return deleted
+
+    @staticmethod
+    def read_versions(bundle_file: str) -> dict[str, tuple[str, str]]:
+        """Read the version and TypeDB type of every object of a STIX
+        bundle, streaming the file.
+
+        :param bundle_file: The path of the STIX bundle
+        :type bundle_file: str
+
+        :raises KeyError: If the bundle has no 'objects'
+        :raises ValueError: If the file content is not valid JSON
+
+        :return: The 'modified' timestamp (None for the objects without
+            one) and the TypeDB type (None if it cannot be determined) of
+            every stix-id
+        :rtype: dict[str, tuple[str, str]]
+        """
+        STIXtoTypeDBMapper.get_data()
+        return {
+            stix_object["id"]: (get_version(stix_object.get("modified")),
+                                get_typedb_type(stix_object))
+            for stix_object in file_utils.stream_json_array(bundle_file, "objects")
+        }
+
+    @staticmethod
+    def build_removal_queries(stix_id: str) -> list[str]:
+        """Create the TypeQL delete queries of a stored STIX object, the
+        components of its embedded relations and every relation where it
+        is a role player: its embedded relations, the ones of other
+        objects referencing it (e.g. created-by, object-marking) and the
+        SROs relating it, with their own components and embedded relations.
+
+        :param stix_id: The stix-id of the object
+        :type stix_id: str
+
+        :return: The delete queries
+        :rtype: list[str]
+        """
+        match = Upserter.build_match(stix_id)
+        sro = f"{match} $sro ($object) isa relation, has {TYPEDB_ID_ATTRIBUTE} $sro-id;"
+        queries = [
+            f"{owner_match} $relation ({owner}, $component) isa relation; "
+            f"not {{ $relation has {TYPEDB_ID_ATTRIBUTE} $relation-id; }}; "
+            f"not {{ $component has {TYPEDB_ID_ATTRIBUTE} $component-id; }}; "
+            "delete $component isa thing;"
+            for owner_match, owner in ((sro, "$sro"), (match, "$object"))
+        ]
+        return [
+            *queries,
+            f"{sro} $relation ($sro) isa relation; "
+            f"not {{ $relation has {TYPEDB_ID_ATTRIBUTE} $relation-id; }}; "
+            "delete $relation isa relation;",
+            f"{match} $relation ($object) isa relation; delete $relation isa relation;",
+            f"{match} delete $object isa thing;"
+        ]
+
+    @staticmethod
+    def get_main_object(transformed: tuple) -> Thing:
+        """Returns the thing representing the STIX object itself in its
+        insert queries.
+
+        :param transformed: The (entity, SRO, embedded relation) insert
+            queries of a STIX object
+        :type transformed: tuple[InsertQuery, InsertQuery, InsertQuery]
+
+        :return: The thing with a stix-id in the entity or SRO insert
+            query, None if there is none
+        :rtype: Thing
+        """
+        for query in transformed[:2]:
+            if query:
+                for thing in query.get_insert_clause():
+                    if TYPEDB_ID_ATTRIBUTE in thing.get_attributes():
+                        return thing
+        return None
+
+    @staticmethod
+    def build_match(stix_id: str) -> str:
+        """Create the TypeQL match clause of a stored STIX object, matched
+        by its stix-id only, whatever its type.
+
+        :param stix_id: The stix-id of the object
+        :type stix_id: str
+
+        :return: The match clause, binding $object
+        :rtype: str
+        """
+        return (f"match $object has {TYPEDB_ID_ATTRIBUTE} "
+                f"{typedb_constants.to_typedb_string(stix_id)};")
+
+    @staticmethod
+    def build_delete_queries(stix_id: str, main_object: Thing) -> tuple[list[str], list[str]]:
+        """Create the TypeQL delete queries of the previous version of a
+        STIX object stored with the same TypeDB type.
+
+        The relations deleted are all those that the objects of its STIX
+        type can play a role in according to the mapping (see
+        STIXtoTypeDBMapper.get_object_relations), whether the new version
+        has the corresponding properties or not. A relation whose role is
+        played by the object for its own properties and for the ones of
+        other objects (e.g. the parent in a process hierarchy) is deleted
+        in both cases.
+
+        :param stix_id: The stix-id of the object
+        :type stix_id: str
+        :param main_object: The thing representing the new version
+        :type main_object: Thing
+
+        :return: The delete queries of the components of the object, with
+            their relations, and of its attributes (entity) or itself
+            (SRO), and the delete queries of its embedded relations to
+            other STIX objects
+        :rtype: tuple[list[str], list[str]]
+        """
+        match = Upserter.build_match(stix_id)
+        components, embedded = [], []
+        for relation, object_role, value_role, component in \
+                STIXtoTypeDBMapper.get_object_relations(stix_id.split("--")[0]):
+            if component:
+                components.append(
+                    f"{match} $relation ({object_role}: $object, {value_role}: $component) "
+                    f"isa {relation}; delete $relation isa {relation}; $component isa thing;"
+                )
+            else:
+                embedded.append(
+                    f"{match} $relation ({object_role}: $object) isa {relation}; "
+                    f"delete $relation isa {relation};"
+                )
+
+        if isinstance(main_object, Relation):
+            components.append(f"{match} delete $object isa thing;")
+        else:
+            components.append(
+                f"{match} $object has $attribute; "
+                f"not {{ $attribute isa {TYPEDB_ID_ATTRIBUTE}; }}; "
+                f"delete $object has $attribute;"
+            )
+        # the same relation can be mapped for several properties
+        return list(dict.fromkeys(components)), list(dict.fromkeys(embedded))
+
+    @staticmethod
+    def build_update_query(main_object: Entity, entity_query: InsertQuery) -> InsertQuery:
+        """Create the query updating a stored entity with the attributes
+        of its new version, instead of inserting it. The stored entity has
+        the type of the new version.
+
+        :param main_object: The entity representing the STIX object
+        :type main_object: Entity
+        :param entity_query: The insert query of the new version
+        :type entity_query: InsertQuery
+
+        :return: The update query, None if the entity has no attribute
+            besides its stix-id
+        :rtype: InsertQuery
+        """
+        stored = Entity(main_object.get_variable(), main_object.get_type())
+        # bound in the match clause, it only gets the attributes
+        update = Entity(main_object.get_variable(), main_object.get_type())
+        for name, values in main_object.get_attributes().items():
+            for value in values:
+                if name == TYPEDB_ID_ATTRIBUTE:
+                    stored.add_attribute(name, value)
+                else:
+                    update.add_attribute(name, value)
+        if not update.get_attributes():
+            return None
+
+        query = InsertQuery()
+        query.add_to_match_clause(stored)
+        query.add_to_insert_clause(update)
+        for thing in entity_query.get_insert_clause():
+            if thing is not main_object:
+                query.add_to_insert_clause(thing)
+        return query
+
+    @staticmethod
+    def add_deletes(query: InsertQuery, deletes: list[str]) -> InsertQuery:
+        """Returns a copy of an insert query carrying delete queries, the
+        transformed query being left unchanged (e.g. when it is cached).
+
+        :param query: The insert query
+        :type query: InsertQuery
+        :param deletes: The TypeQL delete queries
+        :type deletes: list[str]
+
+        :return: The insert query with the delete queries
+        :rtype: InsertQuery
+        """
+        replacement = InsertQuery()
+        replacement.extend(query)
+        replacement.add_delete_queries(deletes)
+        return replacement
+
+    def __enter__(self):
+        if self.stored is None:
+            self.stored = {
+                stix_id: (get_version(modified), typedb_type) for stix_id, (modified, typedb_type)
+                in typedbmanager.get_stix_versions(self.server_address, self.db_name).items()
+            }
+            logger.info(log_messages.UPSERT_STORED, len(self.stored), self.db_name)
+        self.inserter = TypeDBBatchInsertHandler(self.server_address, self.db_name)
+        self.inserter.__enter__()
+        return self
+
+    def __exit__(self, exception_type, exception_value, traceback):
+        self.inserter.__exit__(exception_type, exception_value, traceback)
+        logger.info(log_messages.UPSERT_SUMMARY, self.new, len(self.replaced), self.unchanged)
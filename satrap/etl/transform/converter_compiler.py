@@ -0,0 +1,310 @@
+"""Compiler of the STIX to TypeDB mapping into Python functions converting
+the properties of the STIX objects of each type."""
+
+import re
+from typing import Callable
+
+from satrap.commons.log_utils import logger
+from satrap.etl.exceptions import MappingException
+from satrap.etl.transform import log_messages
+from satrap.etl.transform.stix_to_typedb_mapper import STIXtoTypeDBMapper
+from satrap.etl.transform.valueconverter import ValueConverter
+from satrap.datamanagement.typedb import typedb_constants
+import satrap.etl.transform.stix_typeql_constants as constants
+
+# file name of the generated code in tracebacks
+COMPILED_FILENAME = "<satrap compiled converters>"
+
+# value types converted inline by the generated code
+PRIMITIVE_TYPES = (
+    typedb_constants.STRING, typedb_constants.LONG, typedb_constants.DOUBLE,
+    typedb_constants.BOOLEAN, typedb_constants.DATETIME,
+)
+EMPTY_TYPES = (constants.TYPEQL_NOT_IMPLEMENTED_TYPE_KEYWORD, constants.TYPEQL_ROLEPLAYER)
+
+PRELUDE = '''\
+from satrap.commons.log_utils import logger
+from satrap.datamanagement.typedb.typedb_constants import (
+    BOOLEAN_FALSE, BOOLEAN_TRUE, to_typedb_string
+)
+from satrap.etl.exceptions import MappingException
+from satrap.etl.transform import log_messages
+from satrap.etl.transform.query import QueryBundle
+from satrap.etl.transform.valueconverter import (
+    ValueConverter, format_datetime_typeql, parse_datetime
+)
+
+
+def _string(value):
+    return to_typedb_string(value)
+
+
+def _long(value):
+    return str(int(value))
+
+
+def _double(value):
+    return str(float(value))
+
+
+def _boolean(value):
+    if value is True:
+        return BOOLEAN_TRUE
+    if value is False:
+        return BOOLEAN_FALSE
+    raise ValueError("Invalid boolean")
+
+
+def _datetime(value):
+    return format_datetime_typeql(*parse_datetime(value))
+
+
+def _convert_empty(value, reference, name):
+    return [], None
+'''
+
+PRIMITIVE_CONVERTER = '''
+
+def {function}(value, reference, name):
+    return [_{value_type}(value)], None
+'''
+
+LIST_CONVERTER = '''
+
+def {function}(value, reference, name):
+    # a single value is a list of one element, as when parsed by stix2
+    if isinstance(value, (str, dict)):
+        value = [value]
+    return [_{value_type}(element) for element in value], None
+'''
+
+GENERIC_CONVERTER = '''
+
+def {function}(value, reference, name):
+    return ValueConverter.convert({value_type!r}, value, reference=reference, name=name)
+'''
+
+OBJECT_CONVERTER = '''
+
+{table} = {{
+{entries}
+}}
+
+
+def {function}(converter, properties, reference):
+    """Convert the properties of a '{stix_type}' object."""
+    attributes = {{}}
+    queries = QueryBundle()
+    for stix_name, stix_value in properties.items():
+        entry = {table}.get(stix_name)
+        if entry is None:
+            # custom property or invalid mapping
+            name, values, additional_queries = converter.create_typeql_property(
+                stix_name, stix_value, reference
+            )
+        else:
+            name, value_type, convert = entry
+            try:
+                values, additional_queries = convert(stix_value, reference, name)
+            except ValueError as e:
+                logger.error(log_messages.CONVERSION_FAILED.format(
+                    reference=reference.get_id(), value_type=value_type,
+                    stix_name=stix_name, stix_value=stix_value, exception=e
+                ))
+                continue
+            except MappingException as e:
+                logger.error(log_messages.MAPPING_INVALID.format(
+                    reference=reference.get_id(), stix_name=stix_name,
+                    stix_value=stix_value, exception=e
+                ))
+                continue
+        if name and values:
+            if not attributes.get(name):
+                attributes[name] = values
+            else:
+                attributes[name].extend(values)
+        if additional_queries is not None:
+            queries.extend(additional_queries)
+    return attributes, queries
+'''
+
+
+class ConverterCompiler:
+    """Generates, from the mapping, a Python function converting the
+    properties of the objects of each STIX type, in place of the generic
+    interpretation of the mapping (see STIXObjectConverter.create_typeql_properties).
+
+    The attribute names and value types are written as constants in the
+    generated code and the primitive values are converted inline, the
+    others by their stateless conversion (see ValueConverter.convert). The
+    properties missing from the mapping (custom properties) or with an
+    invalid mapping are converted by the generic path, which reports them.
+
+    The code is generated and compiled in memory once per process, and
+    generated again when the mapping is reloaded.
+    """
+
+    # the converter of each STIX type and the mapping they were loaded for
+    converters: dict[str, Callable] = None
+    mapping = None
+
+    @staticmethod
+    def get_converter(stix_type: str) -> Callable:
+        """Returns the generated converter of the properties of a STIX type.
+
+        :param stix_type: The STIX type, e.g. attack-pattern
+        :type stix_type: str
+
+        :return: The function converting the properties of an object,
+            with the same result as create_typeql_properties. None if the
+            type has no generated converter
+        :rtype: Callable
+        """
+        if ConverterCompiler.mapping is not STIXtoTypeDBMapper.stix_objects:
+            ConverterCompiler.converters = ConverterCompiler.load()
+            ConverterCompiler.mapping = STIXtoTypeDBMapper.stix_objects
+        return ConverterCompiler.converters.get(stix_type)
+
+    @staticmethod
+    def load() -> dict[str, Callable]:
+        """Generates the converters from the loaded mapping and compiles
+        them. The code is only held in memory, it is generated again by
+        every process.
+
+        :return: The converter of each STIX type
+        :rtype: dict[str, Callable]
+        """
+        STIXtoTypeDBMapper.get_data()
+        source = ConverterCompiler.generate()
+        namespace = {"__name__": "satrap_compiled_converters"}
+        exec(compile(source, COMPILED_FILENAME, "exec"), namespace)
+        return namespace["CONVERTERS"]
+
+    @staticmethod
+    def generate() -> str:
+        """Generates the code of the converters from the loaded mapping.
+
+        :return: The Python code, defining the converter of each STIX
+            type in CONVERTERS
+        :rtype: str
+        """
+        parts = [
+            "# Generated from the STIX to TypeDB mapping by "
+            "satrap.etl.transform.converter_compiler.\n\n",
+            PRELUDE,
+        ]
+        value_converters: dict[str, str] = {}
+        names = set()
+        object_converters = {}
+
+        for stix_type in sorted(STIXtoTypeDBMapper.stix_objects):
+            entries = []
+            for stix_name, (attribute_name, value_type) in \
+                    ConverterCompiler.get_attributes(stix_type).items():
+                if value_type not in value_converters:
+                    code = ConverterCompiler.generate_value_converter(value_type, names)
+                    if code is None:
+                        value_converters[value_type] = None
+                        continue
+                    value_converters[value_type], converter_code = code
+                    parts.append(converter_code)
+                if value_converters[value_type] is None:
+                    continue
+                entries.append(f"    {stix_name!r}: ({attribute_name!r}, {value_type!r}, "
+                               f"{value_converters[value_type]}),")
+            if not entries:
+                continue
+
+            identifier = ConverterCompiler.get_identifier(stix_type, names)
+            object_converters[stix_type] = f"convert_{identifier}"
+            parts.append(OBJECT_CONVERTER.format(
+                table=f"_{identifier.upper()}",
+                entries="\n".join(entries),
+                function=f"convert_{identifier}",
+                stix_type=stix_type,
+            ))
+
+        parts.append("\n\nCONVERTERS = {\n")
+        parts.extend(f"    {stix_type!r}: {function},\n"
+                     for stix_type, function in object_converters.items())
+        parts.append("}\n")
+        logger.debug(log_messages.COMPILED_CONVERTERS_GENERATED, len(object_converters))
+        return "".join(parts)
+
+    @staticmethod
+    def get_attributes(stix_type: str) -> dict[str, tuple[str, str]]:
+        """Returns the attribute info of the properties of a STIX type
+        with a valid mapping.
+
+        :param stix_type: The STIX type
+        :type stix_type: str
+
+        :return: The TypeDB attribute name and value type of each property
+        :rtype: dict[str, tuple[str, str]]
+        """
+        object_info = STIXtoTypeDBMapper.stix_objects[stix_type]
+        specific_attributes = object_info.get(constants.MAPPING_ATTRIBUTES)
+        if not specific_attributes:
+            return {}
+
+        attributes = {}
+        for stix_name in [*STIXtoTypeDBMapper.common_attributes, *specific_attributes]:
+            try:
+                attribute_name, value_type = STIXtoTypeDBMapper \
+                    .get_object_attribute_info(stix_type, stix_name)
+            except MappingException:
+                continue
+            if attribute_name and value_type:
+                attributes[stix_name] = (attribute_name, value_type)
+        return attributes
+
+    @staticmethod
+    def generate_value_converter(value_type: str, names: set[str]) -> tuple[str, str]:
+        """Generates the function converting the values of a value type.
+
+        :param value_type: The value type, e.g. "list:string"
+        :type value_type: str
+        :param names: The identifiers already used in the generated code
+        :type names: set[str]
+
+        :return: The name and code of the function, None if the value
+            type has no converter
+        :rtype: tuple[str, str]
+        """
+        try:
+            ValueConverter.get_conversion(value_type)
+        except ValueError:
+            return None
+        main_type, subtype = STIXtoTypeDBMapper.split_type(value_type)
+        if main_type in EMPTY_TYPES:
+            return "_convert_empty", ""
+
+        function = "_convert_" + ConverterCompiler.get_identifier(value_type, names)
+        if main_type in PRIMITIVE_TYPES:
+            template, value_type = PRIMITIVE_CONVERTER, main_type
+        elif main_type == constants.TYPEQL_LIST_PREFIX and subtype in PRIMITIVE_TYPES:
+            template, value_type = LIST_CONVERTER, subtype
+        else:
+            template = GENERIC_CONVERTER
+        return function, template.format(function=function, value_type=value_type)
+
+    @staticmethod
+    def get_identifier(name: str, names: set[str]) -> str:
+        """Returns a Python identifier, not used yet, derived from a name.
+
+        :param name: The name, e.g. a STIX type
+        :type name: str
+        :param names: The identifiers already used, the returned one is
+            added to them
+        :type names: set[str]
+
+        :return: The identifier
+        :rtype: str
+        """
+        identifier = base = re.sub(r"\W", "_", name)
+        number = 1
+        while identifier in names:
+            number += 1
+            identifier = f"{base}_{number}"
+        names.add(identifier)
+        return identifier
@@ -56,6 +56,19 @@ MAPPING_INVALID = ("Invalid mapping in '{reference}' for '{stix_name}': "
 	"'{stix_value}'.\n{exception}")
 INVALID_SCHEMA = "Schema invalid"
 
+# mapping snapshot
+MAPPING_SNAPSHOT_LOADED = "Precompiled mapping loaded from %s"
+MAPPING_SNAPSHOT_SAVED = "Precompiled mapping saved to %s"
+MAPPING_SNAPSHOT_SAVE_FAILED = "Precompiled mapping could not be saved to %s: %s"
+MAPPING_SNAPSHOT_NOT_SAVED = "Mapping invalid, precompiled mapping not saved: %s"
+
+# generated converters
+COMPILED_CONVERTERS_GENERATED = "Converters generated from the mapping for %i STIX types"
+
+# transformation cache
+TRANSFORM_CACHE_SUMMARY = ("Transformation cache: %i STIX objects found, %i transformed, "
+	"%i entries evicted")
+
 # value conversion failed
 CONVERSION_FAILED = ("Conversion of type '{value_type}' failed in '{reference}' for "
 	"\"{stix_name}\": \"{stix_value}\". {exception}")
@@ -0,0 +1,154 @@
+"""Templates of the transformation of STIX objects sharing the same shape,
+i.e. the same type and set of properties."""
+
+from typing import Any
+
+from satrap.etl.exceptions import MappingException
+from satrap.etl.transform.query import QueryBundle
+from satrap.etl.transform.stix_to_typedb_mapper import STIXtoTypeDBMapper
+from satrap.etl.transform.valueconverter import ValueConverter
+
+# maximum number of cached templates, the cache is cleared when exceeded
+MAX_TEMPLATES = 4096
+
+
+class PropertyStep:
+    """The precompiled transformation of a STIX property: the name and
+    value type of the TypeDB attribute and the conversion of its values.
+
+    The mapping lookups are done once, when compiling the step. A mapping
+    error or a value type without converter is kept in the step, to be
+    reported for every object having the property.
+    """
+
+    __slots__ = ("attribute_name", "value_type", "conversion", "subtype", "error")
+
+    def __init__(self, attribute_name: str, value_type: str, error: Exception = None):
+        """Compile the transformation of a property.
+
+        :param attribute_name: The name of the TypeDB attribute, None for
+            a custom property
+        :type attribute_name: str
+        :param value_type: The value type of the TypeDB attribute
+        :type value_type: str
+        :param error: The mapping error raised when looking up the
+            attribute, if any
+        :type error: Exception, optional
+        """
+        self.attribute_name = attribute_name
+        self.value_type = value_type
+        self.error = error
+        self.conversion = None
+        self.subtype = ""
+        if attribute_name and value_type and error is None:
+            try:
+                self.conversion, self.subtype = ValueConverter.get_conversion(value_type)
+            except ValueError:
+                # raised again by convert, for every value
+                pass
+
+    def convert(self, value: Any, **kwargs) -> tuple[list[str], QueryBundle]:
+        """Convert a value of the property.
+
+        :param value: The STIX value
+        :type value: Any
+
+        :raises ValueError: If the value could not be converted
+        :raises MappingException: If the mapping is invalid
+
+        :return: The values and additional insert queries, None if the
+            value requires no additional query
+        :rtype: tuple[list[str], QueryBundle]
+        """
+        if self.conversion is None:
+            # raises ValueError
+            return ValueConverter.convert(self.value_type, value, **kwargs)
+        return self.conversion(value, self.subtype, **kwargs)
+
+
+class ShapeTemplate:
+    """The precompiled transformation of the properties of the STIX objects
+    of a shape: a STIX type, a set of property names and an extension ("" for
+    the properties of the object itself).
+
+    The objects of a feed mostly share a few shapes, whose templates are
+    cached: only the first object of a shape looks up the mapping and the
+    converters, the following ones only convert their values. The cache is
+    cleared when the mapping is compiled again.
+    """
+
+    templates: dict[tuple, "ShapeTemplate"] = {}
+    # the mapping the cached templates were compiled from
+    mapping = None
+
+    def __init__(self, stix_type: str, property_names, extension: str = ""):
+        """Compile the template of a shape.
+
+        :param stix_type: The STIX type, e.g. attack-pattern
+        :type stix_type: str
+        :param property_names: The names of the properties
+        :type property_names: Iterable[str]
+        :param extension: The name of the extension whose properties are
+            transformed, "" for the properties of the object
+        :type extension: str, optional
+        """
+        self.steps: dict[str, PropertyStep] = {
+            name: ShapeTemplate.compile_step(stix_type, name, extension)
+            for name in property_names
+        }
+
+    @staticmethod
+    def compile_step(stix_type: str, property_name: str, extension: str = "") -> PropertyStep:
+        """Compile the transformation of a property.
+
+        :param stix_type: The STIX type
+        :type stix_type: str
+        :param property_name: The name of the property
+        :type property_name: str
+        :param extension: The name of the extension of the property, ""
+            for a property of the object
+        :type extension: str, optional
+
+        :return: The transformation of the property
+        :rtype: PropertyStep
+        """
+        try:
+            if extension:
+                name, value_type = STIXtoTypeDBMapper.get_extension_attribute_info(
+                    stix_type, extension, property_name
+                )
+            else:
+                name, value_type = STIXtoTypeDBMapper.get_object_attribute_info(
+                    stix_type, property_name
+                )
+        except MappingException as e:
+            return PropertyStep(None, None, e)
+        return PropertyStep(name, value_type)
+
+    @staticmethod
+    def get(stix_type: str, properties: dict, extension: str = "") -> "ShapeTemplate":
+        """Returns the template of the shape of an object (or extension),
+        compiling it if it is not cached.
+
+        :param stix_type: The STIX type of the object
+        :type stix_type: str
+        :param properties: The properties of the object or extension
+        :type properties: dict
+        :param extension: The name of the extension, "" for the
+            properties of the object
+        :type extension: str, optional
+
+        :return: The template
+        :rtype: ShapeTemplate
+        """
+        if ShapeTemplate.mapping is not STIXtoTypeDBMapper.stix_objects \
+                or len(ShapeTemplate.templates) >= MAX_TEMPLATES:
+            ShapeTemplate.templates.clear()
+            ShapeTemplate.mapping = STIXtoTypeDBMapper.stix_objects
+
+        key = (stix_type, frozenset(properties), extension)
+        template = ShapeTemplate.templates.get(key)
+        if template is None:
+            template = ShapeTemplate(stix_type, properties, extension)
+            ShapeTemplate.templates[key] = template
+        return template
@@ -1,12 +1,18 @@
+import os
 import re
+import pickle
+import hashlib
+from types import MappingProxyType
 from typing import Any
 
-from jsonschema import validate
+from jsonschema import validate, ValidationError, SchemaError
 
 from satrap.commons import file_utils
+from satrap.commons.log_utils import logger
 from satrap.etl.exceptions import MappingException
 import satrap.etl.stix_constants
 import satrap.etl.transform.stix_typeql_constants as constants
+from satrap.etl.transform import log_messages
 from satrap.datamanagement.typedb import typedb_constants
 
 
@@ -22,6 +28,14 @@ class STIXtoTypeDBMapper:
     sros_role_info: dict = None
     key_value_pairs: dict = None
     dictionary_data: dict = None
+    compiled: bool = False
+    validated: bool = False
+
+    # reverse indexes built when compiling the mapping
+    class_index: dict[str, str] = None
+    supertype_index: dict[str, str] = None
+    roleplayers_index: dict[str, tuple[str, ...]] = None
+    attribute_index: dict[tuple[str, str], tuple[str, str]] = None
 
     @staticmethod
     def split_type(value_type: str) -> tuple[str, str]:
@@ -61,7 +75,32 @@ class STIXtoTypeDBMapper:
         return tl_type + constants.MAPPING_TYPE_SEPARATOR + subtype
 
     @staticmethod
-    def validate():
+    def read_mappings() -> dict[str, dict]:
+        """Reads the JSON mapping files from disk.
+
+        :return: The content of the mapping files, by name of the
+            class attribute that holds the mapping
+        :rtype: dict[str, dict]
+        """
+        stix_objects = file_utils.read_json(constants.FILE_SDO)
+        stix_objects.update(file_utils.read_json(constants.FILE_SRO))
+        stix_objects.update(file_utils.read_json(constants.FILE_SCO))
+        stix_objects.update(file_utils.read_json(constants.FILE_SMO))
+
+        return {
+            "classes": file_utils.read_json(constants.FILE_CLASSES),
+            "stix_objects": stix_objects,
+            "composites_mapping": file_utils.read_json(constants.FILE_COMPOSITES),
+            "common_attributes": file_utils.read_json(
+                constants.FILE_COMMON_ATTRIBUTES
+            ),
+            "sros_role_info": file_utils.read_json(constants.FILE_SRO_ROLES_INFO),
+            "key_value_pairs": file_utils.read_json(constants.FILE_KEY_VALUE_PAIRS),
+            "dictionary_data": file_utils.read_json(constants.FILE_DICTIONARY_DATA)
+        }
+
+    @staticmethod
+    def validate(mappings: dict[str, dict] = None):
         """Validates STIX to TypeDB JSON mappings against predefined schema files.
 
         This function reads various schema files in JSON format and validates
@@ -69,9 +108,16 @@ class STIXtoTypeDBMapper:
         schemas. The schemas include classes, STIX objects, composites, SRO roles,
         key-value pairs, a dictionary type, and common attributes.
 
+        :param mappings: The mappings as returned by read_mappings, read
+            from the mapping files if not given
+        :type mappings: dict[str, dict], optional
+
         :raises ValidationError: If a mapping file does not match the schema
         :raises SchemaError: If a JSON schema file is invalid
         """
+        if mappings is None:
+            mappings = STIXtoTypeDBMapper.read_mappings()
+
         schema_classes = file_utils.read_json(
             constants.FILE_SCHEMA_CLASSES
         )
@@ -94,22 +140,203 @@ class STIXtoTypeDBMapper:
             constants.FILE_SCHEMA_COMMON_ATTRIBUTES
         )
 
-        validate(STIXtoTypeDBMapper.classes, schema_classes)
-        validate(STIXtoTypeDBMapper.stix_objects, schema_stix_objects)
-        validate(STIXtoTypeDBMapper.composites_mapping, schema_composites)
-        validate(STIXtoTypeDBMapper.common_attributes,
-                 schema_common_attributes)
-        validate(STIXtoTypeDBMapper.sros_role_info, schema_sro_roles)
-        validate(STIXtoTypeDBMapper.key_value_pairs, schema_key_value_pairs)
-        validate(STIXtoTypeDBMapper.dictionary_data, schema_dictionary)
+        validate(mappings["classes"], schema_classes)
+        validate(mappings["stix_objects"], schema_stix_objects)
+        validate(mappings["composites_mapping"], schema_composites)
+        validate(mappings["common_attributes"], schema_common_attributes)
+        validate(mappings["sros_role_info"], schema_sro_roles)
+        validate(mappings["key_value_pairs"], schema_key_value_pairs)
+        validate(mappings["dictionary_data"], schema_dictionary)
+        STIXtoTypeDBMapper.validated = True
+
+    @staticmethod
+    def freeze(value: Any) -> Any:
+        """Returns an immutable copy of a JSON value, where objects are
+        read-only mappings and arrays are tuples.
+
+        :param value: The JSON value
+        :type value: Any
+
+        :return: The immutable value
+        :rtype: Any
+        """
+        if isinstance(value, dict):
+            return MappingProxyType(
+                {k: STIXtoTypeDBMapper.freeze(v) for k, v in value.items()}
+            )
+        if isinstance(value, list):
+            return tuple(STIXtoTypeDBMapper.freeze(v) for v in value)
+        return value
+
+    @staticmethod
+    def compile(mappings: dict[str, dict]) -> None:
+        """Freezes the mappings into the immutable structures shared by
+        all the converters.
+
+        :param mappings: The mappings as returned by read_mappings
+        :type mappings: dict[str, dict]
+        """
+        for name, mapping in mappings.items():
+            setattr(STIXtoTypeDBMapper, name, STIXtoTypeDBMapper.freeze(mapping))
+        STIXtoTypeDBMapper.build_indexes()
+        STIXtoTypeDBMapper.compiled = True
+
+    @staticmethod
+    def build_indexes() -> None:
+        """Builds the reverse indexes used for the per-object lookups:
+        STIX type to class, STIX type to TypeDB supertype, SRO type to
+        roleplayer properties and (STIX type, property) to attribute info.
+
+        Only complete entries are indexed, the lookups fall back to the
+        mapping for other keys to report the missing information.
+        """
+        class_index = {}
+        for category, stix_object_types in STIXtoTypeDBMapper.classes.items():
+            for stix_type in stix_object_types:
+                class_index.setdefault(stix_type, category)
+
+        common_attributes = {}
+        for stix_name, attr_info in STIXtoTypeDBMapper.common_attributes.items():
+            name = attr_info.get(constants.MAPPING_ATTRIBUTE_TYPEDB_NAME)
+            value = attr_info.get(constants.MAPPING_ATTRIBUTE_TYPEDB_VALUE_TYPE)
+            if name and value:
+                common_attributes[stix_name] = (name, value)
+
+        supertype_index = {}
+        roleplayers_index = {}
+        attribute_index = {}
+        for stix_type, object_info in STIXtoTypeDBMapper.stix_objects.items():
+            sup_type = object_info.get(constants.OBJECTS_TYPEDB_TYPE)
+            if sup_type:
+                supertype_index[stix_type] = sup_type
+
+            attributes = object_info.get(constants.MAPPING_ATTRIBUTES)
+            if not attributes:
+                continue
+            roleplayers = []
+            for stix_name, attr_info in attributes.items():
+                name = attr_info.get(constants.MAPPING_ATTRIBUTE_TYPEDB_NAME)
+                value = attr_info.get(constants.MAPPING_ATTRIBUTE_TYPEDB_VALUE_TYPE)
+                if value == constants.TYPEQL_ROLEPLAYER:
+                    roleplayers.append(stix_name)
+                if name and value:
+                    attribute_index[(stix_type, stix_name)] = (name, value)
+            roleplayers_index[stix_type] = tuple(roleplayers)
+            # common attributes take precedence over specific ones
+            for stix_name, info in common_attributes.items():
+                attribute_index[(stix_type, stix_name)] = info
+
+        STIXtoTypeDBMapper.class_index = MappingProxyType(class_index)
+        STIXtoTypeDBMapper.supertype_index = MappingProxyType(supertype_index)
+        STIXtoTypeDBMapper.roleplayers_index = MappingProxyType(roleplayers_index)
+        STIXtoTypeDBMapper.attribute_index = MappingProxyType(attribute_index)
+
+    @staticmethod
+    def get_file_signatures() -> dict[str, tuple[int, str]]:
+        """Returns the modification time and hash of the mapping and
+        schema files.
+
+        :return: The modification time in nanoseconds and the SHA-256
+            digest of each file, by path
+        :rtype: dict[str, tuple[int, str]]
+        """
+        signatures = {}
+        for path in constants.MAPPING_SOURCE_FILES:
+            with open(path, "rb") as f:
+                digest = hashlib.sha256(f.read()).hexdigest()
+            signatures[path] = (os.stat(path).st_mtime_ns, digest)
+        return signatures
+
+    @staticmethod
+    def is_snapshot_current(signatures: dict[str, tuple[int, str]]) -> bool:
+        """States whether the mapping and schema files are unchanged since
+        a snapshot was taken. A file is unchanged only if both its
+        modification time and its content hash are the same: a touched file
+        invalidates the snapshot, and so does a file rewritten without
+        changing its modification time.
+
+        :param signatures: The file signatures stored in the snapshot
+        :type signatures: dict[str, tuple[int, str]]
+
+        :return: Whether the snapshot is up to date
+        :rtype: bool
+        """
+        if set(signatures.keys()) != set(constants.MAPPING_SOURCE_FILES):
+            return False
+        for path, (mtime, digest) in signatures.items():
+            try:
+                if os.stat(path).st_mtime_ns != mtime:
+                    return False
+                with open(path, "rb") as f:
+                    if hashlib.sha256(f.read()).hexdigest() != digest:
+                        return False
+            except OSError:
+                return False
+        return True
+
+    @staticmethod
+    def load_snapshot(path: str = None) -> dict[str, dict]:
+        """Loads the validated mappings from the precompiled snapshot.
+
+        :param path: The snapshot file, the default snapshot if not given
+        :type path: str, optional
+
+        :return: The mappings as returned by read_mappings, None if there
+            is no snapshot or it is outdated
+        :rtype: dict[str, dict]
+        """
+        path = path or constants.FILE_MAPPING_SNAPSHOT
+        try:
+            with open(path, "rb") as f:
+                snapshot = pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError, AttributeError):
+            return None
+
+        if not isinstance(snapshot, dict) \
+                or snapshot.get("version") != constants.MAPPING_SNAPSHOT_VERSION \
+                or not STIXtoTypeDBMapper.is_snapshot_current(snapshot.get("files", {})):
+            return None
+
+        logger.debug(log_messages.MAPPING_SNAPSHOT_LOADED, path)
+        return snapshot.get("mappings")
+
+    @staticmethod
+    def save_snapshot(mappings: dict[str, dict], path: str = None) -> None:
+        """Saves validated mappings to the precompiled snapshot. Failures
+        to write the snapshot are logged but not raised.
+
+        :param mappings: The validated mappings as returned by read_mappings
+        :type mappings: dict[str, dict]
+        :param path: The snapshot file, the default snapshot if not given
+        :type path: str, optional
+        """
+        path = path or constants.FILE_MAPPING_SNAPSHOT
+        snapshot = {
+            "version": constants.MAPPING_SNAPSHOT_VERSION,
+            "files": STIXtoTypeDBMapper.get_file_signatures(),
+            "mappings": mappings
+        }
+        # write to a temporary file first so that readers never see a partial snapshot
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, "wb") as f:
+                pickle.dump(snapshot, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, path)
+            logger.debug(log_messages.MAPPING_SNAPSHOT_SAVED, path)
+        except OSError as e:
+            logger.debug(log_messages.MAPPING_SNAPSHOT_SAVE_FAILED, path, e)
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
 
     @staticmethod
     def get_data(validate=False) -> None:
         """Loads the data of the JSON map.
 
-        Note that though every function calls this function here, 
-        the data is loaded only once. Therefore, the first call to 
-        this method decides which mappings to load.
+        The mapping files are read and compiled only once per process,
+        and validated at most once. Subsequent calls do not access the
+        file system. Validated mappings are stored in a precompiled
+        snapshot that is used instead of the mapping files as long as
+        none of the mapping or schema files changes.
 
         :param validate: Whether the data should be validated, too
         :type validate: bool, optional
@@ -119,45 +346,25 @@ class STIXtoTypeDBMapper:
         :raises ValidationError: If the mapping is invalid
             and validate = True
         """
-        if STIXtoTypeDBMapper.composites_mapping is None:
-            STIXtoTypeDBMapper.composites_mapping = file_utils.read_json(
-                constants.FILE_COMPOSITES
-            )
-        if STIXtoTypeDBMapper.stix_objects is None:
-            STIXtoTypeDBMapper.stix_objects = file_utils.read_json(
-                constants.FILE_SDO
-            )
-            STIXtoTypeDBMapper.stix_objects.update(
-                file_utils.read_json(constants.FILE_SRO)
-            )
-            STIXtoTypeDBMapper.stix_objects.update(
-                file_utils.read_json(constants.FILE_SCO)
-            )
-            STIXtoTypeDBMapper.stix_objects.update(
-                file_utils.read_json(constants.FILE_SMO)
-            )
-        if STIXtoTypeDBMapper.classes is None:
-            STIXtoTypeDBMapper.classes = file_utils.read_json(
-                constants.FILE_CLASSES
-            )
-        if STIXtoTypeDBMapper.common_attributes is None:
-            STIXtoTypeDBMapper.common_attributes = file_utils.read_json(
-                constants.FILE_COMMON_ATTRIBUTES
-            )
-        if STIXtoTypeDBMapper.sros_role_info is None:
-            STIXtoTypeDBMapper.sros_role_info = file_utils.read_json(
-                constants.FILE_SRO_ROLES_INFO
-            )
-        if STIXtoTypeDBMapper.key_value_pairs is None:
-            STIXtoTypeDBMapper.key_value_pairs = file_utils.read_json(
-                constants.FILE_KEY_VALUE_PAIRS
-            )
-        if STIXtoTypeDBMapper.dictionary_data is None:
-            STIXtoTypeDBMapper.dictionary_data = file_utils.read_json(
-                constants.FILE_DICTIONARY_DATA
-            )
-        if validate:
-            STIXtoTypeDBMapper.validate()
+        if STIXtoTypeDBMapper.compiled:
+            if validate and not STIXtoTypeDBMapper.validated:
+                STIXtoTypeDBMapper.validate()
+            return
+
+        mappings = STIXtoTypeDBMapper.load_snapshot()
+        if mappings is not None:
+            STIXtoTypeDBMapper.validated = True
+        else:
+            mappings = STIXtoTypeDBMapper.read_mappings()
+            # only validated mappings are stored in the snapshot
+            try:
+                STIXtoTypeDBMapper.validate(mappings)
+                STIXtoTypeDBMapper.save_snapshot(mappings)
+            except (ValidationError, SchemaError) as e:
+                if validate:
+                    raise
+                logger.warning(log_messages.MAPPING_SNAPSHOT_NOT_SAVED, e)
+        STIXtoTypeDBMapper.compile(mappings)
 
     @staticmethod
     def get_class(stix_object_type: str) -> str:
@@ -171,12 +378,7 @@ class STIXtoTypeDBMapper:
             is a custom type
         :rtype: str
         """
-        class_type = None
-        for category, stix_object_types in STIXtoTypeDBMapper.classes.items():
-            if stix_object_type in stix_object_types:
-                class_type = category
-                break
-        return class_type
+        return STIXtoTypeDBMapper.class_index.get(stix_object_type)
 
     @staticmethod
     def get_typeql_thing_name(
@@ -272,14 +474,14 @@ class STIXtoTypeDBMapper:
             type
         :rtype: str
         """
-        object_map = STIXtoTypeDBMapper.stix_objects.get(stix_type)
-        if not object_map:
+        sup_type = STIXtoTypeDBMapper.supertype_index.get(stix_type)
+        if sup_type:
+            return sup_type
+
+        if not STIXtoTypeDBMapper.stix_objects.get(stix_type):
             raise MappingException(f"STIX type '{stix_type}' not defined")
-        sup_type = object_map.get(constants.OBJECTS_TYPEDB_TYPE)
-        if not sup_type:
-            raise MappingException(
-                f"No TypeDB type defined for '{stix_type}'")
-        return sup_type
+        raise MappingException(
+            f"No TypeDB type defined for '{stix_type}'")
 
     @staticmethod
     def get_default_value_implementation(value: Any) -> str:
@@ -322,7 +524,7 @@ class STIXtoTypeDBMapper:
         return res
 
     @staticmethod
-    def get_roleplayers_for_SRO(stix_type: str) -> list[str]:
+    def get_roleplayers_for_SRO(stix_type: str) -> tuple[str, ...]:
         """Gives the properties that are implemented as roleplayers in
         a STIX relationship object.
 
@@ -332,25 +534,19 @@ class STIXtoTypeDBMapper:
         :raises MappingException: If the STIX type does not exist
 
         :return: The properties that specify roleplayers
-        :rtype: str
+        :rtype: tuple[str, ...]
         """
-        object_info = STIXtoTypeDBMapper.stix_objects.get(stix_type)
-        if not object_info:
+        roleplayers = STIXtoTypeDBMapper.roleplayers_index.get(stix_type)
+        if roleplayers is not None:
+            return roleplayers
+
+        if not STIXtoTypeDBMapper.stix_objects.get(stix_type):
             raise MappingException(
                 f"STIX Object {stix_type} not defined"
             )
-        attributes = object_info.get(constants.MAPPING_ATTRIBUTES)
-        if not attributes:
-            raise MappingException(
-                f"No attributes defined for STIX Object {stix_type}"
-            )
-        roleplayers = []
-        for attribute, attribute_info in attributes.items():
-            value_type = attribute_info \
-                .get(constants.MAPPING_ATTRIBUTE_TYPEDB_VALUE_TYPE)
-            if value_type == constants.TYPEQL_ROLEPLAYER:
-                roleplayers.append(attribute)
-        return roleplayers
+        raise MappingException(
+            f"No attributes defined for STIX Object {stix_type}"
+        )
 
     @staticmethod
     def get_object_attribute_info(
@@ -373,6 +569,11 @@ class STIXtoTypeDBMapper:
             is a custom attribute
         :rtype: tuple[str, str]
         """
+        attr_info = STIXtoTypeDBMapper.attribute_index \
+            .get((stix_object, stix_attribute))
+        if attr_info:
+            return attr_info
+
         common_attributes = STIXtoTypeDBMapper.common_attributes
 
         if stix_attribute in common_attributes.keys():
@@ -386,7 +587,7 @@ class STIXtoTypeDBMapper:
             return name, value
 
         stix_obj = STIXtoTypeDBMapper.stix_objects.get(stix_object)
-        if not stix_object:
+        if not stix_obj:
             raise MappingException(
                 "The specified STIX Object does not exist"
             )
@@ -621,6 +822,70 @@ class STIXtoTypeDBMapper:
 
         return roles[0], roles[1]
 
+    @staticmethod
+    def get_object_relations(stix_type: str) -> tuple[tuple[str, str, str, bool], ...]:
+        """Returns the relations that the objects of a STIX type can play
+        a role in for their properties, those of the predefined extensions
+        included: the embedded relations to other STIX objects and the
+        helper relations of the composite values, key-value pairs and
+        dictionaries. Properties with an invalid mapping are skipped.
+
+        :param stix_type: The type of the STIX object, e.g. malware
+        :type stix_type: str
+
+        :return: The name of every relation, the role of the object, the
+            role of the value and whether the value is inserted along with
+            the object (e.g. an external reference) instead of being
+            another STIX object
+        :rtype: tuple[tuple[str, str, str, bool], ...]
+        """
+        object_info = STIXtoTypeDBMapper.stix_objects.get(stix_type) or {}
+        attributes = [
+            *STIXtoTypeDBMapper.common_attributes.values(),
+            *(object_info.get(constants.MAPPING_ATTRIBUTES) or {}).values()
+        ]
+        for extension in (object_info.get(constants.OBJECTS_EXTENSIONS) or {}).values():
+            attributes.extend((extension.get(constants.MAPPING_ATTRIBUTES) or {}).values())
+
+        relations = {}
+        # custom properties can be converted to dictionaries too
+        attributes.append({
+            constants.MAPPING_ATTRIBUTE_TYPEDB_NAME: constants.TYPEQL_DICTIONARY_KEYWORD,
+            constants.MAPPING_ATTRIBUTE_TYPEDB_VALUE_TYPE: constants.TYPEQL_DICTIONARY_KEYWORD
+        })
+        for attr_info in attributes:
+            name = attr_info.get(constants.MAPPING_ATTRIBUTE_TYPEDB_NAME)
+            value_type = attr_info.get(constants.MAPPING_ATTRIBUTE_TYPEDB_VALUE_TYPE)
+            if not name or not value_type:
+                continue
+            main_type, subtype = STIXtoTypeDBMapper.split_type(value_type)
+            if main_type == constants.TYPEQL_LIST_PREFIX:
+                main_type, subtype = STIXtoTypeDBMapper.split_type(subtype)
+            try:
+                if main_type == constants.TYPEQL_RELATION_PREFIX:
+                    object_role, value_role = STIXtoTypeDBMapper \
+                        .get_embedded_relation_roles(name)
+                    relation = (subtype, object_role, value_role, False)
+                elif main_type == constants.TYPEQL_COMPOSITE_PREFIX:
+                    object_role, value_role = STIXtoTypeDBMapper \
+                        .get_composite_relation_roles(subtype)
+                    relation = (STIXtoTypeDBMapper.get_composite_type_relation(subtype),
+                                object_role, value_role, True)
+                elif main_type == constants.MAPPING_KEY_VALUE_PAIR_KEYWORD:
+                    relation_name, object_role, item_role = STIXtoTypeDBMapper \
+                        .get_pair_relation(subtype)
+                    relation = (relation_name, object_role, item_role, True)
+                elif main_type == constants.TYPEQL_DICTIONARY_KEYWORD:
+                    relation_name, item_role, object_role = STIXtoTypeDBMapper \
+                        .get_dictionary_relation_data()
+                    relation = (relation_name, object_role, item_role, True)
+                else:
+                    continue
+            except MappingException:
+                continue
+            relations[relation] = None
+        return tuple(relations)
+
     @staticmethod
     def get_key_value_pair_key_translation(pair_type: str, key: str) -> str:
         """Returns the entity type of the key. Returns None if the key
@@ -25,6 +25,17 @@ FILE_SCHEMA_DICT = os.path.join(SCHEMAS_DIR, "dictionary_schema.json")
 FILE_SCHEMA_COMMON_ATTRIBUTES = os.path.join(SCHEMAS_DIR, "common_attributes_schema.json")
 FILE_SCHEMA_CLASSES = os.path.join(SCHEMAS_DIR, "classes_schema.json")
 
+# precompiled mapping, rebuilt when a mapping or schema file changes
+FILE_MAPPING_SNAPSHOT = os.path.join(MAPPING_FILES_PATH, "mapping_snapshot.pickle")
+MAPPING_SNAPSHOT_VERSION = 1
+MAPPING_SOURCE_FILES = [
+    FILE_COMPOSITES, FILE_SDO, FILE_SRO, FILE_SCO, FILE_SMO, FILE_CLASSES,
+    FILE_COMMON_ATTRIBUTES, FILE_SRO_ROLES_INFO, FILE_KEY_VALUE_PAIRS,
+    FILE_DICTIONARY_DATA, FILE_SCHEMA_STIX_OBJECTS, FILE_SCHEMA_COMPOSITES,
+    FILE_SCHEMA_SRO_ROLES, FILE_SCHEMA_KV_PAIRS, FILE_SCHEMA_DICT,
+    FILE_SCHEMA_COMMON_ATTRIBUTES, FILE_SCHEMA_CLASSES
+]
+
 MAPPING_CLASS_SDO = "STIXDomainObject"
 MAPPING_CLASS_SCO = "STIXCyberObservable"
 MAPPING_CLASS_SRO = "STIXRelationshipObject"
@@ -3,12 +3,15 @@ from typing import Any, Self
 
 from stix2.utils import get_type_from_id
 
+from satrap import settings as conf
 from satrap.commons.log_utils import logger
 from satrap.datamanagement.typedb import typedb_constants
 import satrap.etl.transform.stix_typeql_constants as constants
 from satrap.etl import stix_constants
 from satrap.etl.transform.stix_to_typedb_mapper import STIXtoTypeDBMapper
 from satrap.etl.transform.valueconverter import ValueConverter
+from satrap.etl.transform.shape_template import PropertyStep, ShapeTemplate
+from satrap.etl.transform.converter_compiler import ConverterCompiler
 from satrap.datamanagement.typedb.dataobjects import Entity, Relation, Thing
 from satrap.etl.transform.query import Identification, QueryBundle
 from satrap.etl.transform import log_messages
@@ -105,6 +108,10 @@ class STIXObjectConverter(ABC):
         """Returns a dictionary of all TypeDB attributes in 
         {name:value} format and all additional queries.
 
+        With the compiled_converters setting, the properties are converted
+        by the function generated from the mapping for the STIX type, if
+        any (see ConverterCompiler).
+
         :param reference: Reference values that identify the main 
             object.
         :type reference: Identification
@@ -114,18 +121,26 @@ class STIXObjectConverter(ABC):
         """
         logger.debug(log_messages.PROPERTIES_START)
 
+        if conf.TRANSFORM_COMPILED_CONVERTERS:
+            convert = ConverterCompiler.get_converter(self.stix_type)
+            if convert is not None:
+                return convert(self, self.properties, reference)
+
         queries = QueryBundle()
         attributes = {}
+        steps = ShapeTemplate.get(self.stix_type, self.properties).steps
         for prop_name, prop_value in self.properties.items():
-            name, values, additional_queries = self \
-                .create_typeql_property(prop_name, prop_value, reference)
+            name, values, additional_queries = self.create_typeql_property(
+                prop_name, prop_value, reference, steps[prop_name]
+            )
 
             if name and values:
                 if not attributes.get(name):
                     attributes[name] = values
                 else:
                     attributes[name].extend(values)
-            queries.extend(additional_queries)
+            if additional_queries is not None:
+                queries.extend(additional_queries)
 
         return attributes, queries
 
@@ -247,6 +262,7 @@ class STIXObjectConverter(ABC):
 
         queries = QueryBundle()
         attributes = dict()
+        steps = ShapeTemplate.get(self.stix_type, extension_object, extension_name).steps
         for key, value in extension_object.items():
             # Build single property
             typedb_name, typedb_values, additional_queries = self \
@@ -254,7 +270,8 @@ class STIXObjectConverter(ABC):
                     extension_name,
                     key,
                     value,
-                    reference
+                    reference,
+                    steps[key]
                 )
 
             # add to collection
@@ -263,7 +280,8 @@ class STIXObjectConverter(ABC):
                     attributes[typedb_name] = typedb_values
                 else:
                     attributes[typedb_name].extend(typedb_values)
-            queries.extend(additional_queries)
+            if additional_queries is not None:
+                queries.extend(additional_queries)
 
         return attributes, queries
 
@@ -272,7 +290,8 @@ class STIXObjectConverter(ABC):
         extension_name: str,
         property_name: str,
         property_value: Any,
-        ref: Identification
+        ref: Identification,
+        step: PropertyStep = None
     ) -> tuple[str, list[str], QueryBundle]:
         """Build a single property of an extension. 
 
@@ -282,62 +301,67 @@ class STIXObjectConverter(ABC):
         :type property_name: str
         :param property_value: The value of the property
         :type property_value: Any
+        :param step: The precompiled transformation of the property,
+            compiled from the mapping if not given
+        :type step: PropertyStep, optional
 
         :return: The name, values and additional queries for this 
-            property
+            property, None if there are no additional queries
         :rtype: tuple[str, list[str], QueryBundle]
         """
         logger.debug(
             log_messages.EXTENSIONS_PROPERTY_START, property_name)
 
-        try:
-            typedb_attribute_name, typedb_type = STIXtoTypeDBMapper \
-                .get_extension_attribute_info(
-                    self.stix_type, extension_name, property_name
-                )
-        except MappingException as e:
+        if step is None:
+            step = ShapeTemplate.compile_step(self.stix_type, property_name, extension_name)
+        if step.error is not None:
             logger.error(
                 log_messages.MAPPING_INVALID
                 .format(
                     reference=ref.get_id(),
                     stix_name=property_name,
                     stix_value=property_value,
-                    exception=e
+                    exception=step.error
                 )
             )
-            return "", [], QueryBundle()
+            return "", [], None
 
         # Custom attribute
-        if not typedb_attribute_name or not typedb_type:
-            return "", [], QueryBundle()
+        if not step.attribute_name or not step.value_type:
+            return "", [], None
 
         logger.debug(
             log_messages.EXTENSIONS_PROPERTY_TRANSFORM,
-                property_name, typedb_attribute_name, typedb_type
+                property_name, step.attribute_name, step.value_type
         )
 
         try:
-            typedb_values, queries = self.convert_value_to_typeql(
-                typedb_type,
+            typedb_values, queries = step.convert(
                 property_value,
                 reference=ref,
-                name=typedb_attribute_name
+                name=step.attribute_name
             )
         except ValueError as e:
             logger.error(
                 log_messages.CONVERSION_FAILED
                 .format(
-                    value_type=typedb_type,
+                    reference=ref.get_id(),
+                    value_type=step.value_type,
+                    stix_name=property_name,
                     stix_value=property_value,
                     exception=e
                 )
             )
-            return "", [], QueryBundle()
+            return "", [], None
 
-        return typedb_attribute_name, typedb_values, queries
+        return step.attribute_name, typedb_values, queries
 
     def create_typeql_property(
-        self, stix_name: str, stix_value: Any, reference: Identification
+        self,
+        stix_name: str,
+        stix_value: Any,
+        reference: Identification,
+        step: PropertyStep = None
     ) -> tuple[str, list[str], QueryBundle]:
         """Build a single TypeDB property.
 
@@ -347,30 +371,32 @@ class STIXObjectConverter(ABC):
         :type stix_value: Any
         :param reference: Reference values that identify the main object
         :type reference: Identification
+        :param step: The precompiled transformation of the property,
+            compiled from the mapping if not given
+        :type step: PropertyStep, optional
 
         :return: The name, values and additional insert queries for this 
-            attribute.
+            attribute, None if there are no additional queries
         :rtype: tuple[str, list[str], QueryBundle]
         """
         # logger.debug(log_messages.PROPERTY_START, stix_name)
 
-        try:
-            typedb_attribute_name, typedb_type = STIXtoTypeDBMapper \
-                .get_object_attribute_info(self.stix_type, stix_name)
-        except MappingException as e:
+        if step is None:
+            step = ShapeTemplate.compile_step(self.stix_type, stix_name)
+        if step.error is not None:
             logger.error(
                 log_messages.MAPPING_INVALID
                 .format(
                     reference=reference.get_id(),
                     stix_name=stix_name,
                     stix_value=stix_value,
-                    exception=e
+                    exception=step.error
                 )
             )
-            return "", [], QueryBundle()
+            return "", [], None
 
         # Custom property
-        if not typedb_attribute_name:
+        if not step.attribute_name:
             logger.debug(
                 log_messages.PROPERTY_CUSTOM_ENCOUNTERED, stix_name)
             return self.create_typeql_custom_property(
@@ -380,24 +406,23 @@ class STIXObjectConverter(ABC):
             )
 
         try:
-            values, queries = self.convert_value_to_typeql(
-                typedb_type,
+            values, queries = step.convert(
                 stix_value,
                 reference=reference,
-                name=typedb_attribute_name
+                name=step.attribute_name
             )
         except ValueError as e:
             logger.error(
                 log_messages.CONVERSION_FAILED
                 .format(
                     reference=reference.get_id(),
-                    value_type=typedb_type,
+                    value_type=step.value_type,
                     stix_name=stix_name,
                     stix_value=stix_value,
                     exception=e
                 )
             )
-            return "", [], QueryBundle()
+            return "", [], None
         except MappingException as e:
             logger.error(
                 log_messages.MAPPING_INVALID
@@ -408,14 +433,14 @@ class STIXObjectConverter(ABC):
                     exception=e
                 )
             )
-            return "", [], QueryBundle()
+            return "", [], None
 
         logger.debug(
             log_messages.PROPERTY_SUCCESS, stix_name,
-                typedb_attribute_name, typedb_type
+                step.attribute_name, step.value_type
         )
 
-        return typedb_attribute_name, values, queries
+        return step.attribute_name, values, queries
 
     def create_typeql_custom_property(
         self, stix_name: str, stix_value: Any, reference: Identification
@@ -502,11 +527,8 @@ class STIXObjectConverter(ABC):
         :return: The values and additional insert queries
         :rtype: tuple[list[str], QueryBundle]
         """
-        converter: ValueConverter = ValueConverter \
-            .get_converter(value_type)
-        converter.parse_stix_2_1(stix_value)
-        values, queries = converter.convert_to_typeql(**kwargs)
-        return values, queries
+        values, queries = ValueConverter.convert(value_type, stix_value, **kwargs)
+        return values, QueryBundle() if queries is None else queries
 
 
 class STIXCustomObjectConverter(STIXObjectConverter):
@@ -0,0 +1,293 @@
+"""Persistent cache of the transformation of STIX objects, to skip the
+transformation of the objects already transformed by a previous run."""
+
+import glob
+import hashlib
+import json
+import os
+import sqlite3
+
+from satrap.commons.log_utils import logger
+from satrap.datamanagement.typedb.dataobjects import Entity, InsertQuery, Relation, Thing
+from satrap.etl.transform import log_messages
+import satrap.etl.transform.stix_typeql_constants as constants
+
+# number of cache writes per SQLite transaction
+COMMIT_EVERY = 1000
+# layout of the cached queries, part of the cache keys
+CACHE_FORMAT = "json-1"
+THING_CLASSES = {cls.__name__: cls for cls in (Thing, Entity, Relation)}
+
+
+def encode_thing(thing: Thing) -> list:
+    """Returns the JSON-serializable form of a thing.
+
+    :param thing: The entity or relation
+    :type thing: Thing
+
+    :return: The class name, variable, type, attributes and roles (None
+        if it is not a relation) of the thing
+    :rtype: list
+    """
+    roles = thing.get_roles() if isinstance(thing, Relation) else None
+    return [type(thing).__name__, thing.get_variable(), thing.get_type(),
+            thing.get_attributes(), roles]
+
+
+def decode_thing(encoded: list) -> Thing:
+    """Returns the thing of its JSON-serializable form.
+
+    :param encoded: The form given by encode_thing
+    :type encoded: list
+
+    :raises ValueError: If the class of the thing is unknown
+    :return: The entity or relation
+    :rtype: Thing
+    """
+    class_name, variable, typedb_type, attributes, roles = encoded
+    thing_class = THING_CLASSES.get(class_name)
+    if thing_class is None:
+        raise ValueError(f"Unknown class of cached thing: {class_name}")
+    thing = thing_class(variable, typedb_type)
+    for name, values in attributes.items():
+        for value in values:
+            thing.add_attribute(name, value)
+    for role, variables in (roles or {}).items():
+        for role_variable in variables:
+            thing.add_roleplayer(role, role_variable)
+    return thing
+
+
+def encode_queries(transformed: tuple) -> str:
+    """Returns the JSON encoding of the insert queries of a STIX object.
+
+    The things of a query are encoded once per clause they appear in, so
+    the decoded queries do not share things between them.
+
+    :param transformed: The (entity, SRO, embedded relation) insert queries
+    :type transformed: tuple[InsertQuery, InsertQuery, InsertQuery]
+
+    :return: The JSON encoding of the queries
+    :rtype: str
+    """
+    return json.dumps([
+        None if query is None else {
+            "match": [encode_thing(thing) for thing in query.get_match_clause()],
+            "insert": [encode_thing(thing) for thing in query.get_insert_clause()],
+            "delete": list(query.get_delete_queries())
+        }
+        for query in transformed
+    ], separators=(",", ":"))
+
+
+def decode_queries(encoded: str) -> tuple:
+    """Returns the insert queries of their JSON encoding.
+
+    :param encoded: The encoding given by encode_queries
+    :type encoded: str
+
+    :raises ValueError: If the encoding is not valid
+    :return: The (entity, SRO, embedded relation) insert queries
+    :rtype: tuple[InsertQuery, InsertQuery, InsertQuery]
+    """
+    transformed = []
+    for encoded_query in json.loads(encoded):
+        if encoded_query is None:
+            transformed.append(None)
+            continue
+        query = InsertQuery()
+        for thing in encoded_query["match"]:
+            query.add_to_match_clause(decode_thing(thing))
+        for thing in encoded_query["insert"]:
+            query.add_to_insert_clause(decode_thing(thing))
+        query.add_delete_queries(encoded_query["delete"])
+        transformed.append(query)
+    return tuple(transformed)
+
+
+class TransformCache:
+    """Cache of the insert queries of STIX objects, stored in a SQLite file.
+
+    An object is identified by its id and version ('modified' timestamp, or
+    a digest of its content if it has none), together with a digest of the
+    mapping and of the transformation code: changing them invalidates the
+    cached queries.
+
+    The queries are stored as JSON (see encode_queries), so that reading
+    the cache file never runs code from it.
+
+    The cache is bounded by the size of the stored queries: when closing,
+    the entries used by the oldest runs are evicted first.
+    """
+
+    def __init__(self, path: str, max_size: int, variant: str = ""):
+        """Open (or create) a cache file.
+
+        :param path: The path of the SQLite file
+        :type path: str
+        :param max_size: The maximum size in bytes of the cached queries
+        :type max_size: int
+        :param variant: The transformation variant (e.g. trusted mode)
+            whose queries are cached, as it can change their layout
+        :type variant: str, optional
+        """
+        self.path = path
+        self.max_size = max_size
+        self.version = self.get_transform_version(variant)
+        self.hits = 0
+        self.misses = 0
+        self._writes = 0
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        # used by the thread transforming ahead of the loading in streaming mode
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS transformed ("
+            "key TEXT PRIMARY KEY, queries TEXT NOT NULL, "
+            "size INTEGER NOT NULL, run INTEGER NOT NULL)"
+        )
+        self.connection.execute("CREATE INDEX IF NOT EXISTS transformed_run ON transformed(run)")
+        self.run = self.connection.execute(
+            "SELECT COALESCE(MAX(run), 0) + 1 FROM transformed"
+        ).fetchone()[0]
+
+    @staticmethod
+    def get_transform_version(variant: str = "") -> str:
+        """Returns the digest of the mapping and of the transformation code.
+
+        :param variant: The transformation variant
+        :type variant: str, optional
+
+        :return: The hexadecimal SHA-256 digest
+        :rtype: str
+        """
+        digest = hashlib.sha256(f"{CACHE_FORMAT}|{variant}".encode())
+        sources = glob.glob(os.path.join(os.path.dirname(__file__), "*.py"))
+        sources.append(os.path.join(
+            os.path.dirname(__file__), "..", "..", "datamanagement", "typedb", "dataobjects.py"
+        ))
+        for path in constants.MAPPING_SOURCE_FILES + sorted(sources):
+            with open(path, "rb") as f:
+                digest.update(hashlib.sha256(f.read()).digest())
+        return digest.hexdigest()
+
+    def get_key(self, stix_object) -> str:
+        """Returns the cache key of a STIX object.
+
+        :param stix_object: The STIX object
+        :type stix_object: dict or stix2 object
+
+        :return: The key, None if the object has no id
+        :rtype: str
+        """
+        stix_id = stix_object.get("id")
+        if stix_id is None:
+            return None
+        version = stix_object.get("modified")
+        if version is None:
+            content = json.dumps(dict(stix_object), sort_keys=True, default=str)
+            version = hashlib.sha256(content.encode()).hexdigest()
+        return f"{stix_id}|{version}|{self.version}"
+
+    def get(self, stix_object) -> tuple:
+        """Returns the cached insert queries of a STIX object.
+
+        :param stix_object: The STIX object
+        :type stix_object: dict or stix2 object
+
+        :return: The (entity, SRO, embedded relation) insert queries, None
+            if the object is not cached
+        :rtype: tuple[InsertQuery, InsertQuery, InsertQuery]
+        """
+        key = self.get_key(stix_object)
+        row = None if key is None else self.connection.execute(
+            "SELECT queries, run FROM transformed WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        if row[1] != self.run:
+            self.write("UPDATE transformed SET run = ? WHERE key = ?", (self.run, key))
+        return decode_queries(row[0])
+
+    def put(self, stix_object, transformed: tuple) -> None:
+        """Store the insert queries of a STIX object. They are serialized
+        right away, so that the cache is not affected by later changes of
+        the queries.
+
+        :param stix_object: The STIX object
+        :type stix_object: dict or stix2 object
+        :param transformed: The (entity, SRO, embedded relation) insert
+            queries of the object
+        :type transformed: tuple[InsertQuery, InsertQuery, InsertQuery]
+        """
+        key = self.get_key(stix_object)
+        if key is None or transformed is None:
+            return
+        queries = encode_queries(transformed)
+        self.write(
+            "INSERT OR REPLACE INTO transformed (key, queries, size, run) VALUES (?, ?, ?, ?)",
+            (key, queries, len(queries.encode()), self.run)
+        )
+
+    def transform(self, stix_object, transform) -> tuple:
+        """Returns the cached insert queries of a STIX object, transforming
+        and caching the object if it is not cached.
+
+        :param stix_object: The STIX object
+        :type stix_object: dict or stix2 object
+        :param transform: The function transforming a STIX object
+        :type transform: Callable
+
+        :return: The (entity, SRO, embedded relation) insert queries
+        :rtype: tuple[InsertQuery, InsertQuery, InsertQuery]
+        """
+        transformed = self.get(stix_object)
+        if transformed is None:
+            transformed = transform(stix_object)
+            self.put(stix_object, transformed)
+        return transformed
+
+    def write(self, statement: str, parameters: tuple) -> None:
+        """Execute a write statement, committing every COMMIT_EVERY writes."""
+        self.connection.execute(statement, parameters)
+        self._writes += 1
+        if self._writes % COMMIT_EVERY == 0:
+            self.connection.commit()
+
+    def evict(self) -> int:
+        """Delete the entries used by the oldest runs until the cached
+        queries fit in the maximum size.
+
+        :return: The number of deleted entries
+        :rtype: int
+        """
+        total = self.connection.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM transformed"
+        ).fetchone()[0]
+        if total <= self.max_size:
+            return 0
+        evicted = []
+        for key, size in self.connection.execute(
+            "SELECT key, size FROM transformed ORDER BY run, rowid"
+        ):
+            if total <= self.max_size:
+                break
+            evicted.append((key,))
+            total -= size
+        self.connection.executemany("DELETE FROM transformed WHERE key = ?", evicted)
+        return len(evicted)
+
+    def close(self) -> None:
+        """Evict the oldest entries, commit and close the cache file."""
+        evicted = self.evict()
+        self.connection.commit()
+        self.connection.close()
+        logger.info(log_messages.TRANSFORM_CACHE_SUMMARY, self.hits, self.misses, evicted)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exception_type, exception_value, traceback):
+        self.close()
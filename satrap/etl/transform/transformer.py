@@ -9,7 +9,7 @@ from satrap.etl.transform.stix_to_typedb_mapper import STIXtoTypeDBMapper
 from satrap.etl.exceptions import TransformationError
 from satrap.etl.transform.stixobject_converter import STIXObjectConverter
 from satrap.commons.log_utils import logger
-from satrap.datamanagement.typedb.dataobjects import InsertQuery
+from satrap.datamanagement.typedb.dataobjects import InsertQuery, VariableDealer
 
 
 class Transformer(ABC):
@@ -41,11 +41,19 @@ class STIXtoTypeQLTransformer(Transformer):
         for inserting a STIX2.1 object in JSON format into 
         a TypeDB database that follows the SATRAP CTI SKB schema
 
+        The variables of the queries of every object start at 'v0'.
+
         :param object: The JSON object that will be transformed
         :type object: dict or stix2 object
 
         :return: The TypeQL queries for inserting the STIX2.1 object
         """
+        with VariableDealer.scope():
+            return self._transform(src_object)
+
+    def _transform(
+        self, src_object: dict
+    ) -> tuple[InsertQuery, InsertQuery, InsertQuery]:
         logger.debug(log_messages.START_TRANSFORM)
 
         # Read the mapping
@@ -1,5 +1,5 @@
 from abc import ABC, abstractmethod
-from typing import Any
+from typing import Any, Callable
 import re
 
 from stix2.utils import STIXdatetime, format_datetime
@@ -59,39 +59,101 @@ class ValueConverter(ABC):
         :return: An instance of the corresponding ValueConverter
         :rtype: ValueConverterAdapter
         """
-        res = None
+        converter_class, args = ValueConverter.get_converter_class(value_type)
+        return ValueConverterAdapter(converter_class(*args))
+
+    @staticmethod
+    def convert(value_type: str, value: Any, **kwargs) -> tuple[list[str], QueryBundle]:
+        """Convert a STIX value to its TypeDB representation with the
+        stateless conversion of its type (see CONVERSIONS), without
+        instantiating a converter.
+
+        :param value_type: The type of the value, e.g. "list:string"
+        :type value_type: str
+        :param value: The value in STIX 2.1 format
+        :type value: Any
+
+        :raises ValueError: If the value could not be converted or the
+            value type has no converter implementation
+        :raises MappingException: If the mapping for the value
+            transformation process is invalid
+
+        :return: The values and the additional queries, None if the value
+            requires no additional query
+        :rtype: tuple[list[str], QueryBundle]
+        """
+        conversion, subtype = ValueConverter.get_conversion(value_type)
+        return conversion(value, subtype, **kwargs)
+
+    @staticmethod
+    def get_conversion(value_type: str) -> tuple[Callable, str]:
+        """Returns the stateless conversion of a value type and its
+        subtype. The value types are resolved once.
+
+        :param value_type: The type of a value, e.g. "list:string"
+        :type value_type: str
+
+        :raises ValueError: If the value type has no converter 
+            implementation
+
+        :return: The conversion and the subtype
+        :rtype: tuple[Callable, str]
+        """
+        resolved = RESOLVED_CONVERSIONS.get(value_type)
+        if resolved is None:
+            main_type, subtype = STIXtoTypeDBMapper.split_type(value_type)
+            conversion = CONVERSIONS.get(main_type)
+            if conversion is None:
+                raise ValueError(
+                    f"Value type '{value_type}' has no converter implementation")
+            resolved = RESOLVED_CONVERSIONS[value_type] = (conversion, subtype)
+        return resolved
+
+    @staticmethod
+    def get_converter_class(value_type: str) -> tuple[type, tuple]:
+        """Returns the ValueConverter class for the given type and the
+        arguments to instantiate it with.
+
+        :param value_type: The string that specifies the type of the 
+            converter, e.g. "string" or "list:string"
+        :type value_type: str
+
+        :raises ValueError: If the value type has no converter 
+            implementation
+
+        :return: The converter class and its arguments
+        :rtype: tuple[type, tuple]
+        """
         main_type, subtype = STIXtoTypeDBMapper.split_type(value_type)
         match main_type:
             case typedb_constants.STRING:
-                res = StringConverter()
+                return StringConverter, ()
             case typedb_constants.DOUBLE:
-                res = DoubleConverter()
+                return DoubleConverter, ()
             case typedb_constants.BOOLEAN:
-                res = BooleanConverter()
+                return BooleanConverter, ()
             case typedb_constants.DATETIME:
-                res = DatetimeConverter()
+                return DatetimeConverter, ()
             case typedb_constants.LONG:
-                res = LongConverter()
+                return LongConverter, ()
             case constants.TYPEQL_COMPOSITE_PREFIX:
-                res = CompositeValueConverter(subtype)
+                return CompositeValueConverter, (subtype,)
             case constants.TYPEQL_RELATION_PREFIX:
-                res = EmbeddedRelationConverter(subtype)
+                return EmbeddedRelationConverter, (subtype,)
             case constants.TYPEQL_LIST_PREFIX:
-                res = ListConverter(subtype)
+                return ListConverter, (subtype,)
             case constants.TYPEQL_NOT_IMPLEMENTED_TYPE_KEYWORD:
-                res = EmptyValueConverter()
+                return EmptyValueConverter, ()
             case constants.TYPEQL_DICTIONARY_KEYWORD:
-                res = DictionaryConverter()
+                return DictionaryConverter, ()
             case constants.MAPPING_KEY_VALUE_PAIR_KEYWORD:
-                res = KeyValuePairConverter(subtype)
+                return KeyValuePairConverter, (subtype,)
             case constants.TYPEQL_ROLEPLAYER:
-                res = EmptyValueConverter()
+                return EmptyValueConverter, ()
             case _:
                 raise ValueError(
                     f"Value type '{value_type}' has no converter implementation")
 
-        return ValueConverterAdapter(res)
-
 
 class ValueConverterAdapter(ValueConverter):
     """Adapter class for the ValueConverters.
@@ -255,57 +317,14 @@ class DatetimeConverter(PrimitiveValueConverter):
         self.subseconds: list[int] = []
 
     def parse_stix_2_1(self, value):
-        if isinstance(value, STIXdatetime):
-            value = format_datetime(value)
-        if not re.match(stix_constants.STIX_TIMESTAMP_REGEX, value):
-            raise ValueError("Timestamp is not a STIX2.1 timestamp.")
-        values = value.split(stix_constants.TIMESTAMP_DATE_SEPARATOR)
-        self.year = int(values.pop(0))
-        self.month = int(values.pop(0))
-        values = values[0].split(stix_constants.TIMESTAMP_DATE_TIME_SEPARATOR)
-        self.day = int(values.pop(0))
-        values = values[0].split(stix_constants.TIMESTAMP_TIME_SEPARATOR)
-        self.hour = int(values.pop(0))
-        self.minute = int(values.pop(0))
-        if stix_constants.TIMESTAMP_MILLIS_SEPARATOR in values[0]:
-            values = values[0].split(stix_constants.TIMESTAMP_MILLIS_SEPARATOR)
-            self.seconds = int(values.pop(0))
-            millis = values[0] \
-                .replace(stix_constants.TIMESTAMP_ENDING, "")
-            self.subseconds = [int(i) for i in list(millis)]
-        else:
-            self.seconds = int(
-                values[0].replace(stix_constants.TIMESTAMP_ENDING, "")
-            )
+        self.year, self.month, self.day, self.hour, self.minute, self.seconds, \
+            self.subseconds = parse_datetime(value)
 
     def convert_to_typeql(self, **kwargs):
-        yyyymmdd = str(self.year).zfill(4)
-        yyyymmdd += typedb_constants.DATETIME_DATE_SEPARATOR
-        yyyymmdd += str(self.month).zfill(2)
-        yyyymmdd += typedb_constants.DATETIME_DATE_SEPARATOR
-        yyyymmdd += str(self.day).zfill(2)
-
-        hhmmss = str(self.hour).zfill(2)
-        hhmmss += typedb_constants.DATETIME_TIME_SEPARATOR
-        hhmmss += str(self.minute).zfill(2)
-        hhmmss += typedb_constants.DATETIME_TIME_SEPARATOR
-        hhmmss += str(self.seconds).zfill(2)
-
-        res = yyyymmdd
-        res += typedb_constants.DATETIME_DATE_TIME_SEPARATOR
-        res += hhmmss
-
-        if self.subseconds:
-            millis = self.subseconds
-            num_millis = typedb_constants.DATETIME_NUMBER_MILLIS
-            millis = millis[:num_millis]
-            for _ in range(num_millis - len(millis)):
-                millis.append(0)
-            millis = "".join([str(i) for i in millis])
-            millis = millis.zfill(num_millis)
-            res += typedb_constants.DATETIME_MILLIS_SEPARATOR
-            res += millis
-        return res
+        return format_datetime_typeql(
+            self.year, self.month, self.day, self.hour, self.minute,
+            self.seconds, self.subseconds
+        )
 
 
 class NonPrimitiveValueConverter(ValueConverter):
@@ -336,57 +355,9 @@ class KeyValuePairConverter(NonPrimitiveValueConverter):
         self.key_value_pairs = value
 
     def convert_to_typeql(self, **kwargs):
-        queries = QueryBundle()
-
-        value_attribute, value_type = STIXtoTypeDBMapper \
-            .get_pairs_value_and_type(self.typedb_subtype)
-
-        for key, value in self.key_value_pairs.items():
-            entity = Entity()
-
-            # Transform the key
-            typedb_type = STIXtoTypeDBMapper \
-                .get_key_value_pair_key_translation(self.typedb_subtype, key)
-
-            # Custom key
-            if typedb_type is None:
-                typedb_type, key_attribute = STIXtoTypeDBMapper \
-                    .get_key_value_pair_custom(self.typedb_subtype)
-                key = typedb_constants.to_typedb_string(key)
-                entity.add_attribute(key_attribute, key)
-
-            entity.set_type(typedb_type)
-
-            # Transform the value
-            # Raises ValueError
-            converter: ValueConverter = ValueConverter \
-                .get_converter(value_type)
-            converter.parse_stix_2_1(value)
-            values, additional_queries = converter.convert_to_typeql()
-            if not additional_queries.is_empty():
-                raise ValueError(
-                    "NonPrimitive Types are currently not supported for "
-                    "key value pairs"
-                )
-            for value in values:
-                entity.add_attribute(value_attribute, value)
-
-            # build the relation
-            relation_name, object_role, item_role = STIXtoTypeDBMapper \
-                .get_pair_relation(self.typedb_subtype)
-            relation = Relation(typedb_type=relation_name)
-
-            reference: Identification = kwargs \
-                .get(constants.REFERENCE_KEYWORD)
-            if not reference:
-                raise ValueError(
-                    "{constants.REFERENCE_KEYWORD} parameter missing in function call "
-                    "for key-value pair creation")
-            relation.add_roleplayer(object_role, reference.get_variable())
-            relation.add_roleplayer(item_role, entity.get_variable())
-
-            queries.add_structured_attribute(entity, relation)
-
+        _, queries = convert_key_value_pairs(
+            self.key_value_pairs, self.typedb_subtype, **kwargs
+        )
         return queries
 
 
@@ -401,47 +372,7 @@ class CompositeValueConverter(NonPrimitiveValueConverter):
         self.attributes: dict = value
 
     def convert_to_typeql(self, **kwargs):
-        # Set up the entity that represent the composite type
-        queries = QueryBundle()
-        entity = Entity(typedb_type=self.typedb_subtype)
-
-        # set up the attributes of the composite type
-        selfref = Identification(
-            "",
-            entity.get_variable(),
-            self.typedb_subtype
-        )
-        for stix_name, stix_value in self.attributes.items():
-            # Get the attribute name and value type in TypeDB
-            typedb_name, typedb_type = STIXtoTypeDBMapper \
-                .get_composite_attribute_info(self.typedb_subtype, stix_name)
-
-            # Convert the value
-            converter: ValueConverter = ValueConverter \
-                .get_converter(typedb_type)
-            converter.parse_stix_2_1(stix_value)
-            typedb_values, additional_queries = converter \
-                .convert_to_typeql(reference=selfref)
-
-            for typedb_value in typedb_values:
-                entity.add_attribute(typedb_name, typedb_value)
-            queries.extend(additional_queries)
-
-        reference: Identification = kwargs.get(constants.REFERENCE_KEYWORD)
-        if not reference:
-            raise ValueError(
-                "{constants.REFERENCE_KEYWORD} parameter not specified for conversion of composite type")
-
-        # set up the helper relation
-        relation_name = STIXtoTypeDBMapper \
-            .get_composite_type_relation(self.typedb_subtype)
-        relation = Relation(typedb_type=relation_name)
-        object_role, value_role = STIXtoTypeDBMapper \
-            .get_composite_relation_roles(self.typedb_subtype)
-        relation.add_roleplayer(object_role, reference.get_variable())
-        relation.add_roleplayer(value_role, selfref.get_variable())
-
-        queries.add_structured_attribute(entity, relation)
+        _, queries = convert_composite(self.attributes, self.typedb_subtype, **kwargs)
         return queries
 
 
@@ -463,44 +394,10 @@ class EmbeddedRelationConverter(NonPrimitiveValueConverter):
         :return: The id of the object and roles of the object and value
         :rtype: tuple[str, str, str]
         """
-        reference: Identification = kwargs.get(constants.REFERENCE_KEYWORD)
-        if not reference:
-            raise ValueError(
-                f"Parameter '{constants.REFERENCE_KEYWORD}' not given for embedded relation conversion")
-        attribute_name = kwargs.get(constants.ATTRIBUTE_NAME)
-        if not attribute_name:
-            raise ValueError(
-                f"Parameter '{constants.ATTRIBUTE_NAME}' not given for embedded relation conversion")
-        obj_role, val_role = STIXtoTypeDBMapper \
-            .get_embedded_relation_roles(attribute_name)
-        return reference, obj_role, val_role
+        return get_embedded_relation_roles(**kwargs)
 
     def convert_to_typeql(self, **kwargs):
-        # Get required information
-        relation_name = self.typedb_subtype
-        reference, object_role, value_role = self.get_id_and_roles(**kwargs)
-        value_id = self.target_id
-
-        try:
-            stix_value_type = get_type_from_id(value_id)
-        except AttributeError as err:
-            raise ValueError(f"Error getting type of STIX object with id '{value_id}':\n{err}") from err
-        value_type = STIXtoTypeDBMapper.get_typedb_supertype(stix_value_type)
-
-        # set up the entities
-        value_entity = Entity(typedb_type=value_type)
-        value_id = typedb_constants.to_typedb_string(value_id)
-        value_entity.add_attribute(constants.TYPEDB_ID_ATTRIBUTE, value_id)
-        object_entity = reference.get_match_object()
-
-        # set up the relation
-        relation = Relation(typedb_type=relation_name)
-        relation.add_roleplayer(object_role, object_entity.get_variable())
-        relation.add_roleplayer(value_role, value_entity.get_variable())
-
-        queries = QueryBundle()
-        queries.add_embedded_relation(object_entity, value_entity, relation)
-
+        _, queries = convert_embedded_relation(self.target_id, self.typedb_subtype, **kwargs)
         return queries
 
 
@@ -517,23 +414,14 @@ class ListConverter(NonPrimitiveValueConverter):
         self.elements = []
 
     def parse_stix_2_1(self, value):
+        # a single value is a list of one element, as when parsed by stix2
+        if isinstance(value, (str, dict)):
+            value = [value]
         self.elements = value
 
     def convert_to_typeql(self, **kwargs):
-        queries = QueryBundle()
-        values = []
-
-        for value in self.elements:
-            converter: ValueConverter = ValueConverter \
-                .get_converter(self.typedb_subtype)
-            converter.parse_stix_2_1(value)
-            additional_values, additional_queries = converter \
-                .convert_to_typeql(**kwargs)
-
-            values.extend(additional_values)
-            queries.extend(additional_queries)
-
-        return values, queries
+        values, queries = convert_list(self.elements, self.typedb_subtype, **kwargs)
+        return values, QueryBundle() if queries is None else queries
 
 
 class DictionaryConverter(NonPrimitiveValueConverter):
@@ -546,62 +434,356 @@ class DictionaryConverter(NonPrimitiveValueConverter):
         self.dictionary = value
 
     def convert_to_typeql(self, **kwargs):
-        reference: Identification = kwargs.get(constants.REFERENCE_KEYWORD)
-        if not reference:
+        return convert_dictionary(self.dictionary, **kwargs)
+
+
+# Stateless conversions
+#
+# Every conversion takes a STIX value, the subtype of its value type (e.g.
+# "string" for "list:string") and the keyword arguments of
+# ValueConverter.convert_to_typeql. It returns the TypeQL values and the
+# additional queries, None if there are none, without instantiating any
+# converter: the conversions are looked up by value type in CONVERSIONS.
+
+def convert_empty(value, subtype: str = "", **kwargs) -> tuple[list[str], QueryBundle]:
+    """Converts a value to an empty/ non-existing value."""
+    return [], None
+
+
+def convert_boolean(value, subtype: str = "", **kwargs) -> tuple[list[str], QueryBundle]:
+    """Converts a *Boolean* value."""
+    if value is True:
+        return [typedb_constants.BOOLEAN_TRUE], None
+    if value is False:
+        return [typedb_constants.BOOLEAN_FALSE], None
+    raise ValueError("Invalid boolean")
+
+
+def convert_long(value, subtype: str = "", **kwargs) -> tuple[list[str], QueryBundle]:
+    """Converts a *Long* value."""
+    return [str(int(value))], None
+
+
+def convert_double(value, subtype: str = "", **kwargs) -> tuple[list[str], QueryBundle]:
+    """Converts a *Double* value."""
+    return [str(float(value))], None
+
+
+def convert_string(value, subtype: str = "", **kwargs) -> tuple[list[str], QueryBundle]:
+    """Converts a *String* value."""
+    return [typedb_constants.to_typedb_string(value)], None
+
+
+def convert_datetime(value, subtype: str = "", **kwargs) -> tuple[list[str], QueryBundle]:
+    """Converts a *Datetime* value."""
+    return [format_datetime_typeql(*parse_datetime(value))], None
+
+
+def parse_datetime(value) -> tuple[int, int, int, int, int, int, list[int]]:
+    """Parse a STIX 2.1 timestamp.
+
+    :param value: The timestamp
+    :type value: str | STIXdatetime
+
+    :raises ValueError: If the value is not a STIX 2.1 timestamp
+
+    :return: The year, month, day, hour, minute, seconds and the digits
+        of the subseconds
+    :rtype: tuple[int, int, int, int, int, int, list[int]]
+    """
+    if isinstance(value, STIXdatetime):
+        value = format_datetime(value)
+    if not re.match(stix_constants.STIX_TIMESTAMP_REGEX, value):
+        raise ValueError("Timestamp is not a STIX2.1 timestamp.")
+    values = value.split(stix_constants.TIMESTAMP_DATE_SEPARATOR)
+    year = int(values.pop(0))
+    month = int(values.pop(0))
+    values = values[0].split(stix_constants.TIMESTAMP_DATE_TIME_SEPARATOR)
+    day = int(values.pop(0))
+    values = values[0].split(stix_constants.TIMESTAMP_TIME_SEPARATOR)
+    hour = int(values.pop(0))
+    minute = int(values.pop(0))
+    subseconds = []
+    if stix_constants.TIMESTAMP_MILLIS_SEPARATOR in values[0]:
+        values = values[0].split(stix_constants.TIMESTAMP_MILLIS_SEPARATOR)
+        seconds = int(values.pop(0))
+        millis = values[0] \
+            .replace(stix_constants.TIMESTAMP_ENDING, "")
+        subseconds = [int(i) for i in millis]
+    else:
+        seconds = int(
+            values[0].replace(stix_constants.TIMESTAMP_ENDING, "")
+        )
+    return year, month, day, hour, minute, seconds, subseconds
+
+
+def format_datetime_typeql(
+        year: int, month: int, day: int, hour: int, minute: int, seconds: int,
+        subseconds: list[int]
+    ) -> str:
+    """Returns the TypeQL representation of a datetime, see parse_datetime."""
+    d, t = typedb_constants.DATETIME_DATE_SEPARATOR, typedb_constants.DATETIME_TIME_SEPARATOR
+    res = (f"{str(year).zfill(4)}{d}{str(month).zfill(2)}{d}{str(day).zfill(2)}"
+           f"{typedb_constants.DATETIME_DATE_TIME_SEPARATOR}"
+           f"{str(hour).zfill(2)}{t}{str(minute).zfill(2)}{t}{str(seconds).zfill(2)}")
+    if subseconds:
+        num_millis = typedb_constants.DATETIME_NUMBER_MILLIS
+        millis = "".join([str(i) for i in subseconds[:num_millis]]).ljust(num_millis, "0")
+        res += typedb_constants.DATETIME_MILLIS_SEPARATOR + millis
+    return res
+
+
+def convert_key_value_pairs(
+        value: dict, subtype: str, **kwargs
+    ) -> tuple[list[str], QueryBundle]:
+    """Converts predefined KeyValuePairs."""
+    queries = QueryBundle()
+
+    value_attribute, value_type = STIXtoTypeDBMapper \
+        .get_pairs_value_and_type(subtype)
+
+    for key, pair_value in value.items():
+        entity = Entity()
+
+        # Transform the key
+        typedb_type = STIXtoTypeDBMapper \
+            .get_key_value_pair_key_translation(subtype, key)
+
+        # Custom key
+        if typedb_type is None:
+            typedb_type, key_attribute = STIXtoTypeDBMapper \
+                .get_key_value_pair_custom(subtype)
+            key = typedb_constants.to_typedb_string(key)
+            entity.add_attribute(key_attribute, key)
+
+        entity.set_type(typedb_type)
+
+        # Transform the value
+        # Raises ValueError
+        values, additional_queries = ValueConverter.convert(value_type, pair_value)
+        if additional_queries is not None and not additional_queries.is_empty():
             raise ValueError(
-                "No reference passed for value conversion to dictionary"
+                "NonPrimitive Types are currently not supported for "
+                "key value pairs"
             )
-        queries = QueryBundle()
-        property_attribute = STIXtoTypeDBMapper \
-            .get_dictionary_property_attribute()
+        for typedb_value in values:
+            entity.add_attribute(value_attribute, typedb_value)
 
-        for key, value in self.dictionary.items():
-            # get the type of the value
-            value_type = STIXtoTypeDBMapper \
-                .get_default_value_implementation(value)
+        # build the relation
+        relation_name, object_role, item_role = STIXtoTypeDBMapper \
+            .get_pair_relation(subtype)
+        relation = Relation(typedb_type=relation_name)
 
-            if not value_type:
-                raise ValueError(
-                    "Dictionary contains value with unsupported value type: "
-                    "{key} with value {value}")
-
-            # convert the item's value to the TypeDB representation
-            converter: ValueConverter = ValueConverter \
-                .get_converter(value_type)
-            converter.parse_stix_2_1(value)
-            values, additional_queries = converter \
-                .convert_to_typeql(reference=reference)
-            if not additional_queries.is_empty():
-                raise ValueError(
-                    "Dictionaries do not support non primitive types"
-                )
+        reference: Identification = kwargs \
+            .get(constants.REFERENCE_KEYWORD)
+        if not reference:
+            raise ValueError(
+                "{constants.REFERENCE_KEYWORD} parameter missing in function call "
+                "for key-value pair creation")
+        relation.add_roleplayer(object_role, reference.get_variable())
+        relation.add_roleplayer(item_role, entity.get_variable())
 
-            # set up the item entity
-            item_entity_type, key_attribute, value_attribute = \
-                STIXtoTypeDBMapper.get_dictionary_item_data(value_type)
+        queries.add_structured_attribute(entity, relation)
 
-            item = Entity(typedb_type=item_entity_type)
-            key = typedb_constants.to_typedb_string(key)
-            item.add_attribute(key_attribute, key)
-            for value in values:
-                item.add_attribute(value_attribute, value)
-
-            # Set up the relation that connects the item to main object
-            # The relation has the name of the STIX property as an attribute
-            relation_name, item_role, object_role = STIXtoTypeDBMapper \
-                .get_dictionary_relation_data()
-
-            relation = Relation(typedb_type=relation_name)
-            property_name = kwargs.get(constants.ATTRIBUTE_NAME)
-            if not property_name:
-                raise ValueError(
-                    "Property name must be given for Dictionary Conversion"
-                )
-            attribute_value = typedb_constants.to_typedb_string(property_name)
-            relation.add_attribute(property_attribute, attribute_value)
-            relation.add_roleplayer(object_role, reference.get_variable())
-            relation.add_roleplayer(item_role, item.get_variable())
+    return [], queries
+
+
+def convert_composite(value: dict, subtype: str, **kwargs) -> tuple[list[str], QueryBundle]:
+    """Converts a composite value."""
+    # Set up the entity that represent the composite type
+    queries = QueryBundle()
+    entity = Entity(typedb_type=subtype)
+
+    # set up the attributes of the composite type
+    selfref = Identification(
+        "",
+        entity.get_variable(),
+        subtype
+    )
+    for stix_name, stix_value in value.items():
+        # Get the attribute name and value type in TypeDB
+        typedb_name, typedb_type = STIXtoTypeDBMapper \
+            .get_composite_attribute_info(subtype, stix_name)
+
+        # Convert the value
+        typedb_values, additional_queries = ValueConverter \
+            .convert(typedb_type, stix_value, reference=selfref)
+
+        for typedb_value in typedb_values:
+            entity.add_attribute(typedb_name, typedb_value)
+        if additional_queries is not None:
+            queries.extend(additional_queries)
+
+    reference: Identification = kwargs.get(constants.REFERENCE_KEYWORD)
+    if not reference:
+        raise ValueError(
+            "{constants.REFERENCE_KEYWORD} parameter not specified for conversion of composite type")
+
+    # set up the helper relation
+    relation_name = STIXtoTypeDBMapper \
+        .get_composite_type_relation(subtype)
+    relation = Relation(typedb_type=relation_name)
+    object_role, value_role = STIXtoTypeDBMapper \
+        .get_composite_relation_roles(subtype)
+    relation.add_roleplayer(object_role, reference.get_variable())
+    relation.add_roleplayer(value_role, selfref.get_variable())
+
+    queries.add_structured_attribute(entity, relation)
+    return [], queries
+
+
+def get_embedded_relation_roles(**kwargs) -> tuple[Identification, str, str]:
+    """Extracts the id of the calling object and the name of the 
+    object's and value's roles of an embedded relation.
+
+    :raises ValueError: If a required parameter is not given
+
+    :return: The id of the object and roles of the object and value
+    :rtype: tuple[str, str, str]
+    """
+    reference: Identification = kwargs.get(constants.REFERENCE_KEYWORD)
+    if not reference:
+        raise ValueError(
+            f"Parameter '{constants.REFERENCE_KEYWORD}' not given for embedded relation conversion")
+    attribute_name = kwargs.get(constants.ATTRIBUTE_NAME)
+    if not attribute_name:
+        raise ValueError(
+            f"Parameter '{constants.ATTRIBUTE_NAME}' not given for embedded relation conversion")
+    obj_role, val_role = STIXtoTypeDBMapper \
+        .get_embedded_relation_roles(attribute_name)
+    return reference, obj_role, val_role
+
+
+def convert_embedded_relation(
+        value: str, subtype: str, **kwargs
+    ) -> tuple[list[str], QueryBundle]:
+    """Converts the id of the target of an embedded relation."""
+    # Get required information
+    relation_name = subtype
+    reference, object_role, value_role = get_embedded_relation_roles(**kwargs)
+    value_id = value
+
+    try:
+        stix_value_type = get_type_from_id(value_id)
+    except AttributeError as err:
+        raise ValueError(f"Error getting type of STIX object with id '{value_id}':\n{err}") from err
+    value_type = STIXtoTypeDBMapper.get_typedb_supertype(stix_value_type)
+
+    # set up the entities
+    value_entity = Entity(typedb_type=value_type)
+    value_id = typedb_constants.to_typedb_string(value_id)
+    value_entity.add_attribute(constants.TYPEDB_ID_ATTRIBUTE, value_id)
+    object_entity = reference.get_match_object()
+
+    # set up the relation
+    relation = Relation(typedb_type=relation_name)
+    relation.add_roleplayer(object_role, object_entity.get_variable())
+    relation.add_roleplayer(value_role, value_entity.get_variable())
+
+    queries = QueryBundle()
+    queries.add_embedded_relation(object_entity, value_entity, relation)
+
+    return [], queries
+
+
+def convert_list(value, subtype: str, **kwargs) -> tuple[list[str], QueryBundle]:
+    """Converts a typed list, each element with the conversion of the
+    subtype."""
+    # Raises ValueError if the subtype has no converter
+    conversion, element_subtype = ValueConverter.get_conversion(subtype)
+    # a single value is a list of one element, as when parsed by stix2
+    if isinstance(value, (str, dict)):
+        value = [value]
+
+    values = []
+    queries = None
+    for element in value:
+        additional_values, additional_queries = conversion(element, element_subtype, **kwargs)
+        values.extend(additional_values)
+        if additional_queries is None:
+            continue
+        if queries is None:
+            queries = additional_queries
+        else:
+            queries.extend(additional_queries)
 
-            queries.add_structured_attribute(item, relation)
+    return values, queries
 
-        return ([], queries)
+
+def convert_dictionary(value: dict, subtype: str = "", **kwargs) -> tuple[list[str], QueryBundle]:
+    """Converts a Dictionary."""
+    reference: Identification = kwargs.get(constants.REFERENCE_KEYWORD)
+    if not reference:
+        raise ValueError(
+            "No reference passed for value conversion to dictionary"
+        )
+    queries = QueryBundle()
+    property_attribute = STIXtoTypeDBMapper \
+        .get_dictionary_property_attribute()
+
+    for key, item_value in value.items():
+        # get the type of the value
+        value_type = STIXtoTypeDBMapper \
+            .get_default_value_implementation(item_value)
+
+        if not value_type:
+            raise ValueError(
+                "Dictionary contains value with unsupported value type: "
+                "{key} with value {value}")
+
+        # convert the item's value to the TypeDB representation
+        values, additional_queries = ValueConverter \
+            .convert(value_type, item_value, reference=reference)
+        if additional_queries is not None and not additional_queries.is_empty():
+            raise ValueError(
+                "Dictionaries do not support non primitive types"
+            )
+
+        # set up the item entity
+        item_entity_type, key_attribute, value_attribute = \
+            STIXtoTypeDBMapper.get_dictionary_item_data(value_type)
+
+        item = Entity(typedb_type=item_entity_type)
+        key = typedb_constants.to_typedb_string(key)
+        item.add_attribute(key_attribute, key)
+        for typedb_value in values:
+            item.add_attribute(value_attribute, typedb_value)
+
+        # Set up the relation that connects the item to main object
+        # The relation has the name of the STIX property as an attribute
+        relation_name, item_role, object_role = STIXtoTypeDBMapper \
+            .get_dictionary_relation_data()
+
+        relation = Relation(typedb_type=relation_name)
+        property_name = kwargs.get(constants.ATTRIBUTE_NAME)
+        if not property_name:
+            raise ValueError(
+                "Property name must be given for Dictionary Conversion"
+            )
+        attribute_value = typedb_constants.to_typedb_string(property_name)
+        relation.add_attribute(property_attribute, attribute_value)
+        relation.add_roleplayer(object_role, reference.get_variable())
+        relation.add_roleplayer(item_role, item.get_variable())
+
+        queries.add_structured_attribute(item, relation)
+
+    return [], queries
+
+
+# The stateless conversion of every main value type
+CONVERSIONS: dict[str, Callable] = {
+    typedb_constants.STRING: convert_string,
+    typedb_constants.DOUBLE: convert_double,
+    typedb_constants.BOOLEAN: convert_boolean,
+    typedb_constants.DATETIME: convert_datetime,
+    typedb_constants.LONG: convert_long,
+    constants.TYPEQL_COMPOSITE_PREFIX: convert_composite,
+    constants.TYPEQL_RELATION_PREFIX: convert_embedded_relation,
+    constants.TYPEQL_LIST_PREFIX: convert_list,
+    constants.TYPEQL_NOT_IMPLEMENTED_TYPE_KEYWORD: convert_empty,
+    constants.TYPEQL_DICTIONARY_KEYWORD: convert_dictionary,
+    constants.MAPPING_KEY_VALUE_PAIR_KEYWORD: convert_key_value_pairs,
+    constants.TYPEQL_ROLEPLAYER: convert_empty,
+}
+# The conversion and subtype of the value types already resolved
+RESOLVED_CONVERSIONS: dict[str, tuple[Callable, str]] = {}
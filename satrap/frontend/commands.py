@@ -24,12 +24,20 @@ def as_function(name):
         is not found in the global namespace
     """
     if name:
-        return globals()["exec_" + name]
+        return globals()["exec_" + name.replace("-", "_")]
     raise ValueError("No valid command was given")
 
 
 def _get_etl_kwargs(args):
-    kwargs = {}
+    kwargs = {
+        extract_ct.STREAM: args.stream,
+        extract_ct.TRUSTED: args.trusted,
+        "workers": args.workers,
+        "checkpoint": args.checkpoint,
+        "resume": args.resume,
+        "upsert": args.upsert,
+        "cache": args.cache
+    }
     if int(args.xmode) == extract_ct.DOWNLOADER:
         kwargs["transform_src"] = utils.create_local_filename(conf.STIX_DATA_PATH, args.src)
         kwargs[extract_ct.MAX_CONNECTION_TIME] = args.maxconnectiontime
@@ -40,6 +48,14 @@ def _get_etl_kwargs(args):
     return kwargs
 
 
+def _check_load_options(args):
+    """Exit if the options of a load cannot be combined."""
+    if args.upsert and (args.checkpoint or args.resume):
+        logger.error("The options '--checkpoint' and '--resume' cannot be combined with '--upsert'.")
+        print("The options '--checkpoint' and '--resume' cannot be combined with '--upsert'.")
+        sys.exit(1)
+
+
 def _build_exec_end_message(process_name, starttime, endtime, num_data_instances):
     total = endtime - starttime
     if total/60 >= 1:
@@ -118,6 +134,7 @@ def exec_etl(args):
             "Please provide it using the '-k' option."
         )
         sys.exit(1)
+    _check_load_options(args)
 
     print(
         f"\nThe ETL process will be executed with the following parameters "
@@ -157,6 +174,10 @@ def exec_etl(args):
 
 
 def exec_tl(args):
+    if args.emit_tql:
+        _export_tql(args)
+        return
+    _check_load_options(args)
     logger.info(
         "Starting transform and load process into '%s' at %s",
         args.database,
@@ -179,7 +200,12 @@ def exec_tl(args):
     try:
         ini_data = db_driver.count_data_instances(args.server, args.database)
         start = timer()
-        orch.transform_load(args.file, args.server, args.database)
+        orch.transform_load(
+            args.file, args.server, args.database,
+            stream=args.stream, trusted=args.trusted, workers=args.workers,
+            checkpoint=args.checkpoint, resume=args.resume, upsert=args.upsert,
+            cache=args.cache
+        )
         end = timer()
         end_data = db_driver.count_data_instances(args.server, args.database)
     except exceptions.ExtractionError as e:
@@ -196,6 +222,109 @@ def exec_tl(args):
     print(_build_exec_end_message("TL", start, end, end_data-ini_data))
 
 
+def _export_tql(args):
+    logger.info("Starting transformation into TypeQL files in '%s'", args.emit_tql)
+    orch = ETLOrchestrator(extract_ct.STIX_READER)
+
+    print(f"Logging to file: {ACTIVE_LOG_FILE}")
+    try:
+        start = timer()
+        orch.export_typeql(
+            args.file, args.emit_tql,
+            stream=args.stream, trusted=args.trusted, workers=args.workers,
+            cache=args.cache
+        )
+        end = timer()
+    except exceptions.ExtractionError as e:
+        if conf.EXEC_ENVIRONMENT == "dev":
+            logger.exception(e)
+        else:
+            logger.error(e)
+            print(e)
+        sys.exit(1)
+    except Exception as err:
+        _handle_gen_exception(err)
+
+    print(f"TypeQL files written to {args.emit_tql} in {end - start:.3f} seconds.")
+
+
+def exec_load_tql(args):
+    logger.info(
+        "Starting load of TypeQL files into '%s' at %s",
+        args.database,
+        args.server,
+    )
+    orch = ETLOrchestrator(extract_ct.STIX_READER)
+
+    print(
+        f"\nThe TypeQL queries will be loaded with the following parameters:\n\n"
+        f" TypeQL files: {args.path}\n"
+        f" Load into: database '{args.database}' at {args.server}\n"
+    )
+    confirmation = input("Type \"yes\" to continue: ").strip().lower()
+    if confirmation != "yes":
+        logger.info("Load aborted by the user.")
+        print("Load aborted by the user.")
+        sys.exit(0)
+
+    print(f"Logging to file: {ACTIVE_LOG_FILE}")
+    try:
+        ini_data = db_driver.count_data_instances(args.server, args.database)
+        start = timer()
+        orch.load_typeql(args.path, args.server, args.database)
+        end = timer()
+        end_data = db_driver.count_data_instances(args.server, args.database)
+    except Exception as err:
+        _handle_gen_exception(err)
+
+    logger.info(_build_exec_end_message("Load", start, end, end_data-ini_data))
+    print(_build_exec_end_message("Load", start, end, end_data-ini_data))
+
+
+def exec_sync(args):
+    logger.info(
+        "Starting synchronization of '%s' at %s",
+        args.database,
+        args.server,
+    )
+    orch = ETLOrchestrator(extract_ct.STIX_READER)
+
+    print(
+        f"\nThe database will be updated with the following parameters:\n\n"
+        f" Loaded datasource file: {args.old}\n"
+        f" New datasource file: {args.new}\n"
+        f" Update: database '{args.database}' at {args.server}\n"
+    )
+    confirmation = input("Type \"yes\" to continue: ").strip().lower()
+    if confirmation != "yes":
+        logger.info("Synchronization aborted by the user.")
+        print("Synchronization aborted by the user.")
+        sys.exit(0)
+
+    print(f"Logging to file: {ACTIVE_LOG_FILE}")
+    try:
+        ini_data = db_driver.count_data_instances(args.server, args.database)
+        start = timer()
+        orch.sync(
+            args.old, args.new, args.server, args.database,
+            stream=args.stream, trusted=args.trusted, workers=args.workers
+        )
+        end = timer()
+        end_data = db_driver.count_data_instances(args.server, args.database)
+    except exceptions.ExtractionError as e:
+        if conf.EXEC_ENVIRONMENT == "dev":
+            logger.exception(e)
+        else:
+            logger.error(e)
+            print(e)
+        sys.exit(1)
+    except Exception as err:
+        _handle_gen_exception(err)
+
+    logger.info(_build_exec_end_message("Sync", start, end, end_data-ini_data))
+    print(_build_exec_end_message("Sync", start, end, end_data-ini_data))
+
+
 def exec_rules(args):
     try:
         with CTIEngine(args.server, args.database) as engine:
@@ -24,6 +24,8 @@ def cli():
     _add_setup(subparsers)
     _add_etl(subparsers)
     _add_tl(subparsers)
+    _add_sync(subparsers)
+    _add_load_tql(subparsers)
 
     # build parsers for analysis subcommands
     _add_rules(subparsers)
@@ -146,6 +148,49 @@ def _add_etl(subs):
         action="store_true",
         help=f"Extract a sample STIX2.1 file and load in the test database '{conf.DB_NAME_TST}'",
     )
+    subparser.add_argument(
+        "-s",
+        "--stream",
+        action="store_true",
+        help=("Stream the STIX 2.1 file through transformation and loading, "
+              "one object at a time, to keep memory usage independent of the file size")
+    )
+    subparser.add_argument(
+        "--trusted",
+        action="store_true",
+        help=("Trusted input: transform the STIX objects as plain JSON objects "
+              "without (full) stix2 validation; see 'validate_every' in 'satrap_params.yml'")
+    )
+    subparser.add_argument(
+        "-w",
+        "--workers",
+        type=int, default=1,
+        help="Number of processes transforming the STIX objects (default: %(default)s)"
+    )
+    subparser.add_argument(
+        "--checkpoint",
+        action="store_true",
+        help=("Record the committed queries in a journal, so that an interrupted load "
+              "can be resumed with '--resume'")
+    )
+    subparser.add_argument(
+        "--resume",
+        action="store_true",
+        help=("Resume an interrupted load of the same STIX 2.1 file into the database, "
+              "skipping the queries already committed")
+    )
+    subparser.add_argument(
+        "--upsert",
+        action="store_true",
+        help=("Load only the STIX objects not yet stored in the database with the same "
+              "'modified' timestamp, replacing the modified ones")
+    )
+    subparser.add_argument(
+        "--cache",
+        action="store_true",
+        help=("Reuse the STIX objects transformed by previous runs with the same "
+              "'modified' timestamp; see 'transform_cache_size' in 'satrap_params.yml'")
+    )
 
 
 def _add_tl(subs):
@@ -176,6 +221,127 @@ def _add_tl(subs):
         default=conf.DB_NAME,
         help="Database where data is to be inserted (default: %(default)s)",
     )
+    subparser.add_argument(
+        "-s",
+        "--stream",
+        action="store_true",
+        help=("Stream the STIX 2.1 file through transformation and loading, "
+              "one object at a time, to keep memory usage independent of the file size")
+    )
+    subparser.add_argument(
+        "--trusted",
+        action="store_true",
+        help=("Trusted input: transform the STIX objects as plain JSON objects "
+              "without (full) stix2 validation; see 'validate_every' in 'satrap_params.yml'")
+    )
+    subparser.add_argument(
+        "-w",
+        "--workers",
+        type=int, default=1,
+        help="Number of processes transforming the STIX objects (default: %(default)s)"
+    )
+    subparser.add_argument(
+        "--checkpoint",
+        action="store_true",
+        help=("Record the committed queries in a journal, so that an interrupted load "
+              "can be resumed with '--resume'")
+    )
+    subparser.add_argument(
+        "--resume",
+        action="store_true",
+        help=("Resume an interrupted load of the same STIX 2.1 file into the database, "
+              "skipping the queries already committed")
+    )
+    subparser.add_argument(
+        "--upsert",
+        action="store_true",
+        help=("Load only the STIX objects not yet stored in the database with the same "
+              "'modified' timestamp, replacing the modified ones")
+    )
+    subparser.add_argument(
+        "--cache",
+        action="store_true",
+        help=("Reuse the STIX objects transformed by previous runs with the same "
+              "'modified' timestamp; see 'transform_cache_size' in 'satrap_params.yml'")
+    )
+    subparser.add_argument(
+        "--emit-tql",
+        metavar="FOLDER",
+        help=("Write the TypeQL insert queries to compressed files in this folder "
+              "instead of loading them, to be loaded with 'load-tql'")
+    )
+
+
+def _add_sync(subs):
+    """Add submenu for the 'sync' command to a given parser
+
+    :param subs: An object returned by the 'add_subparsers()' method
+        of an ArgumentParser
+    :type subs: Type of the output of the 'add_subparsers()' method
+        of an ArgumentParser
+    """
+    help_txt = ("Update the CTI SKB of SATRAP from a loaded STIX 2.1 file to a newer "
+                "release of it, loading only the added, modified and removed objects.")
+    subparser = subs.add_parser("sync", description=help_txt, help=help_txt)
+
+    subparser.add_argument(
+        "old",
+        help="The path of the STIX 2.1 file loaded in the database",
+    )
+    subparser.add_argument(
+        "new",
+        help="The path of the new release of the STIX 2.1 file",
+    )
+    subparser.add_argument(
+        "-db",
+        "--database",
+        default=conf.DB_NAME,
+        help="Database to be updated (default: %(default)s)",
+    )
+    subparser.add_argument(
+        "-s",
+        "--stream",
+        action="store_true",
+        help=("Stream the new STIX 2.1 file through transformation and loading, "
+              "one object at a time, to keep memory usage independent of the file size")
+    )
+    subparser.add_argument(
+        "--trusted",
+        action="store_true",
+        help=("Trusted input: transform the STIX objects as plain JSON objects "
+              "without (full) stix2 validation; see 'validate_every' in 'satrap_params.yml'")
+    )
+    subparser.add_argument(
+        "-w",
+        "--workers",
+        type=int, default=1,
+        help="Number of processes transforming the STIX objects (default: %(default)s)"
+    )
+
+
+def _add_load_tql(subs):
+    """Add submenu for the 'load-tql' command to a given parser
+
+    :param subs: An object returned by the 'add_subparsers()' method
+        of an ArgumentParser
+    :type subs: Type of the output of the 'add_subparsers()' method
+        of an ArgumentParser
+    """
+    help_txt = ("Load into the CTI SKB of SATRAP the TypeQL insert queries written "
+                "by 'tl --emit-tql', without transforming the STIX 2.1 file again.")
+    subparser = subs.add_parser("load-tql", description=help_txt, help=help_txt)
+
+    subparser.add_argument(
+        "path",
+        help=("The folder written by 'tl --emit-tql', or a file of TypeQL queries "
+              "such as the 'failed_queries.jsonl' of a previous load"),
+    )
+    subparser.add_argument(
+        "-db",
+        "--database",
+        default=conf.DB_NAME,
+        help="Database where data is to be inserted (default: %(default)s)",
+    )
 
 
 def _add_db_args(parser):
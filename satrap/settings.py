@@ -26,7 +26,11 @@ ASSETS_FOLDER = "assets"
 DB_SCHEMA_FOLDER = "schema"
 
 LOGS_PATH = os.path.join(ROOT_DIR, ASSETS_FOLDER, "logs")
+# Progress journals of the loads, one per database
+LOAD_JOURNALS_PATH = os.path.join(ROOT_DIR, ASSETS_FOLDER, "journals")
 MAPPING_FILES_PATH = os.path.join(ROOT_DIR, "etl", "transform", "mapping")
+# Cache of the transformed STIX objects, reused across runs
+TRANSFORM_CACHE_FILE = os.path.join(ROOT_DIR, ASSETS_FOLDER, "cache", "transform_cache.sqlite")
 TESTS_SAMPLES_PATH = os.path.abspath(os.path.join(ROOT_DIR, "..", "tests", "data"))
 
 SATRAP_PARAMS_FILE_NAME = "satrap_params.yml"
@@ -84,12 +88,66 @@ except AttributeError:
     MITRE_ATTACK_SRC = MITRE_ATTACK_ENTERPRISE
 
 DOWNLOAD_CHUNK_SIZE = 4096
+# Number of characters read at a time when streaming a STIX bundle
+STIX_STREAM_CHUNK_SIZE = 65536
+# In trusted extraction mode, validate one out of this number of STIX objects
+# with stix2 (0 disables the validation)
+try:
+    TRUSTED_VALIDATE_EVERY = int(satrap_params_dict.get('etl').get('validate_every', 0))
+except AttributeError:
+    TRUSTED_VALIDATE_EVERY = 0
 
 # Local storage of STIX2.1 datasources
 STIX_DATA_PATH = os.path.join(ROOT_DIR, ASSETS_FOLDER, "stixdata")
 MISP_STIX_DATA_FILE = os.path.join(STIX_DATA_PATH, "misp_events.json")
 
 LOAD_BATCH_SIZE = 100
+# Number of concurrent write transactions for independent (entity) batches,
+# and number of retries of a transaction after a write conflict
+try:
+    LOAD_PARALLELISM = int(satrap_params_dict.get('etl').get('load_parallelism', 1))
+except AttributeError:
+    LOAD_PARALLELISM = 1
+try:
+    LOAD_CONFLICT_RETRIES = int(satrap_params_dict.get('etl').get('conflict_retries', 3))
+except AttributeError:
+    LOAD_CONFLICT_RETRIES = 3
+# Adapt the batch size (starting at LOAD_BATCH_SIZE) to the commit time:
+# increase it while commits take less than LOAD_TARGET_LATENCY seconds
+try:
+    LOAD_ADAPTIVE_BATCH_SIZE = bool(satrap_params_dict.get('etl').get('adaptive_batch_size', False))
+except AttributeError:
+    LOAD_ADAPTIVE_BATCH_SIZE = False
+try:
+    LOAD_TARGET_LATENCY = float(satrap_params_dict.get('etl').get('target_latency', 2.0))
+except AttributeError:
+    LOAD_TARGET_LATENCY = 2.0
+LOAD_MAX_BATCH_SIZE = 2000
+# Number of insert queries with match clause (SROs, embedded relations)
+# merged into one query, matching their shared instances once (1: no packing)
+try:
+    LOAD_PACK_SIZE = int(satrap_params_dict.get('etl').get('pack_size', 1))
+except AttributeError:
+    LOAD_PACK_SIZE = 1
+# Maximum size in MB of the transformation cache (--cache)
+try:
+    TRANSFORM_CACHE_MAX_SIZE = int(satrap_params_dict.get('etl').get('transform_cache_size', 512))
+except AttributeError:
+    TRANSFORM_CACHE_MAX_SIZE = 512
+# Convert the properties of the STIX objects with functions generated from
+# the mapping instead of interpreting the mapping
+try:
+    TRANSFORM_COMPILED_CONVERTERS = bool(satrap_params_dict.get('etl').get('compiled_converters', False))
+except AttributeError:
+    TRANSFORM_COMPILED_CONVERTERS = False
+# Number of STIX objects sent at a time to a transformation worker process
+TRANSFORM_CHUNK_SIZE = 200
+# In streaming mode, number of batches of transformed queries waiting to be
+# loaded while the transformation goes on (0 disables the overlapping)
+try:
+    PIPELINE_QUEUE_DEPTH = int(satrap_params_dict.get('etl').get('queue_depth', 4))
+except AttributeError:
+    PIPELINE_QUEUE_DEPTH = 4
 
 
 ## Default CLI arguments
@@ -121,6 +179,8 @@ except AttributeError:
 DEBUG_LOG_FILE_NAME = "debug"
 INFO_LOG_FILE_NAME = "info"
 ERROR_LOG_FILE_NAME = "error"
+# Insert queries rejected by TypeDB, stored as JSON lines to be replayed
+FAILED_QUERIES_FILE_NAME = "failed_queries.jsonl"
 LOG_FILES_EXT = ".log"
 # True to append a timestamp to the logging file name
 TIMESTAMP_FILES = False
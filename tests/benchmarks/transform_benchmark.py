@@ -0,0 +1,104 @@
+"""Benchmarks of the transformation of a STIX bundle into TypeQL queries.
+
+Usage: python -m tests.benchmarks.transform_benchmark [BUNDLE] [--trusted] [--only NAME]
+
+The bundle defaults to the test sample, e.g. use the MITRE ATT&CK
+Enterprise bundle for representative figures.
+"""
+
+import argparse
+import gc
+import os
+import pickle
+import tracemalloc
+from timeit import default_timer as timer
+
+from satrap.datamanagement.typedb.typeql_builder import TypeQLBuilder
+from satrap.etl.etlorchestrator import ETLOrchestrator
+from satrap.etl.extract.extract_constants import STIX_READER
+from satrap.settings import TRANSFORM_SRC_TST
+
+
+def benchmark_memory(orchestrator: ETLOrchestrator, bundle: str, trusted: bool) -> None:
+    """Print the memory held by the insert queries of a bundle."""
+    gc.collect()
+    tracemalloc.start()
+    queries = orchestrator.transform(bundle, trusted=trusted)
+    gc.collect()
+    held, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    count = sum(len(phase) for phase in queries)
+    print(f"memory: {count} queries hold {held / 2**20:.2f} MiB "
+          f"({held / max(count, 1):.0f} B/query), peak {peak / 2**20:.2f} MiB")
+
+
+def benchmark_allocations(orchestrator: ETLOrchestrator, bundle: str, trusted: bool) -> None:
+    """Print the memory allocated while transforming the STIX objects of a
+    bundle one at a time, short-lived objects (e.g. value converters)
+    included."""
+    stix_objects = list(orchestrator.extractor.fetch(bundle, trusted=trusted))
+    transformer = orchestrator.transformer_cls()
+    gc.collect()
+    tracemalloc.start()
+    allocated = 0
+    for stix_object in stix_objects:
+        tracemalloc.reset_peak()
+        start = tracemalloc.get_traced_memory()[0]
+        transformer.transform(stix_object)
+        allocated += tracemalloc.get_traced_memory()[1] - start
+    tracemalloc.stop()
+    print(f"allocations: {len(stix_objects)} objects, peak "
+          f"{allocated / max(len(stix_objects), 1):.0f} B/object allocated while transforming")
+
+
+def benchmark_transform(orchestrator: ETLOrchestrator, bundle: str, trusted: bool) -> None:
+    """Print the time taken by the transformation of a bundle."""
+    start = timer()
+    queries = orchestrator.transform(bundle, trusted=trusted)
+    count = sum(len(phase) for phase in queries)
+    print(f"transform: {count} queries in {timer() - start:.3f} s")
+
+
+def benchmark_serialize(
+        orchestrator: ETLOrchestrator, bundle: str, trusted: bool, repeat: int = 5
+    ) -> None:
+    """Print the throughput of the serialization of the insert queries of
+    a bundle into TypeQL."""
+    queries = [q for phase in orchestrator.transform(bundle, trusted=trusted) for q in phase]
+    # fresh copies, without the memory cached by previous builds
+    data = pickle.dumps(queries)
+    best = float("inf")
+    for _ in range(repeat):
+        copies = pickle.loads(data)
+        start = timer()
+        size = sum(len(TypeQLBuilder.build_insert_query(q)) for q in copies)
+        best = min(best, timer() - start)
+    print(f"serialize: {len(queries)} queries ({size / 2**20:.2f} MiB) in {best:.3f} s, "
+          f"{len(queries) / best:.0f} queries/s")
+
+
+BENCHMARKS = {
+    "memory": benchmark_memory,
+    "allocations": benchmark_allocations,
+    "transform": benchmark_transform,
+    "serialize": benchmark_serialize,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("bundle", nargs="?", default=TRANSFORM_SRC_TST)
+    parser.add_argument("--trusted", action="store_true")
+    parser.add_argument("--only", choices=BENCHMARKS, action="append")
+    args = parser.parse_args()
+
+    orchestrator = ETLOrchestrator(STIX_READER)
+    # warm up: the mapping is read once
+    orchestrator.transform(TRANSFORM_SRC_TST)
+    print(f"bundle: {os.path.basename(args.bundle)}")
+    for name in args.only or BENCHMARKS:
+        BENCHMARKS[name](orchestrator, args.bundle, args.trusted)
+
+
+if __name__ == "__main__":
+    main()
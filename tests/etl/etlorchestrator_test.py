@@ -0,0 +1,81 @@
+import os
+import shutil
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from satrap.etl.etlorchestrator import ETLOrchestrator, _BackgroundIterator
+from satrap.etl.extract.extract_constants import STIX_READER
+from satrap.datamanagement.typedb.typeql_builder import TypeQLBuilder
+
+
+class TestTransform(unittest.TestCase):
+
+    def setUp(self):
+        self.filepath = os.path.join(os.path.dirname(__file__), "..", "data")
+        self.orchestrator = ETLOrchestrator(STIX_READER)
+
+    def test_parallel_transform(self):
+        file = os.path.join(self.filepath, "test-sample.json")
+        expected = self.orchestrator.transform(file)
+        # several chunks per worker
+        with patch("satrap.settings.TRANSFORM_CHUNK_SIZE", 2):
+            res = self.orchestrator.transform(file, workers=2)
+        for queries, expected_queries in zip(res, expected):
+            self.assertEqual(
+                [str(q) for q in queries],
+                [str(q) for q in expected_queries]
+            )
+
+    def test_stream_transform_load(self):
+        file = os.path.join(self.filepath, "test-sample.json")
+        expected = [
+            TypeQLBuilder.build_insert_query(q)
+            for queries in self.orchestrator.transform(file) for q in queries
+        ]
+        # with and without overlapping transformation and loading
+        for queue_depth in (0, 1):
+            inserted = []
+            with patch("satrap.etl.load.loader.TypeDBBatchInsertHandler") as handler:
+                inserter = handler.return_value.__enter__.return_value
+                inserter.try_insert.side_effect = \
+                    lambda queries, **kwargs: inserted.extend(queries)
+                with patch("satrap.settings.LOAD_BATCH_SIZE", 2), \
+                        patch("satrap.settings.LOAD_PACK_SIZE", 1):
+                    self.orchestrator.stream_transform_load(
+                        file, "localhost:1729", "test", queue_depth=queue_depth)
+
+            # entities are loaded before the SROs and embedded relations
+            self.assertEqual(inserted, expected)
+
+    def test_export_load_typeql(self):
+        file = os.path.join(self.filepath, "test-sample.json")
+        expected = [
+            TypeQLBuilder.build_insert_query(q)
+            for queries in self.orchestrator.transform(file) for q in queries
+        ]
+        folder = tempfile.mkdtemp()
+        self.orchestrator.export_typeql(file, folder, stream=True)
+
+        inserted = []
+        with patch("satrap.etl.load.loader.TypeDBBatchInsertHandler") as handler:
+            inserter = handler.return_value.__enter__.return_value
+            inserter.try_insert.side_effect = \
+                lambda queries, **kwargs: inserted.extend(queries)
+            self.orchestrator.load_typeql(folder, "localhost:1729", "test")
+        shutil.rmtree(folder)
+
+        # the queries are loaded as built, phase by phase
+        self.assertEqual(inserted, expected)
+        with self.assertRaises(ValueError):
+            self.orchestrator.load_typeql(folder, "localhost:1729", "test")
+
+    def test_background_iterator(self):
+        self.assertEqual(list(_BackgroundIterator(range(10), 3, 1)), list(range(10)))
+
+        def failing():
+            yield 1
+            raise ValueError("transformation failed")
+
+        with self.assertRaises(ValueError):
+            list(_BackgroundIterator(failing(), 3, 1))
@@ -6,7 +6,7 @@ from stix2.utils import parse_into_datetime
 from satrap.etl import stix_constants
 from satrap.etl.extract.extractor import Downloader, MISPExtractor, STIXExtractor, Extractor
 from satrap.etl.extract import extract_constants
-from satrap.etl.exceptions import ExtractionError
+from satrap.etl.exceptions import ExtractionError, STIXParsingError
 
 class TestDownloader(unittest.TestCase):
 
@@ -104,6 +104,89 @@ class TestDownloader(unittest.TestCase):
         for so in reader.fetch(file):
             self.assertFalse(so.get(stix_constants.STIX_PROPERTY_ID) is None)
 
+    def test_stix_stream_extract(self):
+        file = self.filepath + "test-sample.json"
+        reader = STIXExtractor()
+        expected = [dict(so) for so in reader.fetch(file)]
+        streamed = [dict(so) for so in reader.fetch(
+            file, **{extract_constants.STREAM: True})]
+        self.assertEqual(expected, streamed)
+
+    def test_stix_stream_no_objects(self):
+        file = self.filepath + "stream_no_objects.json"
+        with open(file, "w", encoding="utf-8") as f:
+            f.write('{"type": "bundle", "id": "bundle--1"}')
+        reader = STIXExtractor()
+        try:
+            with self.assertRaises(ExtractionError) as err:
+                list(reader.fetch(file, **{extract_constants.STREAM: True}))
+            self.assertIn("ExtractionError-104", str(err.exception))
+        finally:
+            os.remove(file)
+
+    def test_stix_stream_missing_file(self):
+        reader = STIXExtractor()
+        with self.assertRaises(ExtractionError) as err:
+            list(reader.fetch(self.filepath + "missing.json", **{extract_constants.STREAM: True}))
+        self.assertIn("ExtractionError-103", str(err.exception))
+
+    def test_stream_x509_handling(self):
+        file = self.filepath + "x509_test.json"
+        reader = STIXExtractor()
+        so = next(reader.fetch(file, **{extract_constants.STREAM: True}))
+        self.assertTrue(so.get(stix_constants.STIX_PROPERTY_X509_V3_EXTENSIONS) is None)
+        self.assertFalse(so.get(stix_constants.STIX_PROPERTY_EXTENSIONS) is None)
+
+    def test_trusted_extract(self):
+        file = self.filepath + "test-sample.json"
+        reader = STIXExtractor()
+        expected = [so.get(stix_constants.STIX_PROPERTY_ID) for so in reader.fetch(file)]
+        for stream in (False, True):
+            objects = list(reader.fetch(file, **{extract_constants.TRUSTED: True,
+                                                 extract_constants.STREAM: stream}))
+            self.assertTrue(all(type(so) is dict for so in objects))
+            self.assertEqual(
+                [so.get(stix_constants.STIX_PROPERTY_ID) for so in objects], expected)
+
+    def test_trusted_x509_handling(self):
+        file = self.filepath + "x509_test.json"
+        reader = STIXExtractor()
+        so = next(reader.fetch(file, **{extract_constants.TRUSTED: True}))
+        self.assertTrue(so.get(stix_constants.STIX_PROPERTY_X509_V3_EXTENSIONS) is None)
+        self.assertFalse(so.get(stix_constants.STIX_PROPERTY_EXTENSIONS) is None)
+
+    def test_trusted_created_time(self):
+        file = self.filepath + "missing_created.json"
+        reader = STIXExtractor()
+        so = next(reader.fetch(file, **{extract_constants.TRUSTED: True}))
+        timestamp = so.get(stix_constants.STIX_PROPERTY_CREATED)
+        self.assertTrue(parse_into_datetime(timestamp)
+                        == parse_into_datetime(extract_constants.BASE_TIME))
+
+    def test_trusted_default_values(self):
+        file = self.filepath + "missing_created.json"
+        reader = STIXExtractor()
+        expected = next(reader.fetch(file))
+        so = next(reader.fetch(file, **{extract_constants.TRUSTED: True}))
+        self.assertEqual(so.get("revoked"), expected.get("revoked"))
+        self.assertEqual(so.get("spec_version"), expected.get("spec_version"))
+
+    def test_trusted_sampled_validation(self):
+        file = self.filepath + "trusted_invalid.json"
+        with open(file, "w", encoding="utf-8") as f:
+            f.write('{"type": "bundle", "id": "bundle--1", "objects": ['
+                    '{"type": "attack-pattern", "id": "attack-pattern--1"}]}')
+        reader = STIXExtractor()
+        try:
+            so = next(reader.fetch(file, **{extract_constants.TRUSTED: True,
+                                            extract_constants.VALIDATE_EVERY: 0}))
+            self.assertEqual(so.get(stix_constants.STIX_PROPERTY_ID), "attack-pattern--1")
+            with self.assertRaises(STIXParsingError):
+                next(reader.fetch(file, **{extract_constants.TRUSTED: True,
+                                           extract_constants.VALIDATE_EVERY: 1}))
+        finally:
+            os.remove(file)
+
     def test_x509_handling(self):
         file = self.filepath + "x509_test.json"
         reader = STIXExtractor()
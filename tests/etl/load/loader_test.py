@@ -0,0 +1,188 @@
+import json
+import os
+import tempfile
+import threading
+import unittest
+from unittest.mock import patch
+
+from typedb.driver import TypeDBDriverException
+
+from satrap.etl.exceptions import LoadingError
+from satrap.etl.load.loader import TypeDBLoader, AdaptiveBatchSize
+from satrap.etl.load.journal import LoadJournal
+import satrap.etl.load.load_constants as load_cts
+from satrap.datamanagement.typedb.dataobjects import InsertQuery, Entity
+from satrap.datamanagement.typedb.typeql_builder import TypeQLBuilder
+
+
+def create_query(name: str, match: bool = False) -> InsertQuery:
+    query = InsertQuery()
+    if match:
+        query.add_to_match_clause(Entity(typedb_type="identity"))
+    query.add_to_insert_clause(Entity(typedb_type=name))
+    return query
+
+
+class TestTypeDBLoader(unittest.TestCase):
+
+    def setUp(self):
+        patcher = patch("satrap.etl.load.loader.TypeDBBatchInsertHandler")
+        handler = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.inserter = handler.return_value.__enter__.return_value
+        self.inserted = []
+        self.lock = threading.Lock()
+
+        def insert(queries, **kwargs):
+            with self.lock:
+                self.inserted.append(list(queries))
+        self.inserter.try_insert.side_effect = insert
+        self.dead_letter_file = os.path.join(tempfile.mkdtemp(), "failed_queries.jsonl")
+
+    def test_parallel_load(self):
+        entities = [create_query(f"e{i}") for i in range(20)]
+        relations = [create_query(f"r{i}", match=True) for i in range(4)]
+        expected = [TypeQLBuilder.build_insert_query(q) for q in entities + relations]
+
+        loader = TypeDBLoader("localhost:1729", "test", batch_size=2, parallelism=4,
+                              adaptive=False, pack_size=1)
+        loader.load(entities + relations)
+
+        self.assertEqual(len(self.inserted), 12)
+        self.assertCountEqual(sum(self.inserted[:10], []), expected[:20])
+        # batches with match clauses are inserted after all the entities, in order
+        self.assertEqual(sum(self.inserted[10:], []), expected[20:])
+
+    def test_failed_batch_bisected(self):
+        queries = [create_query(f"e{i}") for i in range(8)]
+        bad_query = TypeQLBuilder.build_insert_query(queries[5])
+        error = LoadingError("Invalid query", bad_query, 1)
+        self.inserter.try_insert.side_effect = \
+            lambda batch, **kwargs: error if bad_query in batch else None
+
+        loader = TypeDBLoader("localhost:1729", "test", batch_size=8, adaptive=False,
+                              dead_letter_file=self.dead_letter_file)
+        loader.load(queries)
+
+        # 1 failed batch and 2 transactions per bisection level
+        self.assertEqual(self.inserter.try_insert.call_count, 7)
+        with open(self.dead_letter_file, encoding="utf-8") as f:
+            records = [json.loads(line) for line in f]
+        self.assertEqual([r["query"] for r in records], [bad_query])
+        os.remove(self.dead_letter_file)
+
+    def test_failed_pack_split(self):
+        queries = [create_query(f"r{i}", match=True) for i in range(4)]
+        expected = [TypeQLBuilder.build_insert_query(q) for q in queries]
+        # the merged query fails, as one of its matched instances is missing
+        self.inserter.try_insert.side_effect = lambda batch, require_match=False, **kwargs: (
+            LoadingError("No match", batch[0], len(batch)) if require_match else
+            self.inserted.append(list(batch))
+        )
+
+        loader = TypeDBLoader("localhost:1729", "test", batch_size=4, adaptive=False,
+                              pack_size=4, dead_letter_file=self.dead_letter_file)
+        loader.load(queries)
+
+        self.assertEqual(self.inserted, [expected])
+        self.assertFalse(os.path.exists(self.dead_letter_file))
+
+    def test_adaptive_batch_size_per_phase(self):
+        loader = TypeDBLoader("localhost:1729", "test", batch_size=10, adaptive=True)
+        loader.load([create_query(f"e{i}") for i in range(100)],
+                    **{load_cts.PHASE: load_cts.PHASE_ENTITIES})
+        # fast commits increase the batch size
+        self.assertEqual([len(b) for b in self.inserted[:3]], [10, 11, 12])
+        self.assertEqual(loader.get_batch_size(load_cts.PHASE_SROS).size, 10)
+
+    def test_resume_load(self):
+        folder = tempfile.mkdtemp()
+        source = os.path.join(folder, "bundle.json")
+        with open(source, "w", encoding="utf-8") as f:
+            f.write("{}")
+        journal_file = os.path.join(folder, "journal.jsonl")
+        queries = [create_query(f"e{i}") for i in range(10)]
+        expected = [TypeQLBuilder.build_insert_query(q) for q in queries]
+
+        # interrupted after the second batch
+        def insert(batch, **kwargs):
+            if len(self.inserted) == 2:
+                raise KeyboardInterrupt
+            self.inserted.append(list(batch))
+        self.inserter.try_insert.side_effect = insert
+        with LoadJournal(journal_file, source) as journal:
+            loader = TypeDBLoader("localhost:1729", "test", batch_size=3, adaptive=False,
+                                  journal=journal)
+            with self.assertRaises(KeyboardInterrupt):
+                loader.load(queries, **{load_cts.PHASE: load_cts.PHASE_ENTITIES})
+
+        self.inserted.clear()
+        self.inserter.try_insert.side_effect = lambda batch, **kwargs: self.inserted.append(batch)
+        with LoadJournal(journal_file, source, resume=True) as journal:
+            self.assertTrue(journal.is_committed(load_cts.PHASE_ENTITIES, 5))
+            loader = TypeDBLoader("localhost:1729", "test", batch_size=3, adaptive=False,
+                                  journal=journal)
+            loader.load(queries, **{load_cts.PHASE: load_cts.PHASE_ENTITIES})
+        self.assertEqual(sum(self.inserted, []), expected[6:])
+
+        # a modified data source is loaded from the start
+        with open(source, "w", encoding="utf-8") as f:
+            f.write('{"objects": []}')
+        with LoadJournal(journal_file, source, resume=True) as journal:
+            self.assertFalse(journal.is_committed(load_cts.PHASE_ENTITIES, 0))
+
+
+    def test_journal_committed_only(self):
+        folder = tempfile.mkdtemp()
+        source = os.path.join(folder, "bundle.json")
+        with open(source, "w", encoding="utf-8") as f:
+            f.write("{}")
+        queries = [create_query(f"r{i}", match=True) for i in range(6)]
+        bad_query = TypeQLBuilder.build_insert_query(queries[4])
+        error = LoadingError("Invalid query", bad_query, 1)
+
+        def insert(batch, require_match=False, **kwargs):
+            # merged queries fail, as one of the queries they merge fails
+            if require_match or bad_query in batch:
+                return error
+            return None
+        self.inserter.try_insert.side_effect = insert
+        with LoadJournal(os.path.join(folder, "journal.jsonl"), source) as journal:
+            loader = TypeDBLoader("localhost:1729", "test", batch_size=6, adaptive=False,
+                                  journal=journal, pack_size=3,
+                                  dead_letter_file=self.dead_letter_file)
+            loader.load(queries, **{load_cts.PHASE: load_cts.PHASE_SROS})
+            # the rejected query is not recorded as committed
+            self.assertEqual(
+                [journal.is_committed(load_cts.PHASE_SROS, i) for i in range(6)],
+                [True, True, True, True, False, True]
+            )
+
+            # a lost connection stops the load, nothing is recorded
+            self.inserter.try_insert.side_effect = TypeDBDriverException(
+                "[CXN02] Connection Error: Unable to connect to TypeDB server."
+            )
+            with self.assertRaises(TypeDBDriverException):
+                loader.load(queries, **{load_cts.PHASE: load_cts.PHASE_EMBEDDED})
+            self.assertFalse(journal.is_committed(load_cts.PHASE_EMBEDDED, 0))
+        os.remove(self.dead_letter_file)
+
+
+class TestAdaptiveBatchSize(unittest.TestCase):
+
+    def test_aimd(self):
+        batch_size = AdaptiveBatchSize(100, maximum=120, target_latency=1)
+        batch_size.update(0.5, True)
+        self.assertEqual(batch_size.size, 110)
+        batch_size.update(0.5, True)
+        batch_size.update(0.5, True)
+        self.assertEqual(batch_size.size, 120)
+        batch_size.update(2, True)
+        self.assertEqual(batch_size.size, 60)
+        batch_size.update(0.5, False)
+        self.assertEqual(batch_size.size, 30)
+
+    def test_not_adaptive(self):
+        batch_size = AdaptiveBatchSize(100, adaptive=False)
+        batch_size.update(10, False)
+        self.assertEqual(batch_size.size, 100)
@@ -0,0 +1,103 @@
+import unittest
+import os
+
+from satrap.etl.etlorchestrator import ETLOrchestrator
+from satrap.datamanagement.typedb import typedbmanager as TypeDBMgr
+from satrap.etl.extract.extract_constants import STIX_READER
+import tests.etl.load as test_utils
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), "..", "..", "data")
+OLD_BUNDLE = os.path.join(DATA_DIR, "sync-old.json")
+NEW_BUNDLE = os.path.join(DATA_DIR, "sync-new.json")
+MALWARE = "malware--0a3ead4e-6d47-4ccb-854c-a6a4f9d96b22"
+
+
+def dump(server: str, db: str) -> tuple:
+    """Returns the STIX objects stored in a database with their type and
+    attributes, the relations between them and their components.
+
+    :param server: The address of the TypeDB server
+    :type server: str
+    :param db: The name of the database
+    :type db: str
+
+    :return: The objects, relations and components, comparable between
+        databases
+    :rtype: tuple
+    """
+    objects = {}
+    for answer in TypeDBMgr.fetch_query(
+        server, db, "match $x has stix-id $id; fetch $id; $x: attribute;"
+    ):
+        objects[answer["id"]["value"]] = (
+            answer["x"]["type"]["label"],
+            sorted((a["type"]["label"], str(a["value"])) for a in answer["x"]["attribute"])
+        )
+
+    relations = sorted({
+        (answer.get("id1").as_attribute().get_value(),
+         answer.get("id2").as_attribute().get_value(),
+         answer.get("t").get_label().name)
+        for answer in TypeDBMgr.get_query(
+            server, db,
+            "match $x has stix-id $id1; $y has stix-id $id2; "
+            "$r ($x, $y) isa $t; get $id1, $id2, $t;"
+        )
+    })
+
+    components = sorted(
+        (answer["id"]["value"], answer["c"]["type"]["label"],
+         sorted((a["type"]["label"], str(a["value"])) for a in answer["c"]["attribute"]))
+        for answer in TypeDBMgr.fetch_query(
+            server, db,
+            "match $x has stix-id $id; $r ($x, $c) isa relation; "
+            "not { $c has stix-id $cid; }; fetch $id; $c: attribute;"
+        )
+    )
+    return objects, relations, components
+
+
+class TestSync(unittest.TestCase):
+    """
+    Test cases for the synchronization of a database between two releases
+    of a STIX bundle, compared with a fresh load of the new release.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = test_utils.SERVER
+        cls.db = test_utils.TEST_DB
+        cls.fresh_db = f"{test_utils.TEST_DB}-fresh"
+        TypeDBMgr.create_database(cls.server, cls.db, reset=True)
+        TypeDBMgr.create_database(cls.server, cls.fresh_db, reset=True)
+
+    def setUp(self):
+        self.orchestrator = ETLOrchestrator(STIX_READER)
+
+    @classmethod
+    def tearDownClass(cls):
+        TypeDBMgr.delete_database(cls.server, cls.fresh_db)
+
+    def test_sync(self):
+        """
+        Verifies that a database synchronized to a new release, where a
+        malware became a family, references were removed from the malware
+        and an attack pattern and an SRO was modified, is the same as the
+        database of a fresh load of the new release.
+        """
+        self.orchestrator.transform_load(OLD_BUNDLE, self.server, self.db)
+        self.assertTrue(test_utils.is_of_type({"id": MALWARE}, "malware-instance"))
+
+        self.orchestrator.sync(OLD_BUNDLE, NEW_BUNDLE, self.server, self.db)
+        self.orchestrator.transform_load(NEW_BUNDLE, self.server, self.fresh_db)
+
+        self.assertTrue(test_utils.is_of_type({"id": MALWARE}, "malware-family"))
+        self.assertEqual(dump(self.server, self.db), dump(self.server, self.fresh_db))
+        self.assertEqual(
+            TypeDBMgr.count_data_instances(self.server, self.db),
+            TypeDBMgr.count_data_instances(self.server, self.fresh_db)
+        )
+
+
+if __name__ == '__main__':
+    unittest.main()
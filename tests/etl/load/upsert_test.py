@@ -0,0 +1,280 @@
+import json
+import os
+import tempfile
+import unittest
+from datetime import datetime
+from unittest.mock import patch
+
+from satrap.etl.etlorchestrator import ETLOrchestrator
+from satrap.etl.extract.extract_constants import STIX_READER
+from satrap.etl.load.upsert import Upserter, get_version
+from satrap.datamanagement.typedb.dataobjects import Entity, InsertQuery
+from satrap.datamanagement.typedb.typeql_builder import TypeQLBuilder
+
+COURSE_OF_ACTION = "course-of-action--21da4fd4-27ad-4e9c-b93d-0b9b14d02c96"
+ATTACK_PATTERN = "attack-pattern--43c9bc06-715b-42db-972f-52d25c09a20c"
+RELATIONSHIP = "relationship--00038d0e-7fc7-41c3-9055-edb4d87ea912"
+MALWARE = "malware--0a3ead4e-6d47-4ccb-854c-a6a4f9d96b22"
+IDENTITY = "identity--c78cb6e5-0c4b-4611-8297-d1b8b55e40b5"
+MARKING = "marking-definition--613f2e26-407d-48c7-9eca-b8e91df99dc9"
+ATTACK_PATTERN_SYNC = "attack-pattern--7e33a43e-e34b-40ec-89da-36c9bb2cacd5"
+
+
+class TestUpserter(unittest.TestCase):
+
+    def setUp(self):
+        self.file = os.path.join(os.path.dirname(__file__), "..", "..", "data", "test-sample.json")
+        self.orchestrator = ETLOrchestrator(STIX_READER)
+        patcher = patch("satrap.etl.load.upsert.typedbmanager.get_stix_versions")
+        self.get_stix_versions = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.get_stix_versions.return_value = {
+            COURSE_OF_ACTION: ("2019-06-06T20:52:59.206", "course-of-action"),
+            ATTACK_PATTERN: ("2020-01-01T00:00:00.000", "attack-pattern"),
+            RELATIONSHIP: ("2000-01-01T00:00:00.000", "uses")
+        }
+        patcher = patch("satrap.etl.load.upsert.TypeDBBatchInsertHandler")
+        handler = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.inserter = handler.return_value
+        self.deleted = []
+        self.inserter.delete.side_effect = lambda queries: self.deleted.append(queries) or True
+
+    def test_get_version(self):
+        self.assertEqual(get_version("2021-04-27T01:56:35.81Z"), "2021-04-27T01:56:35.810")
+        self.assertEqual(get_version("2021-04-27T01:56:35.8101Z"), "2021-04-27T01:56:35.810")
+        self.assertEqual(get_version("2021-04-27T01:56:35"), "2021-04-27T01:56:35.000")
+        self.assertEqual(
+            get_version(datetime(2021, 4, 27, 1, 56, 35, 810999)), "2021-04-27T01:56:35.810"
+        )
+        self.assertIsNone(get_version(None))
+
+    def test_upsert(self):
+        full = self.orchestrator.transform(self.file, trusted=True)
+        with Upserter("localhost:1729", "test") as upserter:
+            entities, sros, embedded = self.orchestrator.transform(
+                self.file, trusted=True, upserter=upserter
+            )
+        self.assertEqual(upserter.unchanged, 1)
+        self.assertEqual(len(upserter.replaced), 2)
+        self.assertEqual(upserter.new + 3, sum(1 for q in full[0] + full[1] if q))
+        self.assertEqual(len(entities), len(full[0]) - 1)
+
+        # the previous versions are deleted by the queries replacing them,
+        # not while transforming
+        self.assertFalse(self.deleted)
+        attack_pattern = [
+            delete for q in entities + embedded if q for delete in q.get_delete_queries()
+        ]
+        relationship = [delete for q in sros if q for delete in q.get_delete_queries()]
+        # matched by stix-id only, whatever the stored type
+        self.assertIn(
+            f"match $object has stix-id \"{ATTACK_PATTERN}\"; "
+            "$relation (used-sdo: $object, kill-chain-step: $component) "
+            "isa kill-chain-ttp-association; delete $relation isa kill-chain-ttp-association; "
+            "$component isa thing;",
+            attack_pattern
+        )
+        self.assertTrue(any("delete $object has $attribute;" in d for d in attack_pattern))
+        self.assertEqual(
+            f"match $object has stix-id \"{RELATIONSHIP}\"; delete $object isa thing;",
+            relationship[-1]
+        )
+        # the attributes are replaced with the update
+        update_query = next(q for q in entities if q.get_match_clause())
+        self.assertTrue(any("delete $object has $attribute;" in d
+                            for d in update_query.get_delete_queries()))
+
+        # the modified entity is updated in place
+        update = [
+            TypeQLBuilder.build_insert_query(q) for q in entities if q.get_match_clause()
+        ]
+        self.assertEqual(len(update), 1)
+        self.assertTrue(update[0].startswith(
+            f"match\n$v0 isa attack-pattern, has stix-id \"{ATTACK_PATTERN}\";\n"
+            "insert\n$v0 has "
+        ))
+        self.assertIn("has modified 2023-10-01T02:28:45.147", update[0])
+
+    def test_sync(self):
+        with open(self.file, encoding="utf-8") as f:
+            bundle = json.load(f)
+        removed = "relationship--0000aaaa-7fc7-41c3-9055-edb4d87ea912"
+        old_bundle = {"type": "bundle", "objects": [
+            {"type": "course-of-action", "id": COURSE_OF_ACTION,
+             "modified": "2019-06-06T20:52:59.206Z"},
+            {"type": "attack-pattern", "id": ATTACK_PATTERN,
+             "modified": "2020-01-01T00:00:00.000Z"},
+            {"type": "identity", "id": "identity--0000aaaa-ec50-4f95-86ce-f1fd179a68fe",
+             "identity_class": "organization"},
+            {"type": "relationship", "id": removed, "modified": "2020-01-01T00:00:00.000Z"},
+        ]}
+        old_file = os.path.join(tempfile.mkdtemp(), "old.json")
+        with open(old_file, "w", encoding="utf-8") as f:
+            json.dump(old_bundle, f)
+
+        inserted, replaced = [], []
+
+        def insert(queries, deletes=None, **kwargs):
+            inserted.extend(queries)
+            replaced.extend(query for query in queries if query in (deletes or {}))
+        with patch("satrap.etl.load.loader.TypeDBBatchInsertHandler") as handler, \
+                patch("satrap.settings.LOAD_PACK_SIZE", 1):
+            inserter = handler.return_value.__enter__.return_value
+            inserter.try_insert.side_effect = insert
+            self.orchestrator.sync(old_file, self.file, "localhost:1729", "test", trusted=True)
+        os.remove(old_file)
+
+        self.get_stix_versions.assert_not_called()
+        # the unchanged object is not loaded
+        self.assertEqual(
+            len([q for q in inserted if "insert\n$v0 " in q]), len(bundle["objects"]) - 1
+        )
+        self.assertFalse([q for q in inserted if "$v0 isa course-of-action" in q])
+        # the modified object is replaced in the transactions loading it
+        self.assertTrue(replaced)
+        self.assertTrue(all(ATTACK_PATTERN in query for query in replaced))
+        # then the removed ones are deleted in one transaction, SROs first
+        self.assertEqual(len(self.deleted), 1)
+        self.assertIn(removed, self.deleted[0][2])
+        self.assertIn("identity--0000aaaa", self.deleted[0][-1])
+
+    def test_sync_type_change(self):
+        data = os.path.dirname(self.file)
+        inserted, carried = [], {}
+
+        def insert(queries, deletes=None, **kwargs):
+            inserted.extend(queries)
+            carried.update(deletes or {})
+        with patch("satrap.etl.load.loader.TypeDBBatchInsertHandler") as handler, \
+                patch("satrap.settings.LOAD_PACK_SIZE", 1):
+            inserter = handler.return_value.__enter__.return_value
+            inserter.try_insert.side_effect = insert
+            self.orchestrator.sync(os.path.join(data, "sync-old.json"),
+                                   os.path.join(data, "sync-new.json"),
+                                   "localhost:1729", "test", trusted=True)
+
+        # the identity and the marking are unchanged
+        self.assertFalse([q for q in inserted
+                          if q.startswith(("insert\n$v0 isa identity", "insert\n$v0 isa tlp-marking"))])
+        self.assertFalse(self.deleted)
+        # the malware instance became a family: removed and inserted again
+        malware = next(q for q in inserted if "$v0 isa malware-family" in q)
+        self.assertTrue(malware.startswith("insert"))
+        self.assertEqual(list(carried[malware]), Upserter.build_removal_queries(MALWARE))
+        # the attack pattern is updated in place, and the relation to its
+        # removed creator is deleted with the insertion of its marking
+        attack_pattern = next(q for q in inserted if "$v0 isa attack-pattern" in q)
+        self.assertTrue(attack_pattern.startswith("match"))
+        marking = next(q for q in inserted
+                       if ATTACK_PATTERN_SYNC in q and "isa object-marking" in q)
+        self.assertIn(
+            f"match $object has stix-id \"{ATTACK_PATTERN_SYNC}\"; "
+            "$relation (object-created: $object) isa created-by-ref; "
+            "delete $relation isa created-by-ref;",
+            carried[marking]
+        )
+        self.assertFalse([q for q in inserted
+                          if ATTACK_PATTERN_SYNC in q and "isa created-by-ref" in q])
+        # the modified SRO is deleted with its embedded relations
+        sro = next(q for q in inserted if "isa uses" in q)
+        self.assertTrue(carried[sro][-1].endswith("delete $object isa thing;"))
+
+    def write_bundle(self, objects: list[dict]) -> str:
+        """Write a STIX bundle to a temporary file, removed after the test."""
+        path = os.path.join(tempfile.mkdtemp(), "bundle.json")
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"type": "bundle", "objects": objects}, f)
+        self.addCleanup(os.remove, path)
+        return path
+
+    def transform_malware(self, stored_type: str, **properties) -> tuple:
+        """Transform a new version of a stored malware with the upserter."""
+        malware = {
+            "type": "malware", "spec_version": "2.1", "id": MALWARE,
+            "created": "2020-01-01T00:00:00.000Z", "modified": "2024-01-01T00:00:00.000Z",
+            "name": "test", "is_family": True, **properties
+        }
+        self.get_stix_versions.return_value = {
+            MALWARE: ("2020-01-01T00:00:00.000", stored_type)
+        }
+        with Upserter("localhost:1729", "test") as upserter:
+            return self.orchestrator.transform(
+                self.write_bundle([malware]), trusted=True, upserter=upserter
+            )
+
+    def test_type_change(self):
+        # a malware instance that became a family: the stored entity is
+        # removed with all its relations, and inserted again
+        entities, _, embedded = self.transform_malware(
+            "malware-instance", created_by_ref=IDENTITY
+        )
+        self.assertEqual(len(entities), 1)
+        self.assertFalse(entities[0].get_match_clause())
+        self.assertTrue(TypeQLBuilder.build_insert_query(entities[0])
+                        .startswith("insert\n$v0 isa malware-family, "))
+        self.assertEqual(list(entities[0].get_delete_queries()),
+                         Upserter.build_removal_queries(MALWARE))
+        self.assertFalse(embedded[0].get_delete_queries())
+
+        # with the same type, it is updated in place
+        entities, _, _ = self.transform_malware("malware-family", created_by_ref=IDENTITY)
+        self.assertTrue(TypeQLBuilder.build_insert_query(entities[0]).startswith(
+            f"match\n$v0 isa malware-family, has stix-id \"{MALWARE}\";\ninsert\n$v0 has "
+        ))
+
+        # without any attribute to update, it is inserted again too
+        entity = Entity("v0", "malware-family")
+        entity.add_attribute("stix-id", f"\"{MALWARE}\"")
+        query = InsertQuery()
+        query.add_to_insert_clause(entity)
+        self.assertIsNone(Upserter.build_update_query(entity, query))
+
+    def test_removed_reference(self):
+        match = f"match $object has stix-id \"{MALWARE}\";"
+        created_by = (f"{match} $relation (object-created: $object) isa created-by-ref; "
+                      "delete $relation isa created-by-ref;")
+        marking = (f"{match} $relation (object-marked: $object) isa object-marking; "
+                   "delete $relation isa object-marking;")
+
+        # the new version has a reference: the previous relations of every
+        # reference property are deleted with the insertion of the new ones
+        entities, _, embedded = self.transform_malware(
+            "malware-family", created_by_ref=IDENTITY
+        )
+        self.assertIn(created_by, embedded[0].get_delete_queries())
+        self.assertIn(marking, embedded[0].get_delete_queries())
+        self.assertNotIn(created_by, entities[0].get_delete_queries())
+
+        # the new version has no reference anymore: the previous relations
+        # are deleted with the update of the entity
+        entities, _, embedded = self.transform_malware("malware-family")
+        self.assertFalse(embedded)
+        self.assertIn(created_by, entities[0].get_delete_queries())
+        self.assertIn(marking, entities[0].get_delete_queries())
+        self.assertTrue(all(d.startswith(match) for d in entities[0].get_delete_queries()))
+
+    def test_delete_removed(self):
+        removed = [f"identity--0000000{i}-ec50-4f95-86ce-f1fd179a68fe" for i in range(5)]
+        failing = removed[3]
+        self.inserter.delete.side_effect = lambda queries: (
+            self.deleted.append(queries) or not any(failing in q for q in queries)
+        )
+        with Upserter("localhost:1729", "test", dict.fromkeys(removed)) as upserter:
+            self.assertEqual(upserter.delete_removed(batch_size=2), 4)
+        # 3 batches, the failing one deleted again object by object
+        self.assertEqual([len(queries) // 5 for queries in self.deleted], [2, 2, 1, 1, 1])
+
+        # every relation of a removed object is deleted, SROs and the
+        # embedded relations of other objects included
+        queries = Upserter.build_removal_queries(removed[0])
+        self.assertIn("$relation ($object) isa relation; delete $relation isa relation;",
+                      queries[3])
+        self.assertNotIn("not {", queries[3])
+        # and the embedded relations of the SROs, which would lose a role player
+        self.assertIn("$sro ($object) isa relation, has stix-id $sro-id; "
+                      "$relation ($sro) isa relation;", queries[2])
+
+
+if __name__ == "__main__":
+    unittest.main()
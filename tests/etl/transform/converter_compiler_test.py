@@ -0,0 +1,76 @@
+import os
+import unittest
+from unittest.mock import patch
+
+from satrap.datamanagement.typedb.typeql_builder import TypeQLBuilder
+from satrap.etl.etlorchestrator import ETLOrchestrator
+from satrap.etl.extract.extract_constants import STIX_READER
+from satrap.etl.transform.converter_compiler import COMPILED_FILENAME, ConverterCompiler
+from satrap.etl.transform.stix_to_typedb_mapper import STIXtoTypeDBMapper
+from tests.etl.transform import stixobject_converter_test, transformer_test
+
+
+class TestConverterCompiler(unittest.TestCase):
+
+    def setUp(self):
+        STIXtoTypeDBMapper.get_data()
+
+    def test_generate(self):
+        converters = ConverterCompiler.load()
+        self.assertIn("attack-pattern", converters)
+        self.assertIn("relationship", converters)
+        self.assertEqual(converters["attack-pattern"].__code__.co_filename, COMPILED_FILENAME)
+
+        source = ConverterCompiler.generate()
+        # primitive values are converted inline, the others by their conversion
+        self.assertIn("'name': ('name', 'string', _convert_string)", source)
+        self.assertIn("ValueConverter.convert('list:composite:external-reference', ", source)
+
+    def test_reloaded_mapping(self):
+        ConverterCompiler.get_converter("attack-pattern")
+        with patch.object(ConverterCompiler, "load", wraps=ConverterCompiler.load) as load:
+            ConverterCompiler.get_converter("attack-pattern")
+            load.assert_not_called()
+            # converters are generated again for a new mapping
+            with patch.object(STIXtoTypeDBMapper, "stix_objects",
+                              dict(STIXtoTypeDBMapper.stix_objects)):
+                self.assertIsNotNone(ConverterCompiler.get_converter("attack-pattern"))
+            load.assert_called_once()
+
+    def test_same_output(self):
+        orchestrator = ETLOrchestrator(STIX_READER)
+        file = os.path.join(os.path.dirname(__file__), "..", "..", "data", "test-sample.json")
+        transformed = {}
+        for compiled in (False, True):
+            with patch("satrap.settings.TRANSFORM_COMPILED_CONVERTERS", compiled):
+                transformed[compiled] = [
+                    TypeQLBuilder.build_insert_query(query)
+                    for phase in orchestrator.transform(file, trusted=True) for query in phase
+                ]
+        self.assertTrue(transformed[True])
+        self.assertEqual(transformed[True], transformed[False])
+
+
+class CompiledConverters:
+    """Runs the tests of the transformation with the generated converters."""
+
+    def setUp(self):
+        patcher = patch("satrap.settings.TRANSFORM_COMPILED_CONVERTERS", True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        super().setUp()
+
+
+class TestSTIXObjectCompiled(CompiledConverters, stixobject_converter_test.TestSTIXObject):
+
+    @unittest.skip("the properties of the objects are not converted with templates")
+    def test_shape_template(self):
+        pass
+
+
+class TestTypesCompiled(CompiledConverters, transformer_test.TestTypes):
+    pass
+
+
+if __name__ == "__main__":
+    unittest.main()
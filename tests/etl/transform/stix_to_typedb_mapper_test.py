@@ -1,4 +1,7 @@
+import os
+import tempfile
 import unittest
+from unittest.mock import patch
 
 from satrap.etl.exceptions import MappingException
 import satrap.etl.stix_constants
@@ -15,6 +18,37 @@ class TestAttributeMapper(unittest.TestCase):
     def test_validate(self):
         STIXtoTypeDBMapper.validate()
 
+    def test_get_data_compiled_once(self):
+        STIXtoTypeDBMapper.get_data(validate=True)
+        with patch("satrap.commons.file_utils.read_json") as read_json:
+            STIXtoTypeDBMapper.get_data(validate=True)
+            read_json.assert_not_called()
+
+    def test_mapping_snapshot(self):
+        path = os.path.join(tempfile.mkdtemp(), "snapshot.pickle")
+        mappings = STIXtoTypeDBMapper.read_mappings()
+        STIXtoTypeDBMapper.save_snapshot(mappings, path)
+        self.assertEqual(STIXtoTypeDBMapper.load_snapshot(path), mappings)
+
+        # a source file whose modification time or content changed
+        # invalidates the snapshot
+        for changed in ((0, None), (None, "")):
+            signatures = STIXtoTypeDBMapper.get_file_signatures()
+            mtime, digest = signatures[constants.FILE_SDO]
+            signatures[constants.FILE_SDO] = (
+                mtime if changed[0] is None else changed[0],
+                digest if changed[1] is None else changed[1]
+            )
+            with patch.object(STIXtoTypeDBMapper, "get_file_signatures",
+                              return_value=signatures):
+                STIXtoTypeDBMapper.save_snapshot(mappings, path)
+            self.assertIsNone(STIXtoTypeDBMapper.load_snapshot(path))
+        os.remove(path)
+
+    def test_mapping_immutable(self):
+        with self.assertRaises(TypeError):
+            STIXtoTypeDBMapper.stix_objects["attack-pattern"] = {}
+
     def test_get_class(self):
         get_class = STIXtoTypeDBMapper.get_class
         self.assertEqual(
@@ -120,6 +154,13 @@ class TestAttributeMapper(unittest.TestCase):
             ("stix-id", typedb_constants.STRING),
             get_attr("malware", "id")
         )
+        self.assertEqual(
+            ("stix-id", typedb_constants.STRING),
+            get_attr("x-custom-object", "id")
+        )
+        self.assertEqual((None, None), get_attr("malware", "x_custom"))
+        with self.assertRaises(MappingException):
+            get_attr("x-custom-object", "x_custom")
 
     def test_get_composite_name(self):
         get_comp_name = STIXtoTypeDBMapper.get_composite_name
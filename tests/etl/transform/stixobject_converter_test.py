@@ -6,6 +6,8 @@ from satrap.etl.transform.stixobject_converter import (
     STIXDomainObjectConverter, STIXObjectConverter,
     STIXRelationshipObjectConverter
 )
+from satrap.etl.transform.shape_template import ShapeTemplate
+from satrap.etl.transform.valueconverter import convert_string
 from satrap.datamanagement.typedb.typedb_constants import to_typedb_string
 import satrap.etl.transform.stix_typeql_constants as constants
 
@@ -202,6 +204,36 @@ class TestSTIXObject(unittest.TestCase):
         self.assertIsNone(third)
         self.assertEqual(expect, entity)
 
+    def test_shape_template(self):
+        ShapeTemplate.templates.clear()
+        first = {"id": "attack-pattern--0001", "type": "attack-pattern",
+                 "name": "first", "x_custom": "ignored"}
+        second = {"type": "attack-pattern", "name": "second",
+                  "id": "attack-pattern--0002", "x_custom": 1}
+        bundles = [STIXObjectConverter.create(obj).build_typeql_bundle()
+                   for obj in (first, second)]
+
+        # objects of the same shape share a template, whatever the order
+        # of their properties
+        self.assertEqual(len(ShapeTemplate.templates), 1)
+        template = ShapeTemplate.get("attack-pattern", second)
+        self.assertEqual(template.steps["name"].attribute_name, "name")
+        self.assertIs(template.steps["name"].conversion, convert_string)
+        self.assertIsNone(template.steps["x_custom"].attribute_name)
+
+        entity = bundles[1].order_bundle()[0].get_insert_clause()[0]
+        self.assertEqual(entity.get_attributes()["name"], (to_typedb_string("second"),))
+        self.assertNotIn("x_custom", entity.get_attributes())
+
+        # recompiling the mapping invalidates the templates
+        mapping = STIXtoTypeDBMapper.stix_objects
+        try:
+            STIXtoTypeDBMapper.stix_objects = dict(mapping)
+            self.assertIsNot(ShapeTemplate.get("attack-pattern", first), template)
+            self.assertEqual(len(ShapeTemplate.templates), 1)
+        finally:
+            STIXtoTypeDBMapper.stix_objects = mapping
+
     def test_sighting(self):
         test = {
             "type": "sighting",
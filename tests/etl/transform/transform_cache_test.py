@@ -0,0 +1,91 @@
+import os
+import shutil
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from satrap.etl.etlorchestrator import ETLOrchestrator
+from satrap.etl.extract.extract_constants import STIX_READER
+from satrap.datamanagement.typedb.dataobjects import Relation
+from satrap.etl.transform.transform_cache import TransformCache, decode_queries, encode_queries
+
+
+class TestTransformCache(unittest.TestCase):
+
+    def setUp(self):
+        self.file = os.path.join(os.path.dirname(__file__), "..", "..", "data", "test-sample.json")
+        self.orchestrator = ETLOrchestrator(STIX_READER)
+        self.folder = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.folder)
+        self.path = os.path.join(self.folder, "cache.sqlite")
+
+    def transform(self, cache, workers=1):
+        res = self.orchestrator.transform(self.file, trusted=True, workers=workers, cache=cache)
+        return [[str(q) for q in queries] for queries in res]
+
+    def test_cached_transformation(self):
+        expected = self.transform(None)
+        with TransformCache(self.path, 2**20) as cache:
+            self.assertEqual(self.transform(cache), expected)
+            self.assertEqual(cache.hits, 0)
+        with TransformCache(self.path, 2**20) as cache, \
+                patch("satrap.etl.etlorchestrator.STIXtoTypeQLTransformer.transform") as transform:
+            self.assertEqual(self.transform(cache), expected)
+            transform.assert_not_called()
+            self.assertEqual(cache.misses, 0)
+
+        # parallel transformation, with a part of the objects cached
+        with TransformCache(self.path, 2**20) as cache, \
+                patch("satrap.settings.TRANSFORM_CHUNK_SIZE", 2):
+            cache.connection.execute("DELETE FROM transformed WHERE rowid % 2 = 0")
+            self.assertEqual(self.transform(cache, workers=2), expected)
+            self.assertTrue(cache.hits and cache.misses)
+
+        # the queries of another variant of the transformation are not reused
+        with TransformCache(self.path, 2**20, variant="stix2") as cache:
+            self.assertIsNone(cache.get({"id": "indicator--1", "modified": "2020"}))
+            cache.put({"id": "indicator--1", "modified": "2020"}, (None, None, None))
+            self.assertIsNotNone(cache.get({"id": "indicator--1", "modified": "2020"}))
+            self.assertIsNone(cache.get({"id": "indicator--1", "modified": "2021"}))
+            self.assertIsNone(cache.get({"id": "indicator--1", "name": "new"}))
+
+    def test_json_encoding(self):
+        queries = self.orchestrator.transform(self.file, trusted=True)
+        for transformed in queries:
+            decoded = decode_queries(encode_queries(transformed))
+            self.assertEqual([str(q) for q in decoded], [str(q) for q in transformed])
+            for query, original in zip(decoded, transformed):
+                if query is None:
+                    continue
+                self.assertEqual(query.get_delete_queries(), original.get_delete_queries())
+                for thing, expected in zip(query.get_insert_clause(), original.get_insert_clause()):
+                    self.assertIs(type(thing), type(expected))
+                    self.assertEqual(thing.get_attributes(), expected.get_attributes())
+                    if isinstance(thing, Relation):
+                        self.assertEqual(thing.get_roles(), expected.get_roles())
+
+        # the cache file only holds JSON
+        with TransformCache(self.path, 2**20) as cache:
+            cache.put({"id": "indicator--1", "modified": "2020"}, queries[0])
+            stored = cache.connection.execute("SELECT queries FROM transformed").fetchone()[0]
+            self.assertIsInstance(stored, str)
+            self.assertEqual(encode_queries(queries[0]), stored)
+        with self.assertRaises(ValueError):
+            decode_queries('[{"match": [["object", "v0", "thing", {}, null]], "insert": [], "delete": []}]')
+
+    def test_eviction(self):
+        with TransformCache(self.path, 2**20) as cache:
+            self.transform(cache)
+        with TransformCache(self.path, 2**20) as cache:
+            cache.put({"id": "indicator--1", "modified": "2020"}, (None, None, None))
+            size = cache.connection.execute("SELECT SUM(size) FROM transformed").fetchone()[0]
+            cache.max_size = size - 1
+        # the entries of the previous run are evicted first
+        with TransformCache(self.path, 2**20) as cache:
+            self.assertIsNotNone(cache.get({"id": "indicator--1", "modified": "2020"}))
+            count = cache.connection.execute("SELECT COUNT(*) FROM transformed").fetchone()[0]
+            self.assertGreater(count, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
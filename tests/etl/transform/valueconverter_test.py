@@ -150,10 +150,10 @@ class TestTypes(unittest.TestCase):
         self.assertEqual(expect_entity, entity)
         self.assertEqual(expect_relation, relation)
         self.assertEqual(
-            [entity.get_variable()],
+            (entity.get_variable(),),
             relation.get_roles()["referenced"]
         )
-        self.assertEqual(["var"], relation.get_roles()["referrer"])
+        self.assertEqual(("var",), relation.get_roles()["referrer"])
 
     def test_embedded_relation_created_by_ref(self):
         test = "identity--c78cb6e5-0c4b-4611-8297-d1b8b55e40b5"
@@ -209,8 +209,8 @@ class TestTypes(unittest.TestCase):
             var1 = var2
             var2 = temp
 
-        self.assertEqual([var1], insert.get_roles()["creator"])
-        self.assertEqual([var2], insert.get_roles()["object-created"])
+        self.assertEqual((var1,), insert.get_roles()["creator"])
+        self.assertEqual((var2,), insert.get_roles()["object-created"])
 
     def test_list_embedded_relations(self):
         test = [
@@ -302,10 +302,10 @@ class TestTypes(unittest.TestCase):
 
         self.assertEqual(entity, expect_entity)
         self.assertEqual(relation, expect_relation)
-        self.assertIn([entity.get_variable()],  relation.get_roles().values())
-        self.assertEqual([entity.get_variable()],
+        self.assertIn((entity.get_variable(),),  relation.get_roles().values())
+        self.assertEqual((entity.get_variable(),),
                          relation.get_roles()["hash"])
-        self.assertEqual(["test_var"], relation.get_roles()["resource"])
+        self.assertEqual(("test_var",), relation.get_roles()["resource"])
 
     @unittest.skip("Skipping test_pair_custom as custom hash algorithms are not allowed")
     def test_pair_custom(self):
@@ -334,10 +334,10 @@ class TestTypes(unittest.TestCase):
 
         self.assertEqual(entity, expect_entity)
         self.assertEqual(relation, expect_relation)
-        self.assertIn([entity.get_variable()],  relation.get_roles().values())
-        self.assertEqual([entity.get_variable()],
+        self.assertIn((entity.get_variable(),),  relation.get_roles().values())
+        self.assertEqual((entity.get_variable(),),
                          relation.get_roles()["hash"])
-        self.assertEqual(["test_var"], relation.get_roles()["resource"])
+        self.assertEqual(("test_var",), relation.get_roles()["resource"])
         self.assertEqual("", "")
 
     def test_dictionary_int(self):
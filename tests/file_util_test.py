@@ -93,6 +93,27 @@ class TestFileUtils(unittest.TestCase):
         os.remove(file_path)
         os.rmdir(new_dir)
 
+    def test_stream_json_array(self):
+        file_path = "./tests/data/test-sample.json"
+        expected = file_utils.read_json(file_path).get("objects")
+        # small chunks force values to be split across reads
+        streamed = list(file_utils.stream_json_array(file_path, "objects", chunk_size=7))
+        self.assertEqual(streamed, expected)
+
+    def test_stream_json_array_missing_key(self):
+        with self.assertRaises(KeyError):
+            list(file_utils.stream_json_array("./tests/data/test-sample.json", "missing"))
+
+    def test_disk_spill_queue(self):
+        items = [{"id": i, "values": list(range(i))} for i in range(100)]
+        with file_utils.DiskSpillQueue() as queue:
+            for item in items:
+                queue.put(item)
+            self.assertEqual(len(queue), len(items))
+            self.assertEqual(list(queue), items)
+            queue.put("last")
+            self.assertEqual(list(queue), items + ["last"])
+
     def tearDown(self):
         '''Remove the downloaded file if it exists
         '''
@@ -101,3 +122,4 @@ class TestFileUtils(unittest.TestCase):
 
 if __name__ == "__main__":
     unittest.main()
+
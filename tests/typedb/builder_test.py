@@ -6,7 +6,9 @@ path = os.path.join(os.path.dirname(__file__), "../..")
 parent_dir = os.path.abspath(path)
 sys.path.append(parent_dir)
 
-from satrap.datamanagement.typedb.dataobjects import Entity, Relation, VariableDealer
+from satrap.datamanagement.typedb.dataobjects import (
+    Entity, InsertQuery, Relation, VariableDealer
+)
 from satrap.datamanagement.typedb.typeql_builder import TypeQLBuilder
 import satrap.datamanagement.typedb.typedb_constants as typedb_constants
 
@@ -35,7 +37,7 @@ class TestObject(unittest.TestCase):
         expect += typedb_constants.OBJECT_ENDING
 
         self.assertEqual(
-            TypeQLBuilder.build_entity(e), 
+            TypeQLBuilder.build_entity(e),
             expect
         )
 
@@ -104,6 +106,23 @@ class TestObject(unittest.TestCase):
     def test_insert_query(self):
         self.assertEqual("", "")
 
+    def test_insert_query_bound_variable(self):
+        stored = Entity(variable="v0", typedb_type="attack-pattern")
+        stored.add_attribute("stix-id", "\"id\"")
+        update = Entity(variable="v0", typedb_type="attack-pattern")
+        update.add_attribute("name", "\"value\"")
+        update.add_attribute("alias", "\"other\"")
+        query = InsertQuery()
+        query.add_to_match_clause(stored)
+        query.add_to_insert_clause(update)
+
+        # the matched entity only gets the attributes
+        self.assertEqual(
+            TypeQLBuilder.build_insert_query(query),
+            "match\n$v0 isa attack-pattern, has stix-id \"id\";\n"
+            "insert\n$v0 has name \"value\", has alias \"other\";\n"
+        )
+
     def test_variable(self):
         expect = typedb_constants.VARIABLE_PREFIX + "var"
 
@@ -203,6 +222,17 @@ class TestObject(unittest.TestCase):
             [expect1, expect2]
         ) 
         
+    def test_roles_not_modified(self):
+        r = Relation(variable="v0", typedb_type="uses")
+        r.add_roleplayer("source", "v1")
+        r.add_roleplayer("target", "v2")
+        r.add_roleplayer("target", "v3")
+
+        typeql = TypeQLBuilder.build_relation(r)
+        self.assertEqual(typeql, "$v0 (target: $v2, target: $v3, source: $v1) isa uses;")
+        self.assertEqual(r.get_roles(), {"source": ("v1",), "target": ("v2", "v3")})
+        self.assertEqual(TypeQLBuilder.build_relation(r), typeql)
+
     def test_end(self):
         self.assertEqual(
             TypeQLBuilder.build_end(),
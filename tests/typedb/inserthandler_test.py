@@ -0,0 +1,115 @@
+import unittest
+from unittest.mock import patch
+
+from typedb.driver import TypeDBDriverException
+
+from satrap.datamanagement.typedb.inserthandler import TypeDBBatchInsertHandler
+
+
+class TestBatchInsertHandler(unittest.TestCase):
+
+    def setUp(self):
+        patcher = patch("satrap.datamanagement.typedb.inserthandler.TypeDB")
+        self.driver = patcher.start().core_driver.return_value
+        self.addCleanup(patcher.stop)
+
+    def test_session_reused(self):
+        with TypeDBBatchInsertHandler("localhost:1729", "test") as inserter:
+            for _ in range(5):
+                self.assertTrue(inserter.insert(["insert $x isa thing;"]))
+        self.driver.databases.contains.assert_called_once_with("test")
+        self.driver.session.assert_called_once()
+        self.driver.session.return_value.close.assert_called_once()
+
+    def test_session_reopened(self):
+        with TypeDBBatchInsertHandler("localhost:1729", "test") as inserter:
+            self.driver.session.return_value.is_open.return_value = False
+            inserter.insert(["insert $x isa thing;"])
+        self.assertEqual(self.driver.session.call_count, 2)
+
+    def test_insert_answers_not_streamed(self):
+        transaction = self.driver.session.return_value.transaction.return_value \
+            .__enter__.return_value
+        answers = iter([object(), object()])
+        transaction.query.insert.return_value = answers
+        with TypeDBBatchInsertHandler("localhost:1729", "test") as inserter:
+            inserter.insert(["insert $x isa thing;"])
+            self.assertEqual(len(list(answers)), 2)
+            transaction.query.insert.return_value = answers = iter([object(), object()])
+            with self.assertNoLogs(level="WARNING"):
+                inserter.insert(["match $y isa thing; insert $x isa thing;"])
+            # only the first answer of a query with a match clause is read
+            self.assertEqual(len(list(answers)), 1)
+            transaction.query.insert.return_value = iter([])
+            with self.assertLogs(level="WARNING"):
+                inserter.insert(["match $y isa thing; insert $x isa thing;"])
+            # unless the match clause is required
+            transaction.query.insert.return_value = iter([])
+            self.assertIsNotNone(inserter.try_insert(
+                ["match $y isa thing; insert $x isa thing;"], require_match=True
+            ))
+            transaction.commit.assert_called()
+            commits = transaction.commit.call_count
+            transaction.query.insert.return_value = iter([])
+            inserter.try_insert(["match $y isa thing; insert $x isa thing;"], require_match=True)
+            self.assertEqual(transaction.commit.call_count, commits)
+
+    def test_write_conflict_retried(self):
+        transaction = self.driver.session.return_value.transaction.return_value \
+            .__enter__.return_value
+        transaction.commit.side_effect = [
+            TypeDBDriverException(
+                "[TXN16] Invalid Transaction Operation: Transaction isolation violation."
+            ),
+            None
+        ]
+        with TypeDBBatchInsertHandler(
+            "localhost:1729", "test", conflict_retries=1, retry_backoff=0
+        ) as inserter:
+            self.assertTrue(inserter.insert(["insert $x isa thing;"]))
+            self.assertEqual(transaction.commit.call_count, 2)
+
+            # other errors are not retried, whatever their message
+            transaction.commit.side_effect = TypeDBDriverException(
+                "[THW01] Invalid Thing Write: conflict of attribute values."
+            )
+            self.assertFalse(inserter.insert(["insert $x isa thing;"]))
+        self.assertEqual(transaction.commit.call_count, 3)
+
+    def test_deletes_in_transaction(self):
+        transaction = self.driver.session.return_value.transaction.return_value \
+            .__enter__.return_value
+        calls = []
+        transaction.query.delete.side_effect = \
+            lambda query: calls.append(query) or transaction.query.delete.return_value
+        transaction.query.insert.side_effect = lambda query: calls.append(query) or iter([])
+        insert = "insert $x isa thing;"
+        delete = "match $x isa thing; delete $x isa thing;"
+        with TypeDBBatchInsertHandler("localhost:1729", "test") as inserter:
+            self.assertIsNone(inserter.try_insert(
+                ["insert $y isa thing;", insert], deletes={insert: (delete,)}
+            ))
+        self.assertEqual(calls, ["insert $y isa thing;", delete, insert])
+        transaction.commit.assert_called_once()
+
+    def test_driver_error_raised(self):
+        transaction = self.driver.session.return_value.transaction.return_value \
+            .__enter__.return_value
+        transaction.query.insert.side_effect = TypeDBDriverException(
+            "[CXN02] Connection Error: Unable to connect to TypeDB server."
+        )
+        with TypeDBBatchInsertHandler("localhost:1729", "test") as inserter:
+            with self.assertRaises(TypeDBDriverException):
+                inserter.try_insert(["insert $x isa thing;"])
+            # the errors of the queries are returned
+            transaction.query.insert.side_effect = TypeDBDriverException(
+                "[TYR03] Invalid Type Read: The type 'thing' does not exist."
+            )
+            self.assertIsNotNone(inserter.try_insert(["insert $x isa thing;"]))
+
+    def test_missing_database(self):
+        self.driver.databases.contains.return_value = False
+        with self.assertRaises(ValueError):
+            with TypeDBBatchInsertHandler("localhost:1729", "test"):
+                pass
+        self.driver.close.assert_called_once()
@@ -1,3 +1,6 @@
+import pickle
+import sys
+import threading
 import unittest
 
 from satrap.datamanagement.typedb.dataobjects import (
@@ -16,6 +19,32 @@ class TestObject(unittest.TestCase):
             VariableDealer.get_variable()
         )
 
+    def test_variable_dealer_scope(self):
+        VariableDealer.get_variable()
+        with VariableDealer.scope():
+            self.assertEqual(VariableDealer.get_variable(), "v0")
+            self.assertEqual(VariableDealer.get_variable(), "v1")
+            with VariableDealer.scope():
+                self.assertEqual(VariableDealer.get_variable(), "v0")
+            self.assertEqual(VariableDealer.get_variable(), "v2")
+        self.assertEqual(VariableDealer.get_variable(), "v1")
+
+    def test_variable_dealer_scope_threads(self):
+        def get_variables(res: list):
+            with VariableDealer.scope():
+                for _ in range(1000):
+                    res.append(VariableDealer.get_variable())
+
+        results = [[] for _ in range(4)]
+        threads = [threading.Thread(target=get_variables, args=(res,))
+                   for res in results]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        for res in results:
+            self.assertEqual(res, [f"v{i}" for i in range(1000)])
+
     def test_thing_type(self):
         t = Thing(typedb_type="attack-pattern")
         self.assertEqual(
@@ -35,7 +64,7 @@ class TestObject(unittest.TestCase):
         e.add_attribute("attribute", "value")
         self.assertEqual(
             e.get_attributes(),
-            {"attribute": ["value"]}
+            {"attribute": ("value",)}
         )
 
     def test_entity_attribute_twice(self):
@@ -45,8 +74,8 @@ class TestObject(unittest.TestCase):
         self.assertIn(
             e.get_attributes(),
             [
-                {"attribute": ["value1", "value2"]},
-                {"attribute": ["value2", "value1"]}
+                {"attribute": ("value1", "value2")},
+                {"attribute": ("value2", "value1")}
             ]
         )
 
@@ -67,13 +96,35 @@ class TestObject(unittest.TestCase):
         )
         self.assertEqual(
             r.get_attributes(),
-            {"name": ["\"test\""]}
+            {"name": ("\"test\"",)}
         )
         self.assertEqual(
             r.get_roles(),
-            {"creator": ["a"]}
+            {"creator": ("a",)}
         )
 
+    def test_compact_relation(self):
+        r = Relation(typedb_type="created-by")
+        r.add_attribute("name", "\"test\"")
+        r.add_roleplayer("creator", "a")
+        other = Relation(typedb_type="created-by")
+        other.add_attribute("name", "\"test\"")
+        other.add_roleplayer("creator", "b")
+        query = InsertQuery()
+        query.add_to_insert_clause(r)
+
+        self.assertEqual(r, other)
+        r.add_attribute("name", "\"other\"")
+        r.add_roleplayer("creator", "c")
+        self.assertEqual(r.get_attributes(), {"name": ("\"test\"", "\"other\"")})
+        self.assertEqual(r.get_roles(), {"creator": ("a", "c")})
+        self.assertFalse(hasattr(r, "__dict__"))
+        self.assertIs(r.get_type(), sys.intern("created-by"))
+
+        copy = pickle.loads(pickle.dumps(query))
+        self.assertEqual(copy.get_insert_clause(), query.get_insert_clause())
+        self.assertEqual(copy.get_insert_clause()[0].get_variable(), r.get_variable())
+
     def test_insert_query_simple(self):
         iq = InsertQuery()
         e = Entity("var", "type")
@@ -0,0 +1,75 @@
+import unittest
+
+from satrap.datamanagement.typedb.dataobjects import Entity, InsertQuery, Relation
+from satrap.datamanagement.typedb.query_packer import QueryPacker
+from satrap.datamanagement.typedb.typeql_builder import TypeQLBuilder
+
+
+def create_query(hub: str, target: str) -> InsertQuery:
+    query = InsertQuery()
+    source = Entity("v0", "intrusion-set")
+    source.add_attribute("stix-id", hub)
+    query.add_to_match_clause(source)
+    destination = Entity("v1", "attack-pattern")
+    destination.add_attribute("stix-id", target)
+    query.add_to_match_clause(destination)
+    relation = Relation("v2", "uses")
+    relation.add_roleplayer("used-by", "v0")
+    relation.add_roleplayer("used", "v1")
+    query.add_to_insert_clause(relation)
+    return query
+
+
+class TestQueryPacker(unittest.TestCase):
+
+    def test_pack(self):
+        queries = [create_query("\"hub\"", f"\"ap{i}\"") for i in range(5)]
+        self.assertEqual([len(p) for p in QueryPacker.pack(queries, 2)], [2, 2, 1])
+        self.assertEqual([len(p) for p in QueryPacker.pack(queries, 0)], [1] * 5)
+
+    def test_merge(self):
+        queries = [create_query("\"hub\"", f"\"ap{i}\"") for i in range(3)]
+        merged = QueryPacker.merge(queries)
+
+        # the shared instance is matched once
+        self.assertEqual(len(merged.get_match_clause()), 4)
+        self.assertEqual(len(merged.get_insert_clause()), 3)
+        self.assertEqual(
+            [r.get_roles() for r in merged.get_insert_clause()],
+            [{"used-by": ("p0v0",), "used": (f"p{i}v1",)} for i in range(3)]
+        )
+        # the merged queries are not modified
+        self.assertEqual(queries[1].get_match_clause()[0].get_variable(), "v0")
+
+        typeql = TypeQLBuilder.build_insert_query(merged)
+        self.assertEqual(typeql.count("intrusion-set"), 1)
+        self.assertIn("$p2v2 (", typeql)
+
+    def test_merge_update(self):
+        queries = [create_query("\"hub\"", "\"ap0\"")]
+        # a query updating the matched hub, replacing its previous version
+        update = InsertQuery()
+        stored = Entity("v0", "intrusion-set")
+        stored.add_attribute("stix-id", "\"hub\"")
+        update.add_to_match_clause(stored)
+        attributes = Entity("v0", "intrusion-set")
+        attributes.add_attribute("name", "\"name\"")
+        update.add_to_insert_clause(attributes)
+        update.add_delete_queries(["match $x isa intrusion-set; delete $x has $a;"])
+        queries.append(update)
+        merged = QueryPacker.merge(queries)
+
+        # the updated hub keeps the variable of its match
+        self.assertEqual(merged.get_insert_clause()[1].get_variable(), "p0v0")
+        self.assertIn("$p0v0 has name", TypeQLBuilder.build_insert_query(merged))
+        self.assertEqual(merged.get_delete_queries(), update.get_delete_queries())
+
+    def test_key(self):
+        entity = Entity("v0", "identity")
+        self.assertIsNone(QueryPacker.get_key(entity))
+        entity.add_attribute("stix-id", "\"id\"")
+        self.assertEqual(QueryPacker.get_key(entity), ("identity", (("stix-id", ("\"id\"",)),)))
+
+
+if __name__ == "__main__":
+    unittest.main()